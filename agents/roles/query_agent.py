@@ -1,17 +1,21 @@
 # -*- coding: utf-8 -*-
 """
-QueryAgent: retrieves top-k candidate chunks and builds an answer draft prompt.
+QueryAgent: retrieves candidate chunks, packs the best into the prompt's
+token budget (core/context_packer.py) and builds an answer draft prompt.
 Note: generation is handled by provider (HttpLLM) or ICE wrapper.
 """
 from __future__ import annotations
 from typing import Dict, Any
 from dataclasses import dataclass
 from agents.core.base_agent import BaseAgent, AgentResult
-from core.retriever import retrieve
+from core.retriever import retrieve_chunks
+from core.prompts import query_prompt
+from core.context_packer import pack_hits
 
 @dataclass
 class QueryConfig:
     top_k: int = 5
+    max_tokens: int = 600  # answer length reserved out of the context budget
 
 class QueryAgent(BaseAgent):
     role = "query"
@@ -20,18 +24,19 @@ class QueryAgent(BaseAgent):
         question = (kwargs.get("question") or "").strip()
         if not question:
             return AgentResult(ok=False, error="empty question")
-        cfg = QueryConfig(top_k=int(kwargs.get("top_k", self.config.get("top_k", 5))))
-
-        hits = retrieve(question, top_k=cfg.top_k)
-        context = "\n\n".join(
-            f"[{i+1}] {d.title}\n{(d.content or '')[:800]}"
-            for i, (d, _) in enumerate(hits)
-        )
-        prompt = (
-            "You are Covenant. Answer using ONLY the context below. "
-            "If the answer is not present, say you don't know.\n\n"
-            f"Context:\n{context}\n\nQuestion: {question}\nAnswer:"
+        cfg = QueryConfig(
+            top_k=int(kwargs.get("top_k", self.config.get("top_k", 5))),
+            max_tokens=int(kwargs.get("max_tokens", self.config.get("max_tokens", 600))),
         )
-        citations = [{"title": d.title, "path": d.source_path} for d, _ in hits]
-        return AgentResult(ok=True, data={"prompt": prompt, "citations": citations, "n_hits": len(hits)})
 
+        hits = retrieve_chunks(question, top_k=cfg.top_k * 2)
+        packed = pack_hits(question, hits, cfg.max_tokens, max_passages=cfg.top_k)
+        prompt = query_prompt(question, packed.context)
+        return AgentResult(ok=True, data={
+            "prompt": prompt.text,
+            "prompt_prefix": prompt.prefix,
+            "citations": packed.citations,
+            "n_hits": len(packed.passages),
+            "context_tokens": packed.tokens,
+            "context_budget": packed.budget,
+        })
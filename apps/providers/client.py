@@ -1,4 +1,7 @@
-import os, json, requests
+import os, json
+from providers import transport
+from providers.scheduler import get_scheduler
+from providers.singleflight import get_singleflight
 
 PROVIDER_BASE_URL = os.getenv("PROVIDER_BASE_URL") or "http://127.0.0.1:8080/v1"
 PROVIDER_MODEL = os.getenv("PROVIDER_MODEL") or "phi-3-mini-instruct"
@@ -7,11 +10,15 @@ def _url(path: str) -> str:
     return f"{PROVIDER_BASE_URL.rstrip('/')}/{path.lstrip('/')}"
 
 def list_models():
-    r = requests.get(_url("/models"), timeout=20)
+    r = transport.get(_url("/models"), timeout=20)
     r.raise_for_status()
     return r.json()
 
-def chat_completions(messages, temperature=0.2, max_tokens=512, stop=None, model=None, **kw):
+# llama-server only: strict OpenAI-compatible servers reject unknown fields,
+# so set PROVIDER_PROMPT_CACHE=1 only when PROVIDER_BASE_URL is llama-server
+PROVIDER_PROMPT_CACHE = (os.getenv("PROVIDER_PROMPT_CACHE") or "0").lower() in ("1", "true", "yes", "on")
+
+def _payload(messages, temperature, max_tokens, stop, model, stream=False, slot=None):
     payload = {
         "model": model or PROVIDER_MODEL,
         "messages": messages,
@@ -20,11 +27,76 @@ def chat_completions(messages, temperature=0.2, max_tokens=512, stop=None, model
     }
     if stop:
         payload["stop"] = stop
-    r = requests.post(_url("/chat/completions"), json=payload, timeout=120)
-    r.raise_for_status()
-    data = r.json()
+    if stream:
+        payload["stream"] = True
+    # llama-server extensions: reuse the slot's KV cache for the shared
+    # prefix (system message) and optionally pin the slot
+    if PROVIDER_PROMPT_CACHE:
+        payload["cache_prompt"] = True
+        if slot is not None:
+            payload["id_slot"] = int(slot)
+    return payload
+
+def _flight_key(payload, priority=None):
+    # identical low-temperature requests in flight at the same priority share one generation
+    return get_singleflight().key(_url("/chat/completions"), payload["messages"],
+                                  {**{k: v for k, v in payload.items() if k != "messages"}, "priority": priority})
+
+def _content(data):
     # OpenAI-compatible: choices[0].message.content
     try:
         return data["choices"][0]["message"]["content"]
     except Exception:
         return json.dumps(data, indent=2)
+
+def chat_completions(messages, temperature=0.2, max_tokens=512, stop=None, model=None, slot=None, **kw):
+    payload = _payload(messages, temperature, max_tokens, stop, model, slot=slot)
+
+    def run():
+        with get_scheduler().slot(kw.get("priority")):
+            r = transport.post(_url("/chat/completions"), json=payload, timeout=120)
+        r.raise_for_status()
+        return _content(r.json())
+
+    return get_singleflight().do(_flight_key(payload, kw.get("priority")), run)
+
+def chat_completions_stream(messages, temperature=0.2, max_tokens=512, stop=None, model=None, slot=None, **kw):
+    """Yield content deltas from an OpenAI-compatible SSE stream."""
+    payload = _payload(messages, temperature, max_tokens, stop, model, stream=True, slot=slot)
+    with get_scheduler().slot(kw.get("priority")):
+        r = transport.post(_url("/chat/completions"), json=payload, timeout=120, stream=True)
+        r.raise_for_status()
+        for chunk in transport.iter_sse(r):
+            choices = chunk.get("choices") or [{}]
+            piece = (choices[0].get("delta") or {}).get("content")
+            if piece:
+                yield piece
+
+# ---- async (ASGI views) ----
+
+async def alist_models():
+    r = await transport.aget(_url("/models"), timeout=20)
+    r.raise_for_status()
+    return r.json()
+
+async def achat_completions(messages, temperature=0.2, max_tokens=512, stop=None, model=None, slot=None, **kw):
+    payload = _payload(messages, temperature, max_tokens, stop, model, slot=slot)
+
+    async def run():
+        async with get_scheduler().aslot(kw.get("priority")):
+            r = await transport.apost(_url("/chat/completions"), json=payload, timeout=120)
+        r.raise_for_status()
+        return _content(r.json())
+
+    return await get_singleflight().ado(_flight_key(payload, kw.get("priority")), run)
+
+async def achat_completions_stream(messages, temperature=0.2, max_tokens=512, stop=None, model=None, slot=None, **kw):
+    payload = _payload(messages, temperature, max_tokens, stop, model, stream=True, slot=slot)
+    async with get_scheduler().aslot(kw.get("priority")):
+        async with transport.astream("POST", _url("/chat/completions"), json=payload, timeout=120) as r:
+            r.raise_for_status()
+            async for chunk in transport.aiter_sse(r):
+                choices = chunk.get("choices") or [{}]
+                piece = (choices[0].get("delta") or {}).get("content")
+                if piece:
+                    yield piece
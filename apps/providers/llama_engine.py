@@ -1,5 +1,10 @@
 import os
-from .client import chat_completions, list_models
+from django.conf import settings
+from core.prompts import slot_for
+from .client import (
+    chat_completions, chat_completions_stream, list_models,
+    achat_completions, achat_completions_stream, alist_models,
+)
 
 PROVIDER_MODEL = os.getenv("PROVIDER_MODEL") or "phi-3-mini-instruct"
 
@@ -10,9 +15,37 @@ def health():
     except Exception as e:
         return {"ok": False, "error": str(e)}
 
-def chat_complete(system_prompt: str, user_prompt: str, temperature=0.2, max_tokens=512):
+async def ahealth():
+    try:
+        data = await alist_models()
+        return {"ok": True, "models": [m.get("id") or m for m in data.get("data", [])]}
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+
+def _slot(system_prompt: str):
+    # the system message leads the chat template, so it is the cacheable prefix
+    return slot_for(system_prompt or "", getattr(settings, "LLM_SLOTS", 2),
+                    getattr(settings, "LLM_SLOT_AFFINITY", False))
+
+def _messages(system_prompt: str, user_prompt: str):
     messages = []
     if system_prompt:
         messages.append({"role": "system", "content": system_prompt})
     messages.append({"role": "user", "content": user_prompt})
-    return chat_completions(messages, temperature=temperature, max_tokens=max_tokens, model=PROVIDER_MODEL)
+    return messages
+
+def chat_complete(system_prompt: str, user_prompt: str, temperature=0.2, max_tokens=512):
+    messages = _messages(system_prompt, user_prompt)
+    return chat_completions(messages, temperature=temperature, max_tokens=max_tokens, model=PROVIDER_MODEL, slot=_slot(system_prompt))
+
+def chat_complete_stream(system_prompt: str, user_prompt: str, temperature=0.2, max_tokens=512):
+    messages = _messages(system_prompt, user_prompt)
+    return chat_completions_stream(messages, temperature=temperature, max_tokens=max_tokens, model=PROVIDER_MODEL, slot=_slot(system_prompt))
+
+async def achat_complete(system_prompt: str, user_prompt: str, temperature=0.2, max_tokens=512):
+    messages = _messages(system_prompt, user_prompt)
+    return await achat_completions(messages, temperature=temperature, max_tokens=max_tokens, model=PROVIDER_MODEL, slot=_slot(system_prompt))
+
+def achat_complete_stream(system_prompt: str, user_prompt: str, temperature=0.2, max_tokens=512):
+    messages = _messages(system_prompt, user_prompt)
+    return achat_completions_stream(messages, temperature=temperature, max_tokens=max_tokens, model=PROVIDER_MODEL, slot=_slot(system_prompt))
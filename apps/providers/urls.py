@@ -2,4 +2,5 @@ from django.urls import path
 from . import views
 urlpatterns = [
     path("health", views.health, name="providers_health"),
+    path("scheduler", views.scheduler, name="providers_scheduler"),
 ]
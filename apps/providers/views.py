@@ -1,5 +1,11 @@
 from django.http import JsonResponse
-from .llama_engine import health as engine_health
+from providers.scheduler import get_scheduler
+from providers.singleflight import get_singleflight
+from .llama_engine import ahealth as engine_health
 
-def health(request):
-    return JsonResponse(engine_health(), safe=False)
+async def health(request):
+    return JsonResponse(await engine_health(), safe=False)
+
+def scheduler(request):
+    """Slots in use, queue depth, shed counts, queue wait vs generation time, coalescing."""
+    return JsonResponse({**get_scheduler().stats(), "singleflight": get_singleflight().stats()})
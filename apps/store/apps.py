@@ -3,4 +3,5 @@ from django.apps import AppConfig
 class StoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.store"
+    label = "store_ui"  # "store" is the top-level store app that owns the models
 
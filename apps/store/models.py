@@ -5,6 +5,9 @@ class Document(models.Model):
     content = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        db_table = "store_document"  # table name from before the store_ui relabel
+
     def __str__(self):
         return self.name
 
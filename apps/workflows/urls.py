@@ -3,4 +3,5 @@ from . import views
 urlpatterns = [
     path("qa_form", views.qa_form, name="qa_form"),
     path("qa", views.qa, name="qa"),
+    path("qa_stream", views.qa_stream, name="qa_stream"),
 ]
@@ -2,7 +2,9 @@ from django.shortcuts import render
 from django.views.decorators.http import require_POST
 from django.http import JsonResponse
 from django.conf import settings
-from apps.providers.llama_engine import chat_complete
+from apps.providers.llama_engine import achat_complete, achat_complete_stream
+from core.sse import sse_response, atoken_events
+from providers.scheduler import get_scheduler
 
 SYSTEM_PROMPT = "You are Covenant, a helpful on-device assistant. Be concise and accurate."
 
@@ -10,9 +12,17 @@ def qa_form(request):
     return render(request, "workflows/qa.html", {"answer": None})
 
 @require_POST
-def qa(request):
+async def qa(request):
     q = request.POST.get("q", "").strip()
     if not q:
         return JsonResponse({"ok": False, "error": "Empty question"}, status=400)
-    answer = chat_complete(SYSTEM_PROMPT, q, temperature=0.2, max_tokens=400)
+    answer = await achat_complete(SYSTEM_PROMPT, q, temperature=0.2, max_tokens=400)
     return JsonResponse({"ok": True, "answer": answer})
+
+async def qa_stream(request):
+    """SSE variant of qa: GET ?q=... (EventSource) or POST q=..."""
+    q = (request.POST.get("q") or request.GET.get("q") or "").strip()
+    if not q:
+        return JsonResponse({"ok": False, "error": "Empty question"}, status=400)
+    get_scheduler().check()
+    return sse_response(atoken_events(achat_complete_stream(SYSTEM_PROMPT, q, temperature=0.2, max_tokens=400)))
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""
+Covenant Mobile v9.1 — benchmarks/
+Reproducible retrieval benchmarks (`manage.py bench_retrieval`).
+
+- corpus.py: seeded synthetic corpus (Zipfian vocabulary, log-normal
+  document lengths) with planted query topics and their relevant documents
+- stats.py: percentiles, recall@k and baseline comparison (no Django)
+- retrieval.py: ingest into a throwaway database, then time
+  core.retriever.retrieve and score recall; results are one JSON document
+"""
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Covenant Mobile v9.1 — benchmarks/corpus.py
+Seeded synthetic corpus with a known-relevant set per query (no Django).
+
+- vocabulary: pronounceable pseudo-words drawn with Zipf weights, so a few
+  terms are in most documents and most terms are rare, like real text
+- document length: log-normal word counts around `median_words`
+  (clamped to [min_words, max_words]), one file per document under
+  docs/NNNN/ (1000 per directory)
+- queries: each has 2-3 topic terms that occur nowhere else; they are
+  planted several times in 3-10 relevant documents, and single topic terms
+  are planted in distractor documents so ranking has to combine terms;
+  queries also carry three of the most frequent vocabulary words
+The same spec (and seed) always produces byte-identical files; generate()
+reuses an existing corpus whose spec matches.
+"""
+from __future__ import annotations
+from typing import Dict, List, Tuple
+from dataclasses import dataclass, asdict
+from itertools import accumulate
+from pathlib import Path
+import json
+import math
+import random
+import shutil
+import time
+
+CONSONANTS = "bcdfghjklmnprstvwz"
+VOWELS = "aeiou"
+PER_DIR = 1000
+
+@dataclass(frozen=True)
+class CorpusSpec:
+    n_docs: int = 1000
+    n_queries: int = 100
+    vocab: int = 20000
+    median_words: int = 300
+    sigma: float = 0.9        # log-normal shape of document length
+    min_words: int = 20
+    max_words: int = 20000
+    zipf: float = 1.07
+    seed: int = 7
+
+@dataclass
+class Query:
+    qid: str
+    text: str
+    relevant: List[str]       # document paths relative to the corpus root
+
+# ---------- generation ----------
+
+def generate(spec: CorpusSpec, root: Path, force: bool = False) -> Tuple[List[Query], Dict[str, object]]:
+    """Write docs/ and queries.jsonl under root; returns (queries, corpus info)."""
+    root = Path(root)
+    spec_file = root / "spec.json"
+    if not force and spec_file.exists() and json.loads(spec_file.read_text()).get("spec") == asdict(spec):
+        info = json.loads(spec_file.read_text())
+        return load_queries(root / "queries.jsonl"), info
+    if root.exists():
+        shutil.rmtree(root)
+    (root / "docs").mkdir(parents=True)
+
+    t0 = time.perf_counter()
+    rng = random.Random(spec.seed)
+    words = vocabulary(spec.vocab, rng)
+    cum = list(accumulate(1.0 / (r ** spec.zipf) for r in range(1, len(words) + 1)))
+    queries, plants = _plan(spec, rng, words[:50])
+
+    lengths: List[int] = []
+    for i in range(spec.n_docs):
+        n = document_length(spec, rng)
+        body = rng.choices(words, cum_weights=cum, k=n)
+        for term, times in plants.get(i, ()):
+            for _ in range(times):
+                body.insert(rng.randrange(len(body) + 1), term)
+        lengths.append(len(body))
+        path = root / doc_path(i)
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(_lines(body), encoding="utf-8")
+
+    with open(root / "queries.jsonl", "w", encoding="utf-8") as fh:
+        for q in queries:
+            fh.write(json.dumps(asdict(q)) + "\n")
+    lengths.sort()
+    info = {
+        "spec": asdict(spec),
+        "words": sum(lengths),
+        "length_p50": lengths[len(lengths) // 2] if lengths else 0,
+        "length_p99": lengths[int(len(lengths) * 0.99)] if lengths else 0,
+        "length_max": lengths[-1] if lengths else 0,
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
+    spec_file.write_text(json.dumps(info, indent=2))
+    return queries, info
+
+def load_queries(path: Path) -> List[Query]:
+    with open(path, encoding="utf-8") as fh:
+        return [Query(**json.loads(line)) for line in fh if line.strip()]
+
+def doc_path(i: int) -> str:
+    return f"docs/{i // PER_DIR:04d}/doc{i:07d}.txt"
+
+def vocabulary(n: int, rng: random.Random, prefix: str = "") -> List[str]:
+    """n distinct pseudo-words of 2-4 syllables."""
+    seen: Dict[str, None] = {}
+    while len(seen) < n:
+        w = prefix + "".join(rng.choice(CONSONANTS) + rng.choice(VOWELS) for _ in range(rng.randint(2, 4)))
+        seen.setdefault(w, None)
+    return list(seen)
+
+def document_length(spec: CorpusSpec, rng: random.Random) -> int:
+    n = int(rng.lognormvariate(math.log(spec.median_words), spec.sigma))
+    return max(spec.min_words, min(spec.max_words, n))
+
+# ---------- internals ----------
+
+def _plan(spec: CorpusSpec, rng: random.Random, common: List[str]) -> Tuple[List[Query], Dict[int, List[Tuple[str, int]]]]:
+    """Queries and, per document index, the (topic term, times) to plant."""
+    # vocabulary words never start with "x", so topic terms occur only where planted
+    topics = vocabulary(spec.n_queries * 3, rng, prefix="x")
+    plants: Dict[int, List[Tuple[str, int]]] = {}
+    queries = []
+    for n in range(spec.n_queries):
+        terms = topics[n * 3:n * 3 + rng.randint(2, 3)]
+        k = min(spec.n_docs, rng.randint(3, 10))
+        relevant = rng.sample(range(spec.n_docs), k)
+        for i in relevant:
+            for t in terms:
+                plants.setdefault(i, []).append((t, rng.randint(1, 4)))
+        for i in rng.sample(range(spec.n_docs), min(spec.n_docs, 2 * k)):
+            if i not in relevant:
+                plants.setdefault(i, []).append((rng.choice(terms), rng.randint(1, 2)))
+        filler = rng.sample(common, 3)  # frequent words: long postings lists, little signal
+        text = " ".join(filler[:2] + terms + filler[2:])
+        queries.append(Query(qid=f"q{n:05d}", text=text, relevant=[doc_path(i) for i in sorted(relevant)]))
+    return queries, plants
+
+def _lines(words: List[str], per_line: int = 14) -> str:
+    return "\n".join(" ".join(words[i:i + per_line]) for i in range(0, len(words), per_line)) + "\n"
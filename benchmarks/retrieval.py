@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Covenant Mobile v9.1 — benchmarks/retrieval.py
+Ingest a synthetic corpus into a throwaway database and measure retrieval.
+
+Phases (each timed, with peak RSS afterwards):
+1. corpus: benchmarks.corpus.generate (reused when the spec is unchanged)
+2. ingest: store.ingest.Ingester over the files, i.e. extraction, chunking,
+   postings and FTS mirror (the index build time)
+3. per backend: warm-up, then every query `repeat` times through
+   core.retriever.retrieve for p50/p95/p99 latency, recall@k and MRR
+   against the planted relevant documents, and traced allocation per query
+
+The database is a test database created next to the corpus (Django's
+test-db machinery), so the configured store is never touched.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Sequence
+from pathlib import Path
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import django
+from django.conf import settings
+from django.db import connection
+from benchmarks.corpus import CorpusSpec, Query, generate
+from benchmarks.stats import HIGHER_IS_WORSE, LOWER_IS_WORSE, percentiles, recall_at_k, reciprocal_rank
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+KS = (1, 5, 10)
+TRACED_QUERIES = 50
+
+# what --baseline compares; per backend metrics are added in checks_for()
+CHECKS = {"ingest.seconds": HIGHER_IS_WORSE, "ingest.db_mb": HIGHER_IS_WORSE}
+
+def checks_for(backends: Sequence[str]) -> Dict[str, str]:
+    checks = dict(CHECKS)
+    for b in backends:
+        for q in ("p50", "p95", "p99"):
+            checks[f"query.{b}.latency_ms.{q}"] = HIGHER_IS_WORSE
+        checks[f"query.{b}.peak_kb_per_query"] = HIGHER_IS_WORSE
+        for k in KS:
+            checks[f"query.{b}.recall@{k}"] = LOWER_IS_WORSE
+    return checks
+
+def peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=settings.BASE_DIR, timeout=5).stdout.strip()
+    except Exception:
+        commit = ""
+    return {
+        "commit": commit, "python": platform.python_version(), "django": django.get_version(),
+        "platform": platform.platform(), "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+def run(spec: CorpusSpec, workdir: Path, backends: Sequence[str] = ("bm25",), top_k: int = 10,
+        repeat: int = 3, warmup: int = 20, workers: Optional[int] = None, regenerate: bool = False,
+        keep_db: bool = False) -> Dict[str, Any]:
+    workdir = Path(workdir).expanduser().resolve()
+    result: Dict[str, Any] = {"env": environment(), "params": {
+        "backends": list(backends), "top_k": top_k, "repeat": repeat, "warmup": warmup, "workers": workers}}
+
+    t0 = time.perf_counter()
+    queries, info = generate(spec, workdir / "corpus", force=regenerate)
+    result["corpus"] = {**info, "load_seconds": round(time.perf_counter() - t0, 3), "peak_rss_mb": peak_rss_mb()}
+
+    old_name = _test_db(workdir / "bench.sqlite3")
+    try:
+        result["ingest"] = _ingest(workdir / "corpus", workers)
+        ids = _doc_ids(workdir / "corpus")
+        result["query"] = {b: _measure(b, queries, ids, top_k, repeat, warmup) for b in backends}
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keep_db)
+    return result
+
+# ---------- internals ----------
+
+def _test_db(path: Path) -> str:
+    """Create and migrate a fresh database at `path`; returns the real DB name."""
+    if connection.vendor == "sqlite":
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = str(path)
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    return old_name
+
+def _ingest(root: Path, workers: Optional[int]) -> Dict[str, Any]:
+    from store.ingest import Ingester
+    stats = Ingester(workers=workers).run(root / "docs")
+    db = Path(connection.settings_dict["NAME"])
+    size = sum(p.stat().st_size for p in db.parent.glob(db.name + "*")) if db.exists() else 0
+    return {"seconds": stats.seconds, "docs": stats.written, "failed": stats.failed,
+            "docs_per_s": round(stats.written / stats.seconds, 1) if stats.seconds else 0.0,
+            "db_mb": round(size / 1e6, 1), "peak_rss_mb": peak_rss_mb()}
+
+def _doc_ids(root: Path) -> Dict[str, str]:
+    """Document id -> corpus-relative path (how queries name relevant docs)."""
+    from store.models import IngestManifest
+    base = (root / "docs").resolve()
+    return {doc_id: "docs/" + Path(path).relative_to(base).as_posix()
+            for path, doc_id in IngestManifest.objects.values_list("path", "doc_id")}
+
+def _measure(backend: str, queries: List[Query], ids: Dict[str, str], top_k: int, repeat: int,
+             warmup: int) -> Dict[str, Any]:
+    from core.retriever import retrieve
+    previous = getattr(settings, "RETRIEVER_BACKEND", "bm25")
+    settings.RETRIEVER_BACKEND = backend
+    try:
+        for q in queries[:warmup]:
+            retrieve(q.text, top_k=top_k)
+        times: List[float] = []
+        ranked: List[List[str]] = []
+        t_all = time.perf_counter()
+        for r in range(max(1, repeat)):
+            for q in queries:
+                t0 = time.perf_counter()
+                hits = retrieve(q.text, top_k=top_k)
+                times.append((time.perf_counter() - t0) * 1000)
+                if r == 0:
+                    ranked.append([ids.get(d.pk, "") for d, _ in hits])
+        wall = time.perf_counter() - t_all
+
+        tracemalloc.start()
+        peaks = []
+        for q in queries[:TRACED_QUERIES]:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            retrieve(q.text, top_k=top_k)
+            peaks.append(tracemalloc.get_traced_memory()[1] - base)
+        tracemalloc.stop()
+    finally:
+        settings.RETRIEVER_BACKEND = previous
+
+    out: Dict[str, Any] = {
+        "queries": len(times),
+        "latency_ms": percentiles(times),
+        "qps": round(len(times) / wall, 1) if wall else 0.0,
+        "peak_kb_per_query": round(max(peaks, default=0) / 1024, 1),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    for k in KS:
+        if k <= top_k:
+            out[f"recall@{k}"] = round(sum(recall_at_k(rk, q.relevant, k) for rk, q in zip(ranked, queries))
+                                       / max(1, len(queries)), 4)
+    out["mrr"] = round(sum(reciprocal_rank(rk, q.relevant) for rk, q in zip(ranked, queries))
+                       / max(1, len(queries)), 4)
+    return out
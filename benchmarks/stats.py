@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Covenant Mobile v9.1 — benchmarks/stats.py
+Latency percentiles, recall@k and baseline comparison (no Django).
+"""
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Sequence
+
+# direction in which a change of a compared metric counts as a regression
+HIGHER_IS_WORSE = "up"
+LOWER_IS_WORSE = "down"
+
+def percentiles(values: Sequence[float], qs: Iterable[int] = (50, 95, 99)) -> Dict[str, float]:
+    """Nearest-rank percentiles plus mean, in the unit of `values`."""
+    if not values:
+        return {f"p{q}": 0.0 for q in qs} | {"mean": 0.0}
+    s = sorted(values)
+    out = {f"p{q}": s[min(len(s) - 1, max(0, -(-q * len(s) // 100) - 1))] for q in qs}
+    out["mean"] = sum(s) / len(s)
+    return {k: round(v, 6) for k, v in out.items()}
+
+def recall_at_k(ranked: Sequence[str], relevant: Iterable[str], k: int) -> float:
+    rel = set(relevant)
+    return len(rel.intersection(ranked[:k])) / len(rel) if rel else 0.0
+
+def reciprocal_rank(ranked: Sequence[str], relevant: Iterable[str]) -> float:
+    rel = set(relevant)
+    return next((1.0 / (i + 1) for i, d in enumerate(ranked) if d in rel), 0.0)
+
+def metric(result: Dict[str, Any], path: str) -> Any:
+    for part in path.split("."):
+        if not isinstance(result, dict) or part not in result:
+            return None
+        result = result[part]
+    return result
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], checks: Dict[str, str],
+            tolerance: float = 0.2) -> List[Dict[str, Any]]:
+    """
+    One row per metric present in both results: current, baseline, relative
+    change and whether it regressed by more than `tolerance` (0.2 = 20%) in
+    its bad direction.
+    """
+    rows = []
+    for path, bad in checks.items():
+        cur, base = metric(result, path), metric(baseline, path)
+        if not isinstance(cur, (int, float)) or not isinstance(base, (int, float)):
+            continue
+        change = (cur - base) / base if base else 0.0
+        worse = change > tolerance if bad == HIGHER_IS_WORSE else change < -tolerance
+        rows.append({"metric": path, "current": cur, "baseline": base,
+                     "change": round(change, 4), "regressed": worse})
+    return rows
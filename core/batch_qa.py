@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Covenant Mobile v9.1 — core/batch_qa.py
+Batch question answering through ICE.run_query (`manage.py batch_qa`).
+
+- input: JSONL, one object per line with `question` (or `q` / `prompt`)
+  and an optional `id` (default: line number)
+- retrieval runs on the calling thread for groups of questions via
+  retrieve_chunks_many(), so postings and chunks of terms/documents the
+  questions share are read once per group; the next group is retrieved
+  while the previous one is still generating
+- generations run on `concurrency` threads (default LLM_SLOTS) at BATCH
+  priority; a request shed by the scheduler is retried after Retry-After
+- output: one JSON line per answer, written and flushed as soon as it
+  completes (completion order); on resume, ids already answered ok are
+  skipped, failed ones are retried (their earlier lines are removed first,
+  so every id appears once) and a torn last line is dropped
+"""
+from __future__ import annotations
+from typing import Any, Dict, Iterator, List, Optional, Set
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, asdict
+from pathlib import Path
+import json
+import logging
+import os
+import time
+from django.conf import settings
+from core.event_bus import bus
+from core.ice import CANDIDATE_FACTOR, PROVIDER_ERRORS, ice
+from core.retriever import retrieve_chunks_many
+from providers.scheduler import BATCH, priority
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class BatchStats:
+    total: int = 0
+    skipped: int = 0     # answered ok by an earlier run
+    invalid: int = 0     # unparsable lines / no question
+    ok: int = 0
+    failed: int = 0
+    retried: int = 0
+    seconds: float = 0.0
+
+def read_questions(path: Path, stats: Optional[BatchStats] = None) -> Iterator[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as fh:
+        for n, line in enumerate(fh, 1):
+            if not line.strip():
+                continue
+            try:
+                obj = json.loads(line)
+                question = (obj.get("question") or obj.get("q") or obj.get("prompt") or "").strip()
+            except (ValueError, AttributeError):
+                question = ""
+            if not question:
+                logger.warning("%s:%d: no question, skipped", path, n)
+                if stats:
+                    stats.invalid += 1
+                continue
+            qid = obj.get("id")
+            yield {"id": str(n if qid is None or qid == "" else qid), "question": question}
+
+def answered_ids(path: Path) -> Set[str]:
+    """Ids answered ok in an existing output file; drops a torn last line."""
+    if not path.exists():
+        return set()
+    raw = path.read_bytes()
+    if raw and not raw.endswith(b"\n"):
+        with open(path, "r+b") as fh:
+            fh.truncate(raw.rfind(b"\n") + 1)
+        raw = raw[:raw.rfind(b"\n") + 1]
+    done = set()
+    for line in raw.decode("utf-8", errors="replace").splitlines():
+        try:
+            row = json.loads(line)
+        except ValueError:
+            continue
+        if row.get("ok"):
+            done.add(str(row.get("id")))
+    return done
+
+def discard_rows(path: Path, ids: Set[str]) -> int:
+    """Rewrite an output file without the rows for `ids`; returns rows removed."""
+    if not ids or not path.exists():
+        return 0
+    tmp = path.with_name(path.name + ".tmp")
+    removed = 0
+    with open(path, encoding="utf-8") as src, open(tmp, "w", encoding="utf-8") as dst:
+        for line in src:
+            try:
+                row_id = str(json.loads(line).get("id"))
+            except (ValueError, AttributeError):
+                row_id = None
+            if row_id in ids:
+                removed += 1
+            else:
+                dst.write(line)
+    if removed:
+        os.replace(tmp, path)
+    else:
+        tmp.unlink()
+    return removed
+
+class BatchQA:
+    def __init__(self, concurrency: int = 0, top_k: int = 5, group_size: int = 64, retries: int = 3):
+        self.concurrency = max(1, concurrency or getattr(settings, "LLM_SLOTS", 2))
+        self.top_k = top_k
+        self.group_size = max(1, group_size)
+        self.retries = retries
+
+    def run(self, src: Path, out: Path, resume: bool = True) -> BatchStats:
+        t0 = time.perf_counter()
+        stats = BatchStats()
+        done = answered_ids(out) if resume else set()
+        todo = []
+        for q in read_questions(src, stats):
+            if q["id"] in done:
+                stats.skipped += 1
+            else:
+                todo.append(q)
+        stats.total = len(todo) + stats.skipped
+        if resume:
+            discard_rows(out, {q["id"] for q in todo})  # failed before, answered again below
+        with open(out, "a" if resume else "w", encoding="utf-8") as fh, \
+                ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="batch-qa") as pool:
+            pending: Set[Future] = set()
+            for i in range(0, len(todo), self.group_size):
+                group = todo[i:i + self.group_size]
+                hits = retrieve_chunks_many([q["question"] for q in group], self.top_k * CANDIDATE_FACTOR)
+                pending |= {pool.submit(self._answer, q, h) for q, h in zip(group, hits)}
+                # keep about one group queued behind the running generations
+                while len(pending) > self.group_size:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    self._write(fh, finished, stats)
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                self._write(fh, finished, stats)
+        stats.seconds = round(time.perf_counter() - t0, 3)
+        bus.publish("batch.progress", {**asdict(stats), "done": True})
+        return stats
+
+    # ---------- internals ----------
+
+    def _answer(self, q: Dict[str, Any], hits: List[Any]) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        retried = 0
+        with priority(BATCH):
+            while True:
+                res = ice.run_query(q["question"], top_k=self.top_k, hits=hits)
+                if res.ok or "retry_after" not in res.meta or retried >= self.retries:
+                    break
+                retried += 1
+                time.sleep(res.meta["retry_after"])
+        ok = res.ok and not res.answer.startswith(PROVIDER_ERRORS)
+        return {
+            "id": q["id"], "question": q["question"], "ok": ok, "answer": res.answer,
+            "citations": res.citations, "error": res.error or ("" if ok else res.answer),
+            "run_id": res.meta.get("run_id"), "cache": res.meta.get("cache"),
+            "retries": retried, "seconds": round(time.perf_counter() - t0, 3),
+        }
+
+    def _write(self, fh, finished: Set[Future], stats: BatchStats) -> None:
+        for f in finished:
+            try:
+                row = f.result()
+            except Exception as e:  # run_query reports its own errors; this is a bug
+                logger.exception("batch question failed: %s", e)
+                stats.failed += 1
+                continue
+            fh.write(json.dumps(row, ensure_ascii=False) + "\n")
+            stats.ok += row["ok"]
+            stats.failed += not row["ok"]
+            stats.retried += row["retries"]
+        fh.flush()
+        bus.publish("batch.progress", {**asdict(stats), "done": False})
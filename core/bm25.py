@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Covenant Mobile v9.1 — core/bm25.py
+Tokenizer and Okapi BM25 scoring shared by the index and the retriever.
+Pure Python (no Django imports) so it can be unit-tested in isolation.
+"""
+from __future__ import annotations
+from typing import Dict, Iterable, List
+from collections import Counter
+import math
+import re
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+MAX_TERM_LEN = 64      # matches Posting.term max_length
+MAX_QUERY_TERMS = 16
+
+K1 = 1.2
+B = 0.75
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens; overlong tokens (hashes, base64 blobs) are dropped."""
+    return [t for t in TOKEN_RE.findall((text or "").lower()) if len(t) <= MAX_TERM_LEN]
+
+def term_frequencies(text: str) -> Counter:
+    return Counter(tokenize(text))
+
+def query_terms(query: str) -> List[str]:
+    """Unique query terms in first-seen order, capped to keep postings fetches bounded."""
+    seen: Dict[str, None] = {}
+    for t in tokenize(query):
+        seen.setdefault(t, None)
+        if len(seen) >= MAX_QUERY_TERMS:
+            break
+    return list(seen)
+
+def idf(n_docs: int, df: int) -> float:
+    """BM25 IDF with the +1 smoothing used by Lucene (never negative)."""
+    return math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+
+def bm25(tf: int, dl: int, avgdl: float, idf_: float, k1: float = K1, b: float = B) -> float:
+    norm = k1 * (1.0 - b + b * (dl / avgdl if avgdl else 1.0))
+    return idf_ * (tf * (k1 + 1.0)) / (tf + norm)
+
+def score_postings(postings: Iterable[tuple], n_docs: int, avgdl: float) -> Dict[str, float]:
+    """
+    postings: iterable of (term, doc_id, tf, dl) rows for the query terms.
+    Returns {doc_id: bm25 score}. Document frequency is derived from the rows.
+    """
+    rows = list(postings)
+    df = Counter(term for term, _, _, _ in rows)
+    n = max(n_docs, max(df.values(), default=0))
+    idfs = {term: idf(n, c) for term, c in df.items()}
+    scores: Dict[str, float] = {}
+    for term, doc_id, tf, dl in rows:
+        scores[doc_id] = scores.get(doc_id, 0.0) + bm25(tf, dl, avgdl, idfs[term])
+    return scores
+
+def score_text(text: str, idfs: Dict[str, float], avgdl: float) -> float:
+    """BM25 of a single passage against pre-computed query-term IDFs."""
+    return score_tfs(term_frequencies(text), idfs, avgdl)
+
+def score_tfs(tfs: Counter, idfs: Dict[str, float], avgdl: float) -> float:
+    """score_text() for a passage already counted with term_frequencies()."""
+    dl = sum(tfs.values())
+    return sum(bm25(tfs[t], dl, avgdl, w) for t, w in idfs.items() if tfs.get(t))
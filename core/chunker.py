@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Covenant Mobile v9.1 — core/chunker.py
+Splits document text into overlapping passages with character offsets back
+into the parent document. Boundaries snap to whitespace so words stay whole.
+"""
+from __future__ import annotations
+from typing import List
+from dataclasses import dataclass
+
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 200
+
+@dataclass(frozen=True)
+class Span:
+    start: int
+    end: int
+    text: str
+
+def chunk_text(text: str, size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[Span]:
+    text = text or ""
+    size = max(1, int(size))
+    overlap = max(0, min(int(overlap), size // 2))
+    n = len(text)
+    spans: List[Span] = []
+    pos = 0
+    while pos < n:
+        end = min(pos + size, n)
+        if end < n:
+            # prefer to cut at the last whitespace in the back half of the window
+            cut = text.rfind(" ", pos + size // 2, end)
+            cut = max(cut, text.rfind("\n", pos + size // 2, end))
+            if cut > pos:
+                end = cut
+        piece = text[pos:end]
+        lead = len(piece) - len(piece.lstrip())
+        body = piece.strip()
+        if body:
+            spans.append(Span(pos + lead, pos + lead + len(body), body))
+        if end >= n:
+            break
+        nxt = max(end - overlap, pos + 1)
+        # don't start the next window mid-word
+        ws = text.find(" ", nxt, end)
+        pos = ws + 1 if ws != -1 else nxt
+    return spans
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Covenant Mobile v9.1 — core/context_packer.py
+Token-budgeted context for query prompts (shared by ICE and QueryAgent).
+
+- budget: per-slot context (LLM_CONTEXT_TOKENS / LLM_SLOTS, as llama-server
+  splits -c across --parallel slots) minus the answer's max_tokens, the
+  prompt template with the question, and a small margin
+- passages are taken best-first; a passage overlapping one already taken
+  from the same document is merged into it (only the uncovered part costs
+  tokens), exact duplicates are dropped, and the first passage that does not
+  fit whole is cut at a word boundary if a useful amount of budget is left
+- token counts: TOKEN_COUNTER = "approx" (bundled word-piece estimate, no
+  server) or "llama" (llama-server /tokenize, cached per text, falling back
+  to the estimate when the server is unavailable)
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+import hashlib
+import logging
+import re
+import threading
+from django.conf import settings
+from core.prompts import query_prompt
+from providers import transport
+
+logger = logging.getLogger(__name__)
+
+MARGIN = 16           # tokens kept free for BOS/EOS and counter error
+MIN_CUT_TOKENS = 48   # don't bother cutting a passage down below this
+_PIECE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+# ---------- token counting ----------
+
+def approx_tokens(text: str) -> int:
+    """
+    Fast estimate of llama-style BPE counts: one token per punctuation mark,
+    roughly one per 4 characters of a word (at least one).
+    """
+    return sum(1 + (len(p) - 1) // 4 if p[0].isalnum() or p[0] == "_" else 1 for p in _PIECE.findall(text))
+
+class ApproxCounter:
+    name = "approx"
+
+    def count(self, text: str) -> int:
+        return approx_tokens(text)
+
+class LlamaTokenCounter:
+    """POST /tokenize with an LRU cache keyed by text digest."""
+    name = "llama"
+
+    def __init__(self, endpoint: str, cache_size: int = 4096, timeout: int = 10):
+        self.endpoint = endpoint.rstrip("/")
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[bytes, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._failed = False
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        with self._lock:
+            n = self._cache.get(key)
+            if n is not None:
+                self._cache.move_to_end(key)
+                return n
+        try:
+            r = transport.post(f"{self.endpoint}/tokenize", json={"content": text}, timeout=self.timeout)
+            r.raise_for_status()
+            n = len(r.json()["tokens"])
+        except Exception as e:
+            if not self._failed:
+                logger.warning("/tokenize unavailable (%s); using approximate token counts", e)
+                self._failed = True
+            return approx_tokens(text)
+        self._failed = False
+        with self._lock:
+            self._cache[key] = n
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return n
+
+_counter = None
+
+def get_counter():
+    global _counter
+    backend = getattr(settings, "TOKEN_COUNTER", "approx")
+    if _counter is None or _counter.name != backend:
+        endpoint = getattr(settings, "MODEL_ENDPOINT", "") or ""
+        _counter = LlamaTokenCounter(endpoint) if backend == "llama" and endpoint else ApproxCounter()
+    return _counter
+
+# ---------- packing ----------
+
+@dataclass
+class Passage:
+    key: str            # chunk id
+    doc_id: str
+    title: str
+    path: str
+    start: int          # char offsets into the document
+    end: int
+    text: str
+    score: float = 0.0
+    version: str = ""   # document updated_at, for the response cache key
+
+@dataclass
+class Packed:
+    passages: List[Passage] = field(default_factory=list)
+    context: str = ""
+    tokens: int = 0
+    budget: int = 0
+    merged: int = 0
+    dropped: int = 0
+    cut: int = 0
+
+    @property
+    def citations(self) -> List[Dict[str, Any]]:
+        return [{"title": p.title, "path": p.path, "start": p.start, "end": p.end} for p in self.passages]
+
+    @property
+    def sources(self) -> List[Tuple[str, str]]:
+        return [(p.key, p.version) for p in self.passages]
+
+def passages_from_hits(hits: Sequence[Tuple[Any, float]]) -> List[Passage]:
+    """Chunk rows from core.retriever.retrieve_chunks -> Passages."""
+    return [
+        Passage(key=c.pk, doc_id=c.doc_id, title=c.doc.title, path=c.doc.source_path, start=c.start,
+                end=c.end, text=c.text, score=score,
+                version=c.doc.updated_at.isoformat() if c.doc.updated_at else "")
+        for c, score in hits
+    ]
+
+def _header(i: int, p: Passage) -> str:
+    return f"[{i}] {p.title} (chars {p.start}-{p.end})\n"
+
+def format_context(passages: Sequence[Passage]) -> str:
+    return "\n\n".join(_header(i + 1, p) + p.text for i, p in enumerate(passages))
+
+def context_budget(question: str, max_tokens: int, counter=None) -> int:
+    counter = counter or get_counter()
+    n_ctx = getattr(settings, "LLM_CONTEXT_TOKENS", 4096) // max(1, getattr(settings, "LLM_SLOTS", 1))
+    overhead = counter.count(query_prompt(question, "").text)
+    return max(0, n_ctx - max_tokens - overhead - MARGIN)
+
+def pack(passages: Sequence[Passage], budget: int, counter=None, max_passages: Optional[int] = None) -> Packed:
+    """Fit passages (best first) into `budget` tokens of formatted context."""
+    counter = counter or get_counter()
+    out = Packed(budget=budget)
+    chosen: List[Passage] = []
+    seen = set()
+    used = 0
+    for p in passages:
+        digest = hashlib.blake2b(" ".join(p.text.split()).encode("utf-8"), digest_size=16).digest()
+        if digest in seen:
+            out.dropped += 1
+            continue
+        host = next((s for s in chosen if s.doc_id == p.doc_id and p.start <= s.end and p.end >= s.start), None)
+        if host is not None:
+            head = p.text[:max(0, host.start - p.start)]
+            tail = p.text[max(0, host.end - p.start):] if p.end > host.end else ""
+            if not head and not tail:
+                out.dropped += 1  # fully covered already
+                continue
+            cost = counter.count(head) + counter.count(tail)
+            if used + cost > budget:
+                out.dropped += 1
+                continue
+            host.text = head + host.text + tail
+            host.start, host.end = min(host.start, p.start), max(host.end, p.end)
+            used += cost
+            out.merged += 1
+            seen.add(digest)
+            continue
+        if max_passages is not None and len(chosen) >= max_passages:
+            out.dropped += 1
+            continue
+        p = replace(p)
+        cost = counter.count(_header(len(chosen) + 1, p) + p.text) + 1  # + separator
+        if used + cost > budget:
+            p = _cut(p, budget - used, counter)
+            if p is None:
+                out.dropped += 1
+                continue
+            cost = counter.count(_header(len(chosen) + 1, p) + p.text) + 1
+            out.cut += 1
+        chosen.append(p)
+        seen.add(digest)
+        used += cost
+    out.passages = chosen
+    out.context = format_context(chosen)
+    out.tokens = used
+    return out
+
+def pack_hits(question: str, hits: Sequence[Tuple[Any, float]], max_tokens: int,
+              max_passages: Optional[int] = None) -> Packed:
+    """Budget for this question + answer size, then pack the retrieved hits."""
+    counter = get_counter()
+    return pack(passages_from_hits(hits), context_budget(question, max_tokens, counter), counter, max_passages)
+
+def _cut(p: Passage, room: int, counter) -> Optional[Passage]:
+    """Shorten p at a word boundary so header + text fit in `room` tokens."""
+    if room < MIN_CUT_TOKENS:
+        return None
+    text = p.text
+    for _ in range(4):
+        need = counter.count(_header(0, p) + text) + 1
+        if need <= room:
+            return replace(p, text=text, end=p.start + len(text))
+        head = text[:int(len(text) * room / need * 0.95)]
+        parts = head.rsplit(None, 1)
+        text = parts[0] if len(parts) > 1 else head
+        if counter.count(text) < MIN_CUT_TOKENS // 2:
+            return None
+    return None
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Covenant Mobile v9.1 — core/dense.py
+Embedding pipeline and dense search over the Vector table.
+
+- embed_chunks(): batched embedding of chunks that have no Vector row for
+  the active embedder (Vector.id == Chunk.id)
+- build_index(): exports the vectors to a memory-mapped VectorIndex on disk
+- search(): cosine top-k of the query embedding; the on-disk index is
+  reloaded automatically after a rebuild
+"""
+from __future__ import annotations
+from typing import List, Optional, Tuple
+from pathlib import Path
+import logging
+import threading
+import numpy as np
+from django.conf import settings
+from store.models import Chunk, Vector
+from core.embeddings import get_embedder
+from core.vector_index import VectorIndex, IDS_FILE
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_cache: dict = {}
+
+def index_dir(model: str) -> Path:
+    base = getattr(settings, "VECTOR_INDEX_DIR", None) or Path(settings.BASE_DIR) / "data" / "index"
+    return Path(base) / model
+
+def embed_chunks(batch_size: int = 64, embedder=None) -> int:
+    """Embed every chunk lacking a vector for this embedder. Returns rows written."""
+    emb = embedder or get_embedder()
+    done = Vector.objects.filter(model=emb.name).values("id")
+    pending = list(Chunk.objects.exclude(id__in=done).order_by("id").values_list("id", flat=True))
+    n = 0
+    for i in range(0, len(pending), batch_size):
+        chunks = Chunk.objects.only("id", "doc_id", "text").in_bulk(pending[i:i + batch_size])
+        batch = list(chunks.values())
+        if not batch:
+            continue
+        vecs = emb.embed([c.text for c in batch])
+        Vector.objects.bulk_create(
+            [Vector(id=c.id, doc_id=c.doc_id, embedding=v.astype(np.float32).tobytes(),
+                    dim=int(v.shape[0]), model=emb.name)
+             for c, v in zip(batch, vecs)],
+            update_conflicts=True,
+            unique_fields=["id"],
+            update_fields=["doc", "embedding", "dim", "model"],
+        )
+        n += len(batch)
+    return n
+
+def build_index(nlist: int = 0, embedder=None) -> VectorIndex:
+    """Write all vectors of the active model into a contiguous float32 matrix."""
+    emb = embedder or get_embedder()
+    qs = Vector.objects.filter(model=emb.name).order_by("id")
+    first = qs.values_list("dim", flat=True).first()
+    n = qs.count()
+    matrix = np.zeros((n, first or 0), dtype=np.float32)
+    ids: List[str] = []
+    for row, (vid, blob) in enumerate(qs.values_list("id", "embedding").iterator(chunk_size=2000)):
+        matrix[row] = np.frombuffer(bytes(blob), dtype=np.float32)
+        ids.append(vid)
+    return VectorIndex.build(index_dir(emb.name), ids, matrix, nlist=nlist)
+
+def _load(model: str) -> Optional[VectorIndex]:
+    path = index_dir(model)
+    try:
+        mtime = (path / IDS_FILE).stat().st_mtime
+    except FileNotFoundError:
+        return None
+    with _lock:
+        hit = _cache.get(model)
+        if hit and hit[0] == mtime:
+            return hit[1]
+        try:
+            idx = VectorIndex.load(path)
+        except ValueError as e:
+            logger.error("dense index not loaded: %s", e)
+            return None
+        _cache[model] = (mtime, idx)
+        return idx
+
+def search(query: str, top_k: int = 5, embedder=None) -> List[Tuple[str, float]]:
+    """Dense top-k as [(chunk_id, cosine)], best first; [] if no index was built."""
+    emb = embedder or get_embedder()
+    idx = _load(emb.name)
+    if idx is None or not len(idx):
+        return []
+    q = emb.embed([query])[0]
+    return idx.search(q, top_k=top_k, nprobe=getattr(settings, "VECTOR_NPROBE", 8))
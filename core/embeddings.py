@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Covenant Mobile v9.1 — core/embeddings.py
+Text embedders used to fill the Vector table.
+
+- LlamaEmbedder: batched POSTs to llama-server /embedding (start the server
+  with --embedding); also accepts OpenAI-style {"data": [...]} replies
+- HashingEmbedder: dependency-free local stand-in (signed feature hashing of
+  word unigrams/bigrams); deterministic, no server needed
+
+Select with settings.EMBEDDING_BACKEND = "hash" | "llama".
+"""
+from __future__ import annotations
+from typing import List, Sequence
+import hashlib
+import numpy as np
+from django.conf import settings
+from core.bm25 import tokenize
+from providers import transport
+
+DEFAULT_TIMEOUT = 60
+
+class HashingEmbedder:
+    def __init__(self, dim: int = 256):
+        self.dim = int(dim)
+        self.name = f"hash-{self.dim}"
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            toks = tokenize(text)
+            for feat in toks + [f"{a} {b}" for a, b in zip(toks, toks[1:])]:
+                h = int.from_bytes(hashlib.blake2b(feat.encode("utf-8"), digest_size=8).digest(), "little")
+                out[row, h % self.dim] += 1.0 if (h >> 63) & 1 else -1.0
+        return out
+
+class LlamaEmbedder:
+    def __init__(self, endpoint: str, model: str = "llama", batch_size: int = 16, timeout: int = DEFAULT_TIMEOUT):
+        self.endpoint = endpoint.rstrip("/")
+        self.name = model
+        self.batch_size = max(1, int(batch_size))
+        self.timeout = timeout
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        rows: List[List[float]] = []
+        for i in range(0, len(texts), self.batch_size):
+            batch = list(texts[i:i + self.batch_size])
+            r = transport.post(f"{self.endpoint}/embedding", json={"content": batch}, timeout=self.timeout)
+            r.raise_for_status()
+            rows.extend(self._parse(r.json(), len(batch)))
+        return np.asarray(rows, dtype=np.float32)
+
+    @staticmethod
+    def _parse(j, n: int) -> List[List[float]]:
+        if isinstance(j, dict) and "data" in j:  # OpenAI-compatible
+            j = j["data"]
+        if isinstance(j, dict):
+            j = [j]
+        items = sorted(j, key=lambda e: e.get("index", 0))
+        out = []
+        for e in items:
+            emb = e["embedding"]
+            # llama-server without pooling returns one vector per token: mean-pool
+            if emb and isinstance(emb[0], list):
+                emb = np.asarray(emb, dtype=np.float32).mean(axis=0).tolist()
+            out.append(emb)
+        if len(out) != n:
+            raise ValueError(f"embedding count mismatch: got {len(out)}, expected {n}")
+        return out
+
+def get_embedder():
+    backend = getattr(settings, "EMBEDDING_BACKEND", "hash")
+    if backend == "llama":
+        return LlamaEmbedder(
+            endpoint=getattr(settings, "EMBEDDING_ENDPOINT", "") or getattr(settings, "MODEL_ENDPOINT", ""),
+            model=getattr(settings, "EMBEDDING_MODEL", "llama"),
+            batch_size=getattr(settings, "EMBEDDING_BATCH_SIZE", 16),
+        )
+    return HashingEmbedder(dim=getattr(settings, "EMBEDDING_DIM", 256))
@@ -4,32 +4,136 @@ Covenant Mobile v9.1 — core/event_bus.py
 
 Tiny event bus with:
 - topic-based pub/sub
-- sync publish (default) + optional background worker
+- sync publish (default) + optional background worker pool
 - simple middleware hooks (before/after)
-- backpressure-safe queue when running the worker
+- backpressure-safe queues when running the workers
+
+Worker pool: enqueue() hashes the topic onto one of `workers` shards, each a
+bounded queue drained by its own thread, so events of one topic are handled
+in order while a slow subscriber only stalls its own shard. When a shard is
+full the overflow policy decides:
+- "block":       wait up to `block_timeout` seconds (None = forever), then drop
+- "drop-newest": drop the event being enqueued
+- "drop-oldest": evict the oldest queued event of that shard
+- "spill":       append to <spill_dir>/spill-<shard>.jsonl; the shard keeps
+                 spilling (order preserved) until its worker has drained it.
+                 Spilled events reach handlers JSON round-tripped: tuples
+                 come back as lists and values JSON can't encode (datetimes,
+                 objects) as their str()
+Counters (enqueued/processed/dropped/spilled/errors, current queue depth) are
+available from stats().
+
+Topic patterns are dot-separated: "*" matches exactly one segment and "**"
+any number (including none), e.g. "run.*", "*.completed", "ingest.**", "**".
+Subscriptions and middleware are compiled into an immutable dispatch
+snapshot that is swapped in on every change (copy-on-write), so publish and
+the workers never take a lock; handler lists are memoized per topic.
+
+asyncio: coroutine functions can be subscribed like any handler. They never
+run inline; each call becomes a task wrapped in a per-handler timeout
+(subscribe(..., timeout=) or EVENT_BUS_HANDLER_TIMEOUT), so publishers only
+pay for scheduling it:
+- publish_async() (on an event loop) creates the tasks on that loop, which
+  also becomes the bus's bound loop; pass wait=True to await them
+- publish()/workers from another thread hand them to the bound loop via
+  run_coroutine_threadsafe, or run them to completion if no loop is alive
+
+Durability: attach_log(EventLog(...)) (core/event_log.py) appends every
+event made by publish/publish_async/enqueue to an on-disk log before it is
+dispatched or queued, so even events dropped by an overflow policy can be
+replayed by a subscriber catching up from its cursor. If the log cannot
+write (disk full), events are still dispatched without a seq and counted
+as log_errors; only EventLog.flush() raises.
+
+Defaults come from EVENT_BUS_WORKERS, EVENT_BUS_QUEUE_SIZE,
+EVENT_BUS_OVERFLOW, EVENT_BUS_SPILL_DIR and EVENT_LOG_DIR (empty = no log)
+in the environment.
 
 Design goals: minimal deps, easy to test, no Django signals coupling.
 """
 
 from __future__ import annotations
-from typing import Callable, Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional, Sequence, Tuple
 from dataclasses import dataclass, field
+from pathlib import Path
+import json
+import os
+import asyncio
+import inspect
 import threading
 import queue
+import tempfile
 import time
 import uuid
+import zlib
 import logging
+from core.event_log import EventLogError
 
 logger = logging.getLogger(__name__)
 
-EventHandler = Callable[[Dict[str, Any]], None]
+EventHandler = Callable[[Dict[str, Any]], Any]  # plain function or coroutine function
 Middleware = Callable[[Dict[str, Any]], Dict[str, Any]]
 
+OVERFLOW_POLICIES = ("block", "drop-newest", "drop-oldest", "spill")
+
 @dataclass
 class _Registry:
     subs: Dict[str, List[EventHandler]] = field(default_factory=dict)
     before_mw: List[Middleware] = field(default_factory=list)
     after_mw: List[Middleware] = field(default_factory=list)
+    timeouts: Dict[EventHandler, float] = field(default_factory=dict)
+
+class _Dispatch:
+    """Immutable view of a _Registry; only the per-topic memo ever changes."""
+
+    MEMO_MAX = 4096
+
+    def __init__(self, r: Optional[_Registry] = None) -> None:
+        r = r or _Registry()
+        self.exact: Dict[str, Tuple[EventHandler, ...]] = {}
+        self.patterns: List[Tuple[Tuple[str, ...], Tuple[EventHandler, ...]]] = []
+        for topic, hs in r.subs.items():
+            if not hs:
+                continue
+            parts = tuple(topic.split("."))
+            if "*" in parts or "**" in parts:
+                self.patterns.append((parts, tuple(hs)))
+            else:
+                self.exact[topic] = tuple(hs)
+        self.coro = frozenset(h for hs in r.subs.values() for h in hs if _is_coroutine_fn(h))
+        self.timeouts: Dict[EventHandler, float] = dict(r.timeouts)
+        self.before: Tuple[Middleware, ...] = tuple(r.before_mw)
+        self.after: Tuple[Middleware, ...] = tuple(r.after_mw)
+        self._memo: Dict[str, Tuple[EventHandler, ...]] = {}
+
+    def handlers(self, topic: str) -> Tuple[EventHandler, ...]:
+        hs = self._memo.get(topic)
+        if hs is None:
+            # exact subscribers first, then patterns in subscription order
+            parts = topic.split(".")
+            found = list(self.exact.get(topic, ()))
+            for pattern, phs in self.patterns:
+                if topic_matches(pattern, parts):
+                    found += [h for h in phs if h not in found]
+            hs = tuple(found)
+            if len(self._memo) >= self.MEMO_MAX:
+                self._memo = {}
+            self._memo[topic] = hs
+        return hs
+
+def _is_coroutine_fn(h: Any) -> bool:
+    return inspect.iscoroutinefunction(h) or inspect.iscoroutinefunction(getattr(h, "__call__", None))
+
+def topic_matches(pattern: Sequence[str], parts: Sequence[str]) -> bool:
+    """Segment-wise match of a split pattern against a split topic."""
+    if not pattern:
+        return not parts
+    head = pattern[0]
+    if head == "**":
+        return any(topic_matches(pattern[1:], parts[i:]) for i in range(len(parts) + 1))
+    if not parts:
+        return False
+    return (head == "*" or head == parts[0]) and topic_matches(pattern[1:], parts[1:])
 
 class EventBus:
     """
@@ -40,43 +144,72 @@ class EventBus:
         bus.publish("ingest.started", {"path": "/docs"})
     """
 
-    def __init__(self) -> None:
+    def __init__(self, workers: int = 1, queue_size: int = 1000, overflow: str = "block",
+                 block_timeout: Optional[float] = 0.5, spill_dir: Optional[str] = None,
+                 handler_timeout: float = 5.0) -> None:
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
         self._r = _Registry()
         self._lock = threading.RLock()
-        self._q: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=1000)
-        self._worker: Optional[threading.Thread] = None
+        self._snap = _Dispatch()
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.handler_timeout = handler_timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: set = set()
+        self._log = None  # optional core.event_log.EventLog
+        self._spill_dir = Path(spill_dir or Path(tempfile.gettempdir()) / "covenant-event-spill")
+        self._shards = [_Shard(i, queue_size) for i in range(max(1, int(workers)))]
+        self._workers: List[threading.Thread] = []
         self._stop = threading.Event()
+        self._counts = {"enqueued": 0, "processed": 0, "dropped": 0, "spilled": 0, "errors": 0, "timeouts": 0,
+                        "log_errors": 0}
+        self._count_lock = threading.Lock()
 
     # ---------- subscription ----------
 
-    def subscribe(self, topic: str, handler: EventHandler) -> None:
+    def subscribe(self, topic: str, handler: EventHandler, timeout: Optional[float] = None) -> None:
+        """`timeout` (seconds) only applies to coroutine handlers."""
         with self._lock:
-            self._r.subs.setdefault(topic, [])
-            if handler not in self._r.subs[topic]:
-                self._r.subs[topic].append(handler)
+            hs = self._r.subs.setdefault(topic, [])
+            changed = timeout is not None and self._r.timeouts.get(handler) != timeout
+            if changed:
+                self._r.timeouts[handler] = timeout
+            if handler not in hs:
+                hs.append(handler)
+                changed = True
                 logger.debug("Subscribed %s to %s", getattr(handler, "__name__", repr(handler)), topic)
+            if changed:
+                self._rebuild()
 
     def unsubscribe(self, topic: str, handler: EventHandler) -> None:
         with self._lock:
             if topic in self._r.subs and handler in self._r.subs[topic]:
                 self._r.subs[topic].remove(handler)
+                if not any(handler in hs for hs in self._r.subs.values()):
+                    self._r.timeouts.pop(handler, None)
+                self._rebuild()
                 logger.debug("Unsubscribed %s from %s", getattr(handler, "__name__", repr(handler)), topic)
 
     def clear(self) -> None:
         with self._lock:
             self._r.subs.clear()
+            self._r.timeouts.clear()
             self._r.before_mw.clear()
             self._r.after_mw.clear()
+            self._rebuild()
 
     # ---------- middleware ----------
 
     def use_before(self, mw: Middleware) -> None:
         with self._lock:
             self._r.before_mw.append(mw)
+            self._rebuild()
 
     def use_after(self, mw: Middleware) -> None:
         with self._lock:
             self._r.after_mw.append(mw)
+            self._rebuild()
 
     # ---------- publish (sync) ----------
 
@@ -85,108 +218,294 @@ class EventBus:
         Synchronous publish: calls handlers inline (good for tests / deterministic flows).
         Returns the final event dict after middleware.
         """
-        evt = self._make_event(topic, payload, meta)
-        evt = self._run_before(evt)
-        for h in list(self._handlers_for(topic)):
-            try:
-                h(evt)
-            except Exception as e:
-                logger.exception("Handler error for %s: %s", topic, e)
-        evt = self._run_after(evt)
+        return self._dispatch(self._make_event(topic, payload, meta))
+
+    # ---------- publish (asyncio) ----------
+
+    async def publish_async(self, topic: str, payload: Dict[str, Any] | None = None,
+                            meta: Dict[str, Any] | None = None, wait: bool = False) -> Dict[str, Any]:
+        """
+        Publish from a coroutine. Sync handlers run inline (as in publish());
+        coroutine handlers become tasks on the running loop, which is bound
+        for cross-thread delivery. wait=True awaits those tasks.
+        """
+        self._loop = asyncio.get_running_loop()
+        tasks: List[asyncio.Task] = []
+        evt = self._dispatch(self._make_event(topic, payload, meta), tasks)
+        if wait and tasks:
+            await asyncio.gather(*tasks)
         return evt
 
+    def attach_log(self, log) -> None:
+        """Persist every new event to `log` (a core.event_log.EventLog); None detaches."""
+        self._log = log
+
+    @property
+    def log(self):
+        return self._log
+
+    def bind_loop(self, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        """Loop that runs coroutine handlers for events published off-loop."""
+        self._loop = loop
+
+    async def adrain(self, timeout: float = 5.0) -> bool:
+        """Wait for pending coroutine handlers on this loop. True if all finished."""
+        loop = asyncio.get_running_loop()
+        pending = [t for t in self._tasks if t.get_loop() is loop]
+        if not pending:
+            return True
+        _, still = await asyncio.wait(pending, timeout=timeout)
+        return not still
+
     # ---------- enqueue (async) ----------
 
-    def enqueue(self, topic: str, payload: Dict[str, Any] | None = None, meta: Dict[str, Any] | None = None) -> None:
+    def enqueue(self, topic: str, payload: Dict[str, Any] | None = None, meta: Dict[str, Any] | None = None) -> bool:
         """
         Enqueue event for background processing (requires start()).
-        If queue is full, this blocks briefly and then drops with a warning (to avoid OOM).
+        A full shard is handled per the overflow policy (see module doc);
+        with "spill", keep payloads JSON-serializable if handlers need the
+        exact values back.
+        Returns False if this event was dropped.
         """
         evt = self._make_event(topic, payload, meta)
-        try:
-            self._q.put(evt, timeout=0.5)
-        except queue.Full:
-            logger.warning("Event queue full; dropping event: %s", topic)
+        shard = self._shards[zlib.crc32(topic.encode()) % len(self._shards)]
+        if self.overflow == "spill":
+            with shard.lock:
+                if shard.spilling or not self._offer(shard, evt):
+                    self._spill(shard, evt)
+            return True
+        if self._offer(shard, evt):
+            return True
+        if self.overflow == "drop-oldest":
+            while True:
+                try:
+                    shard.q.get_nowait()
+                    shard.q.task_done()
+                    self._count("dropped")
+                except queue.Empty:
+                    pass
+                if self._offer(shard, evt):
+                    return True
+        if self.overflow == "block":
+            try:
+                shard.q.put(evt, timeout=self.block_timeout)
+                self._count("enqueued")
+                return True
+            except queue.Full:
+                pass
+        self._count("dropped")
+        logger.warning("Event queue full; dropping event: %s", topic)
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._count_lock:
+            out: Dict[str, Any] = dict(self._counts)
+        out["queued"] = sum(s.q.qsize() for s in self._shards)
+        out["spilling"] = sum(1 for s in self._shards if s.spilling)
+        out["workers"] = len(self._shards)
+        out["overflow"] = self.overflow
+        if self._log is not None:
+            out["log_seq"] = self._log.last_seq
+            out["log_durable_seq"] = self._log.durable_seq
+        return out
+
+    def drain(self, timeout: float = 5.0) -> bool:
+        """Wait until every queued (and spilled) event was handled. True if drained."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if all(s.q.unfinished_tasks == 0 and not s.spilling for s in self._shards):
+                return True
+            time.sleep(0.01)
+        return False
 
     # ---------- worker lifecycle ----------
 
     def start(self) -> None:
         """
-        Starts a single background worker thread that drains the queue and
-        delivers events to subscribers. Idempotent.
+        Starts one background worker thread per shard that drains its queue
+        and delivers events to subscribers. Idempotent.
         """
         with self._lock:
-            if self._worker and self._worker.is_alive():
+            if self._workers and all(w.is_alive() for w in self._workers):
                 return
             self._stop.clear()
-            self._worker = threading.Thread(target=self._run, name="covenant-event-worker", daemon=True)
-            self._worker.start()
-            logger.info("EventBus worker started")
+            self._workers = [
+                threading.Thread(target=self._run, args=(s,), name=f"covenant-event-worker-{s.index}", daemon=True)
+                for s in self._shards
+            ]
+            for w in self._workers:
+                w.start()
+            logger.info("EventBus started %d worker(s)", len(self._workers))
 
     def stop(self) -> None:
         with self._lock:
             self._stop.set()
-        if self._worker:
-            self._worker.join(timeout=2.0)
-            logger.info("EventBus worker stopped")
+        for w in self._workers:
+            w.join(timeout=2.0)
+        if self._workers:
+            logger.info("EventBus workers stopped")
 
     # ---------- internals ----------
 
-    def _run(self) -> None:
+    def _run(self, shard: "_Shard") -> None:
         while not self._stop.is_set():
             try:
-                evt = self._q.get(timeout=0.25)
+                evt = shard.q.get(timeout=0.25)
             except queue.Empty:
+                if shard.spilling:
+                    self._unspill(shard)
                 continue
             try:
-                evt = self._run_before(evt)
-                for h in list(self._handlers_for(evt["topic"])):
-                    try:
-                        h(evt)
-                    except Exception as e:
-                        logger.exception("Handler error for %s: %s", evt["topic"], e)
-                evt = self._run_after(evt)
+                self._deliver(evt)
             finally:
-                self._q.task_done()
+                shard.q.task_done()
+
+    def _deliver(self, evt: Dict[str, Any]) -> None:
+        self._dispatch(evt)
+        self._count("processed")
+
+    def _dispatch(self, evt: Dict[str, Any], tasks: Optional[List[asyncio.Task]] = None) -> Dict[str, Any]:
+        snap = self._snap  # one read; a concurrent rebuild swaps in a new object
+        evt = self._run_before(evt, snap)
+        for h in snap.handlers(evt["topic"]):
+            if h in snap.coro:
+                task = self._schedule(h, evt, snap.timeouts.get(h, self.handler_timeout))
+                if task is not None and tasks is not None:
+                    tasks.append(task)
+                continue
+            try:
+                h(evt)
+            except Exception as e:
+                self._count("errors")
+                logger.exception("Handler error for %s: %s", evt["topic"], e)
+        return self._run_after(evt, snap)
 
-    def _handlers_for(self, topic: str) -> List[EventHandler]:
-        with self._lock:
-            # exact topic and wildcard prefix (e.g., "ingest.*")
-            handlers = list(self._r.subs.get(topic, []))
-            prefix = topic.split(".")[0] + ".*"
-            handlers += self._r.subs.get(prefix, [])
-            return handlers
+    def _schedule(self, h: EventHandler, evt: Dict[str, Any], timeout: float) -> Optional[asyncio.Task]:
+        async def guarded() -> None:
+            try:
+                await asyncio.wait_for(h(evt), timeout)
+            except asyncio.TimeoutError:
+                self._count("timeouts")
+                logger.warning("Async handler timed out after %.1fs for %s", timeout, evt["topic"])
+            except Exception as e:
+                self._count("errors")
+                logger.exception("Handler error for %s: %s", evt["topic"], e)
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is not None:
+            task = running.create_task(guarded())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            return task
+        loop = self._loop
+        if loop is not None and loop.is_running() and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(guarded(), loop)
+        else:
+            asyncio.run(guarded())  # no live loop anywhere: run to completion here
+        return None
+
+    def _rebuild(self) -> None:
+        # caller holds self._lock
+        self._snap = _Dispatch(self._r)
+
+    def _offer(self, shard: "_Shard", evt: Dict[str, Any]) -> bool:
+        try:
+            shard.q.put_nowait(evt)
+        except queue.Full:
+            return False
+        self._count("enqueued")
+        return True
+
+    def _spill(self, shard: "_Shard", evt: Dict[str, Any]) -> None:
+        # caller holds shard.lock
+        self._spill_dir.mkdir(parents=True, exist_ok=True)
+        with open(shard.spill_path(self._spill_dir), "a", encoding="utf-8") as f:
+            f.write(json.dumps(evt, default=str) + "\n")
+        shard.spilling = True
+        self._count("spilled")
+
+    def _unspill(self, shard: "_Shard") -> None:
+        # the shard keeps spilling while we replay, so newer events can't
+        # overtake the ones on disk; stop only once the file stayed empty
+        path = shard.spill_path(self._spill_dir)
+        draining = path.with_suffix(".draining")
+        with shard.lock:
+            if not path.exists():
+                shard.spilling = False
+                return
+            os.replace(path, draining)
+        with open(draining, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    self._deliver(json.loads(line))
+        draining.unlink()
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._count_lock:
+            self._counts[key] += n
+
+    def _handlers_for(self, topic: str) -> Tuple[EventHandler, ...]:
+        return self._snap.handlers(topic)
 
     def _make_event(self, topic: str, payload: Optional[Dict[str, Any]], meta: Optional[Dict[str, Any]]) -> Dict[str, Any]:
-        return {
+        evt = {
             "id": str(uuid.uuid4()),
             "ts": time.time(),
             "topic": topic,
             "payload": payload or {},
             "meta": meta or {},
         }
+        if self._log is not None:
+            try:
+                self._log.append(evt)  # sets evt["seq"]
+            except EventLogError as e:
+                self._count("log_errors")
+                logger.error("Event not logged, dispatching anyway: %s (%s)", topic, e)
+        return evt
 
-    def _run_before(self, evt: Dict[str, Any]) -> Dict[str, Any]:
-        with self._lock:
-            for mw in self._r.before_mw:
-                try:
-                    evt = mw(evt)
-                except Exception as e:
-                    logger.exception("before middleware error: %s", e)
+    def _run_before(self, evt: Dict[str, Any], snap: Optional[_Dispatch] = None) -> Dict[str, Any]:
+        for mw in (snap or self._snap).before:
+            try:
+                evt = mw(evt)
+            except Exception as e:
+                logger.exception("before middleware error: %s", e)
         return evt
 
-    def _run_after(self, evt: Dict[str, Any]) -> Dict[str, Any]:
-        with self._lock:
-            for mw in self._r.after_mw:
-                try:
-                    evt = mw(evt)
-                except Exception as e:
-                    logger.exception("after middleware error: %s", e)
+    def _run_after(self, evt: Dict[str, Any], snap: Optional[_Dispatch] = None) -> Dict[str, Any]:
+        for mw in (snap or self._snap).after:
+            try:
+                evt = mw(evt)
+            except Exception as e:
+                logger.exception("after middleware error: %s", e)
         return evt
 
 
+@dataclass
+class _Shard:
+    index: int
+    maxsize: int
+    q: "queue.Queue[Dict[str, Any]]" = field(init=False)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    spilling: bool = False
+
+    def __post_init__(self) -> None:
+        self.q = queue.Queue(maxsize=self.maxsize)
+
+    def spill_path(self, spill_dir: Path) -> Path:
+        return spill_dir / f"spill-{os.getpid()}-{self.index}.jsonl"
+
+
 # Singleton bus for the app. Import as: from core.event_bus import bus
-bus = EventBus()
+bus = EventBus(
+    workers=int(os.getenv("EVENT_BUS_WORKERS", "1")),
+    queue_size=int(os.getenv("EVENT_BUS_QUEUE_SIZE", "1000")),
+    overflow=os.getenv("EVENT_BUS_OVERFLOW", "block"),
+    spill_dir=os.getenv("EVENT_BUS_SPILL_DIR") or None,
+    handler_timeout=float(os.getenv("EVENT_BUS_HANDLER_TIMEOUT", "5")),
+)
 
 # Example middleware (safe no-op; uncomment to use)
 # def tag_source(evt):
@@ -194,3 +513,9 @@ bus = EventBus()
 #     return evt
 # bus.use_before(tag_source)
 
+if os.getenv("EVENT_LOG_DIR"):
+    from core.event_log import EventLog
+    import atexit
+
+    bus.attach_log(EventLog(os.environ["EVENT_LOG_DIR"]))
+    atexit.register(bus.log.close)
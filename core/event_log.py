@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+Covenant Mobile v9.1 — core/event_log.py
+
+Durable, append-only event log behind the EventBus (see bus.attach_log()).
+
+- events are JSON lines in segment files named by their first sequence
+  number (00000000000000000001.jsonl, ...), rotated at `segment_bytes`
+- append() only assigns the next `seq` (also set on the event itself) and
+  queues the line; a writer thread writes and fsyncs in batches of up to
+  `fsync_every` lines or every `fsync_interval` seconds (group commit), so
+  producers never wait on the disk. flush() waits for durability.
+- a failed write (disk full, I/O error) is rolled back and the batch goes
+  back to the head of the queue; the writer retries with backoff, and
+  until a write succeeds again append() and flush() raise EventLogError
+  instead of accepting events that may never become durable
+- on open, a torn last line (crash mid-write) is truncated away
+- replay(after=seq) yields events with a larger seq; named cursors
+  (cursor/commit/catch_up) let subscribers such as audit or KPI aggregation
+  resume where they stopped, at-least-once
+- prune() drops segments every cursor has moved past
+
+Design goals: no deps beyond stdlib, no Django coupling (like event_bus).
+"""
+
+from __future__ import annotations
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from pathlib import Path
+import json
+import os
+import re
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+_SEGMENT = re.compile(r"^(\d{20})\.jsonl$")
+_CURSOR = re.compile(r"^\w[\w.-]*$")
+
+RETRY_MAX = 5.0  # seconds between write retries, at most
+
+class EventLogError(RuntimeError):
+    """The writer cannot persist events (the last write failed)."""
+
+class EventLog:
+    def __init__(self, path: str | Path, segment_bytes: int = 16 << 20,
+                 fsync_every: int = 256, fsync_interval: float = 0.2) -> None:
+        self.dir = Path(path)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        (self.dir / "cursors").mkdir(exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.fsync_every = max(1, fsync_every)
+        self.fsync_interval = fsync_interval
+        self._cond = threading.Condition()
+        self._pending: List[Tuple[int, str]] = []
+        self._seq = self._recover()
+        self._durable = self._seq
+        self._fh = None
+        self._size = 0
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._writer = threading.Thread(target=self._run, name="covenant-event-log", daemon=True)
+        self._writer.start()
+
+    # ---------- write ----------
+
+    def append(self, evt: Dict[str, Any]) -> int:
+        """
+        Assign the next seq (stored as evt["seq"]) and queue the event. Never
+        blocks on I/O; raises EventLogError while writes are failing.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("event log is closed")
+            self._raise_failed()
+            self._seq += 1
+            evt["seq"] = self._seq
+            self._pending.append((self._seq, json.dumps(evt, default=str, separators=(",", ":"))))
+            if len(self._pending) >= self.fsync_every:
+                self._cond.notify_all()
+            return self._seq
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Wait until everything appended so far is fsynced. True on success,
+        False on timeout; raises EventLogError if the writer fails meanwhile.
+        """
+        with self._cond:
+            target = self._seq
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: self._durable >= target or self._error is not None, timeout)
+            if self._durable >= target:
+                return True
+            self._raise_failed()
+            return False
+
+    def close(self) -> None:
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join(timeout=10)
+        if self._fh:
+            self._fh.close()
+            self._fh = None
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    @property
+    def durable_seq(self) -> int:
+        return self._durable
+
+    # ---------- read ----------
+
+    def replay(self, after: int = 0, pattern: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Durable events with seq > `after`, oldest first, optionally filtered by topic pattern."""
+        from core.event_bus import topic_matches
+
+        parts = tuple(pattern.split(".")) if pattern else None
+        segs = self._segments()
+        for i, (first, path) in enumerate(segs):
+            if i + 1 < len(segs) and segs[i + 1][0] <= after + 1:
+                continue  # whole segment is at or before the cursor
+            try:
+                f = open(path, encoding="utf-8")
+            except FileNotFoundError:
+                continue  # pruned meanwhile
+            with f:
+                for line in f:
+                    if not line.endswith("\n"):
+                        break  # still being written
+                    evt = json.loads(line)
+                    if evt["seq"] <= after:
+                        continue
+                    if parts is None or topic_matches(parts, evt["topic"].split(".")):
+                        yield evt
+
+    # ---------- cursors ----------
+
+    def cursor(self, name: str) -> int:
+        try:
+            return int((self.dir / "cursors" / self._cursor_name(name)).read_text().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def commit(self, name: str, seq: int) -> None:
+        path = self.dir / "cursors" / self._cursor_name(name)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(str(int(seq)))
+        os.replace(tmp, path)
+
+    def catch_up(self, name: str, handler: Callable[[Dict[str, Any]], None],
+                 pattern: Optional[str] = None, commit_every: int = 100) -> int:
+        """
+        Feed every event after cursor `name` to handler, committing as it goes.
+        If the handler raises, the cursor stays on the last handled event and
+        the error propagates. Returns the number of events handled.
+        """
+        n, last = 0, self.cursor(name)
+        try:
+            for evt in self.replay(last, pattern):
+                handler(evt)
+                n, last = n + 1, evt["seq"]
+                if n % commit_every == 0:
+                    self.commit(name, last)
+        finally:
+            self.commit(name, last)
+        return n
+
+    def prune(self) -> int:
+        """Delete segments that every cursor has fully consumed. Returns segments removed."""
+        names = [p for p in (self.dir / "cursors").iterdir() if not p.name.endswith(".tmp")]
+        if not names:
+            return 0
+        low = min(self.cursor(p.name) for p in names)
+        segs = self._segments()
+        removed = 0
+        for (first, path), (nxt, _) in zip(segs, segs[1:]):  # never the active segment
+            if nxt - 1 <= low:
+                path.unlink()
+                removed += 1
+        return removed
+
+    # ---------- internals ----------
+
+    def _raise_failed(self) -> None:
+        # caller holds self._cond
+        if self._error is not None:
+            raise EventLogError(f"event log write failed: {self._error}") from self._error
+
+    def _run(self) -> None:
+        delay = 0.0
+        while True:
+            with self._cond:
+                if delay:
+                    self._cond.wait(delay)
+                elif len(self._pending) < self.fsync_every and not self._closed:
+                    self._cond.wait(self.fsync_interval)
+                batch, self._pending = self._pending, []
+                closed = self._closed
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    logger.exception("event log write failed (seq %d-%d): %s", batch[0][0], batch[-1][0], e)
+                    with self._cond:
+                        self._pending[:0] = batch  # retry first, in order
+                        self._error = e
+                        self._cond.notify_all()
+                    if closed:
+                        logger.error("event log closed with %d events not written", len(batch))
+                        return
+                    delay = min(RETRY_MAX, delay * 2 or 0.05)
+                    continue
+                delay = 0.0
+                with self._cond:
+                    self._durable = batch[-1][0]
+                    self._error = None
+                    self._cond.notify_all()
+            elif closed:
+                return
+
+    def _write(self, batch: List[Tuple[int, str]]) -> None:
+        if self._fh is None:
+            self._rotate(batch[0][0])
+        mark = (Path(self._fh.name), self._size)
+        try:
+            self._append_lines(batch)
+        except BaseException:
+            self._rollback(batch[0][0], mark)
+            raise
+
+    def _rollback(self, first_seq: int, mark: Tuple[Path, int]) -> None:
+        """Undo a partly written batch so retrying it cannot duplicate lines."""
+        try:
+            self._fh.close()
+        except Exception:
+            pass
+        self._fh = None
+        try:
+            for seq, path in self._segments():
+                if seq >= first_seq:  # rotated into during this batch
+                    path.unlink()
+            path, size = mark
+            if path.exists():
+                with open(path, "r+b") as f:
+                    f.truncate(size)
+        except OSError as e:
+            logger.error("event log rollback failed: %s", e)
+
+    def _append_lines(self, batch: List[Tuple[int, str]]) -> None:
+        for seq, line in batch:
+            data = line + "\n"
+            if self._fh is None or self._size >= self.segment_bytes:
+                self._rotate(seq)
+            self._fh.write(data)
+            self._size += len(data.encode("utf-8"))
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+
+    def _rotate(self, next_seq: int) -> None:
+        if self._fh is not None:
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            self._fh.close()
+            path = self.dir / f"{next_seq:020d}.jsonl"
+        else:
+            segs = self._segments()
+            # reopen the last segment if it still has room
+            if segs and segs[-1][1].stat().st_size < self.segment_bytes:
+                path = segs[-1][1]
+            else:
+                path = self.dir / f"{next_seq:020d}.jsonl"
+        self._fh = open(path, "a", encoding="utf-8")
+        self._size = path.stat().st_size
+
+    def _segments(self) -> List[Tuple[int, Path]]:
+        out = []
+        for p in self.dir.iterdir():
+            m = _SEGMENT.match(p.name)
+            if m:
+                out.append((int(m.group(1)), p))
+        return sorted(out)
+
+    def _recover(self) -> int:
+        """Last durable seq; truncates a torn tail line of the last segment."""
+        segs = self._segments()
+        if not segs:
+            return 0
+        first, path = segs[-1]
+        last, good = first - 1, 0
+        with open(path, "rb") as f:
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                try:
+                    last = json.loads(raw)["seq"]
+                except (ValueError, KeyError):
+                    break
+                good += len(raw)
+        if good != path.stat().st_size:
+            logger.warning("event log: truncating torn tail of %s at byte %d", path.name, good)
+            with open(path, "r+b") as f:
+                f.truncate(good)
+        return last
+
+    @staticmethod
+    def _cursor_name(name: str) -> str:
+        if not _CURSOR.match(name):
+            raise ValueError(f"invalid cursor name: {name!r}")
+        return name
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+Covenant Mobile v9.1 — core/fts.py
+SQLite FTS5 backend: ranking (bm25) and snippet extraction run inside SQLite,
+so only ids, scores and short snippets cross into Python.
+
+The documents_fts table is an external-content mirror of `documents`
+(see store/migrations/0003_documents_fts.py) keyed on the implicit rowid.
+VACUUM can renumber those rowids; run `manage.py rebuild_index` afterwards.
+"""
+from __future__ import annotations
+from typing import List, Tuple
+from django.db import connection
+from core.bm25 import query_terms
+
+# column weights: title, content, policy_tags
+WEIGHTS = (4.0, 1.0, 2.0)
+SNIPPET_TOKENS = 64
+
+def match_expr(query: str) -> str:
+    """OR of quoted terms; quoting keeps FTS5 operators in user input inert."""
+    return " OR ".join(f'"{t}"' for t in query_terms(query))
+
+def search(query: str, top_k: int = 5) -> List[Tuple[str, float, str]]:
+    """Top-k as [(doc_id, score, snippet)], best first (score = -bm25)."""
+    expr = match_expr(query)
+    if not expr:
+        return []
+    rank = "bm25(documents_fts, %s, %s, %s)" % WEIGHTS
+    sql = (
+        f"SELECT d.id, -{rank}, snippet(documents_fts, 1, '', '', ' … ', {SNIPPET_TOKENS}) "
+        "FROM documents_fts JOIN documents d ON d.rowid = documents_fts.rowid "
+        f"WHERE documents_fts MATCH %s ORDER BY {rank} LIMIT %s"
+    )
+    with connection.cursor() as cur:
+        cur.execute(sql, [expr, max(1, top_k)])
+        return [(doc_id, float(score), snip) for doc_id, score, snip in cur.fetchall()]
+
+def rebuild() -> None:
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cur:
+        cur.execute("INSERT INTO documents_fts(documents_fts) VALUES ('rebuild')")
@@ -9,70 +9,178 @@ ICE (Intelligent Coordinator Engine)
 - Returns a structured result for the UI
 
 Design: simple, synchronous entrypoints with optional async via bus.enqueue later.
+stream_query() is the token-streaming variant of run_query() for SSE views;
+astream_query() is its asyncio twin for ASGI views (retrieval runs in a
+worker thread, generation on the event loop via AsyncHttpLLM; its events
+go through bus.publish_async so coroutine subscribers run as tasks).
+Answers are cached (core/response_cache.py) per question + retrieved
+passages + prompt template; ingest evicts entries citing a changed document.
+Context is packed into the slot's token budget (core/context_packer.py).
+Every run gets a run_id (in event meta and RunResult.meta); the audit writer
+(store/audit.py) chains those events into provenance_log.
 """
 
 from __future__ import annotations
-from typing import Dict, Any, List
+from typing import Dict, Any, AsyncIterator, Iterator, List, Optional
 import logging
+import uuid
+from asgiref.sync import sync_to_async
 from dataclasses import dataclass, field
+from django.conf import settings
 from core.event_bus import bus
-from core.retriever import retrieve
-from providers.http_llm import HttpLLM
+from core.retriever import retrieve_chunks
+from core.response_cache import ResponseCache, make_key
+from core.prompts import query_prompt, slot_for, TEMPLATE_ID
+from core.context_packer import pack_hits
+from core.sse import shed_event
+from providers.async_http_llm import AsyncHttpLLM
+from providers.scheduler import Overloaded
 
 logger = logging.getLogger(__name__)
 
+MAX_TOKENS = 600        # answer length; also reserved out of the context budget
+CANDIDATE_FACTOR = 2    # passages retrieved per top_k slot before packing
+
+# provider failures come back as bracketed text (as the whole answer, or as
+# the last piece of a stream that broke mid-way); never cache those
+PROVIDER_ERRORS = ("[Provider error", "[HTTP ", "[MODEL_ENDPOINT")
+
 @dataclass
 class RunResult:
     ok: bool
     answer: str = ""
-    citations: List[Dict[str, str]] = field(default_factory=list)
+    citations: List[Dict[str, Any]] = field(default_factory=list)
     meta: Dict[str, Any] = field(default_factory=dict)
     error: str = ""
 
+@dataclass
+class _Prepared:
+    prompt: str
+    citations: List[Dict[str, Any]]
+    cache_key: str
+    doc_ids: List[str]
+    slot: Optional[int] = None  # llama-server slot holding this prefix
+
 class ICE:
     """
     Minimal orchestrator facade. Evolve to graph-based workflows later.
     """
 
     def __init__(self):
-        self.llm = HttpLLM()
+        self.llm = AsyncHttpLLM()
+        self.cache = ResponseCache(
+            max_entries=getattr(settings, "RESPONSE_CACHE_SIZE", 256),
+            ttl=getattr(settings, "RESPONSE_CACHE_TTL", 3600),
+            path=getattr(settings, "RESPONSE_CACHE_PATH", "") or None,
+        )
+        bus.subscribe("ingest.document.indexed", self._on_document_indexed)
+        if getattr(settings, "AUDIT_ENABLED", True):
+            from store.audit import audit_writer
+            audit_writer.start()
 
     # ---- public API --------------------------------------------------------
 
-    def run_query(self, question: str, top_k: int = 5) -> RunResult:
+    def run_query(self, question: str, top_k: int = 5, hits: Optional[List[Any]] = None) -> RunResult:
         """
         End-to-end query against local store with LLM composition.
         Emits events for observability and future subscribers.
+        `hits` are pre-retrieved candidates (batch QA retrieves many
+        questions at once); otherwise retrieval runs here.
         """
-        run_meta = {"question": question, "top_k": top_k}
+        run_meta = {"run_id": uuid.uuid4().hex, "question": question, "top_k": top_k}
         bus.publish("run.started", {"stage": "query"}, meta=run_meta)
 
         try:
-            hits = retrieve(question, top_k=top_k)
-            bus.publish("retrieve.done", {"n_hits": len(hits)} , meta=run_meta)
-
-            context = "\n\n".join(
-                f"[{i+1}] {d.title}\n{(d.content or '')[:800]}"
-                for i, (d, _) in enumerate(hits)
-            )
-            prompt = (
-                "You are Covenant. Answer using ONLY the context below. "
-                "If the answer is not present, say you don't know.\n\n"
-                f"Context:\n{context}\n\n"
-                f"Question: {question}\nAnswer:"
-            )
-
-            text = self.llm.generate(prompt, max_tokens=600)
-            citations = [{"title": d.title, "path": d.source_path} for d, _ in hits]
-
-            res = RunResult(ok=True, answer=text, citations=citations, meta={"n_hits": len(hits)})
-            bus.publish("run.completed", {"status": "ok"}, meta={**run_meta, "n_hits": len(hits)})
+            prep = self._prepare(question, top_k, run_meta, hits)
+            text = self._cached(prep, run_meta)
+            status = "hit" if text is not None else "miss"
+            if text is None:
+                text = self.llm.generate(prep.prompt, max_tokens=MAX_TOKENS, slot=prep.slot)
+                self._remember(prep, text)
+
+            n_hits = len(prep.citations)
+            res = RunResult(ok=True, answer=text, citations=prep.citations, meta={"run_id": run_meta["run_id"], "n_hits": n_hits, "cache": status})
+            bus.publish("run.completed", {"status": "ok", "cache": status}, meta={**run_meta, "n_hits": n_hits})
             return res
 
+        except Overloaded as e:
+            bus.publish("run.completed", {"status": "shed", "error": str(e)}, meta=run_meta)
+            return RunResult(ok=False, error=str(e), meta={"run_id": run_meta["run_id"], "retry_after": e.retry_after})
         except Exception as e:
             logger.exception("run_query failed: %s", e)
             bus.publish("run.completed", {"status": "error", "error": str(e)}, meta=run_meta)
-            return RunResult(ok=False, error=str(e))
+            return RunResult(ok=False, error=str(e), meta={"run_id": run_meta["run_id"]})
+
+    def stream_query(self, question: str, top_k: int = 5) -> Iterator[Dict[str, Any]]:
+        """
+        Same pipeline as run_query, but yields events as soon as they exist:
+          {"event": "citations", "data": [...]}   once retrieval is done
+          {"event": "token", "data": "..."}       per generated piece
+          {"event": "done", "data": {...}} or {"event": "error", "data": "..."}
+        A request shed by the LLM scheduler once streaming has started (the
+        view's check() reserves nothing) ends with
+          {"event": "shed", "data": {"error": "...", "retry_after": seconds}}
+        """
+        run_meta = {"run_id": uuid.uuid4().hex, "question": question, "top_k": top_k, "stream": True}
+        bus.publish("run.started", {"stage": "query"}, meta=run_meta)
+        try:
+            prep = self._prepare(question, top_k, run_meta)
+            yield {"event": "citations", "data": prep.citations}
+            text = self._cached(prep, run_meta)
+            status = "hit" if text is not None else "miss"
+            if text is not None:
+                pieces = [text]
+                yield {"event": "token", "data": text}
+            else:
+                pieces, failed = [], False
+                for piece in self.llm.stream(prep.prompt, max_tokens=MAX_TOKENS, slot=prep.slot):
+                    pieces.append(piece)
+                    failed = failed or piece.startswith(PROVIDER_ERRORS)
+                    yield {"event": "token", "data": piece}
+                if not failed:
+                    self._remember(prep, "".join(pieces))
+            n_hits = len(prep.citations)
+            bus.publish("run.completed", {"status": "ok", "cache": status}, meta={**run_meta, "n_hits": n_hits})
+            yield {"event": "done", "data": {"run_id": run_meta["run_id"], "n_hits": n_hits, "n_pieces": len(pieces), "cache": status}}
+        except Overloaded as e:
+            # shed after check(): load shedding, not a failure; no traceback
+            bus.publish("run.completed", {"status": "shed", "error": str(e)}, meta=run_meta)
+            yield shed_event(e)
+        except Exception as e:
+            logger.exception("stream_query failed: %s", e)
+            bus.publish("run.completed", {"status": "error", "error": str(e)}, meta=run_meta)
+            yield {"event": "error", "data": str(e)}
+
+    async def astream_query(self, question: str, top_k: int = 5) -> AsyncIterator[Dict[str, Any]]:
+        """Async variant of stream_query with the same event sequence."""
+        run_meta = {"run_id": uuid.uuid4().hex, "question": question, "top_k": top_k, "stream": True}
+        await bus.publish_async("run.started", {"stage": "query"}, meta=run_meta)
+        try:
+            prep = await sync_to_async(self._prepare)(question, top_k, run_meta)
+            yield {"event": "citations", "data": prep.citations}
+            text = self._cached(prep, run_meta)
+            status = "hit" if text is not None else "miss"
+            if text is not None:
+                pieces = [text]
+                yield {"event": "token", "data": text}
+            else:
+                pieces, failed = [], False
+                async for piece in self.llm.astream(prep.prompt, max_tokens=MAX_TOKENS, slot=prep.slot):
+                    pieces.append(piece)
+                    failed = failed or piece.startswith(PROVIDER_ERRORS)
+                    yield {"event": "token", "data": piece}
+                if not failed:
+                    self._remember(prep, "".join(pieces))
+            n_hits = len(prep.citations)
+            await bus.publish_async("run.completed", {"status": "ok", "cache": status}, meta={**run_meta, "n_hits": n_hits})
+            yield {"event": "done", "data": {"run_id": run_meta["run_id"], "n_hits": n_hits, "n_pieces": len(pieces), "cache": status}}
+        except Overloaded as e:
+            await bus.publish_async("run.completed", {"status": "shed", "error": str(e)}, meta=run_meta)
+            yield shed_event(e)
+        except Exception as e:
+            logger.exception("astream_query failed: %s", e)
+            await bus.publish_async("run.completed", {"status": "error", "error": str(e)}, meta=run_meta)
+            yield {"event": "error", "data": str(e)}
 
     def ingest_path(self, path: str) -> RunResult:
         """
@@ -82,6 +190,43 @@ class ICE:
         bus.publish("ingest.requested", {"path": path})
         return RunResult(ok=True, answer=f"Ingestion requested for: {path}")
 
+    # ---- internals ---------------------------------------------------------
+
+    def _prepare(self, question: str, top_k: int, run_meta: Dict[str, Any], hits: Optional[List[Any]] = None) -> _Prepared:
+        """Retrieve passages and build prompt, citations and the cache key."""
+        # over-fetch; the packer keeps what fits the prompt budget
+        if hits is None:
+            hits = retrieve_chunks(question, top_k=top_k * CANDIDATE_FACTOR)
+        bus.publish("retrieve.done", {"n_hits": len(hits)} , meta=run_meta)
+
+        packed = pack_hits(question, hits, MAX_TOKENS, max_passages=top_k)
+        bus.publish("context.packed", {"tokens": packed.tokens, "budget": packed.budget,
+                                       "passages": len(packed.passages), "merged": packed.merged,
+                                       "dropped": packed.dropped}, meta=run_meta)
+        prompt = query_prompt(question, packed.context)
+        return _Prepared(
+            prompt=prompt.text,
+            citations=packed.citations,
+            cache_key=make_key(question, packed.sources, TEMPLATE_ID),
+            doc_ids=[p.doc_id for p in packed.passages],
+            slot=slot_for(prompt.prefix, getattr(settings, "LLM_SLOTS", 2),
+                          getattr(settings, "LLM_SLOT_AFFINITY", False)),
+        )
+
+    def _cached(self, prep: _Prepared, run_meta: Dict[str, Any]):
+        text = self.cache.get(prep.cache_key)
+        bus.publish("cache.hit" if text is not None else "cache.miss", {"key": prep.cache_key[:16]}, meta=run_meta)
+        return text
+
+    def _remember(self, prep: _Prepared, text: str) -> None:
+        if text and not text.startswith(PROVIDER_ERRORS):
+            self.cache.put(prep.cache_key, text, prep.doc_ids)
+
+    def _on_document_indexed(self, evt: Dict[str, Any]) -> None:
+        doc_id = evt["payload"].get("doc_id")
+        if doc_id:
+            self.cache.invalidate_docs([doc_id])
+
 # Singleton orchestrator
 ice = ICE()
 
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Covenant Mobile v9.1 — core/index.py
+Persistent inverted index over Document rows (table: postings + index_stats).
+
+- index_document() / index_documents() are called at ingest time and
+  replace the docs' postings and chunks (overlapping passages, see
+  core/chunker.py)
+- search() reads only the postings for the query terms and ranks with BM25;
+  search_many() does the same for a batch of queries, sharing the postings
+  of terms they have in common
+- term_idfs() exposes corpus IDF for passage-level scoring in the retriever
+Every (re)index or removal publishes "ingest.document.indexed" on commit.
+"""
+from __future__ import annotations
+from typing import Dict, List, Tuple
+import heapq
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+from store.models import Chunk, Document, Posting, IndexStat, Vector
+from core.event_bus import bus
+from core.bm25 import term_frequencies, query_terms, score_postings, idf
+from core.chunker import chunk_text, CHUNK_SIZE, CHUNK_OVERLAP
+
+def _doc_text(doc: Document) -> str:
+    return f"{doc.title}\n{doc.content}"
+
+def write_chunks(doc: Document) -> int:
+    return _write_chunks([doc])
+
+def _write_chunks(docs: List[Document]) -> int:
+    size = getattr(settings, "CHUNK_SIZE", CHUNK_SIZE)
+    overlap = getattr(settings, "CHUNK_OVERLAP", CHUNK_OVERLAP)
+    ids = [d.pk for d in docs]
+    Chunk.objects.filter(doc_id__in=ids).delete()
+    Vector.objects.filter(doc_id__in=ids).delete()  # stale; re-embedded by embed_chunks
+    rows = [Chunk(id=f"{d.pk}:{i}", doc_id=d.pk, ordinal=i, start=sp.start, end=sp.end, text=sp.text)
+            for d in docs for i, sp in enumerate(chunk_text(d.content or "", size=size, overlap=overlap))]
+    Chunk.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+def index_document(doc: Document) -> int:
+    """(Re)index one document. Returns the number of distinct terms written."""
+    return index_documents([doc])
+
+@transaction.atomic
+def index_documents(docs: List[Document]) -> int:
+    """
+    (Re)index a batch of documents with one delete/insert per table and a
+    single index_stats update. Returns the number of postings written.
+    """
+    docs = list(docs)
+    if not docs:
+        return 0
+    ids = [d.pk for d in docs]
+    _write_chunks(docs)
+    old = dict(Posting.objects.filter(doc_id__in=ids).values_list("doc_id", "dl").distinct())
+    Posting.objects.filter(doc_id__in=ids).delete()
+    rows, d_docs, d_len = [], 0, 0
+    for d in docs:
+        tfs = term_frequencies(_doc_text(d))
+        dl = sum(tfs.values())
+        rows += [Posting(term=t, doc_id=d.pk, tf=n, dl=dl) for t, n in tfs.items()]
+        d_docs += (1 if dl else 0) - (1 if d.pk in old else 0)
+        d_len += dl - old.get(d.pk, 0)
+    Posting.objects.bulk_create(rows, batch_size=1000)
+    stat, _ = IndexStat.objects.get_or_create(pk=1)
+    IndexStat.objects.filter(pk=stat.pk).update(
+        n_docs=F("n_docs") + d_docs,
+        total_len=F("total_len") + d_len,
+    )
+    for doc_id in ids:
+        _announce(doc_id)
+    return len(rows)
+
+@transaction.atomic
+def remove_document(doc_id: str) -> None:
+    old = Posting.objects.filter(doc_id=doc_id).values_list("dl", flat=True).first()
+    if old is None:
+        return
+    Posting.objects.filter(doc_id=doc_id).delete()
+    IndexStat.objects.filter(pk=1).update(n_docs=F("n_docs") - 1, total_len=F("total_len") - old)
+    _announce(doc_id)
+
+def _announce(doc_id: str) -> None:
+    transaction.on_commit(lambda: bus.publish("ingest.document.indexed", {"doc_id": doc_id}))
+
+@transaction.atomic
+def rebuild_index() -> int:
+    """Drop and rebuild the whole index from the documents table."""
+    Posting.objects.all().delete()
+    IndexStat.objects.update_or_create(pk=1, defaults={"n_docs": 0, "total_len": 0})
+    n, batch = 0, []
+    for doc in Document.objects.only("id", "title", "content").iterator(chunk_size=500):
+        batch.append(doc)
+        if len(batch) == 500:
+            n += len(batch)
+            index_documents(batch)
+            batch = []
+    index_documents(batch)
+    return n + len(batch)
+
+def search(query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+    """BM25 top-k as [(doc_id, score)], best first."""
+    terms = query_terms(query)
+    if not terms:
+        return []
+    stat = IndexStat.objects.filter(pk=1).first()
+    if not stat or not stat.n_docs:
+        return []
+    avgdl = stat.total_len / stat.n_docs
+    rows = Posting.objects.filter(term__in=terms).values_list("term", "doc_id", "tf", "dl")
+    scores = score_postings(rows.iterator(chunk_size=2000), stat.n_docs, avgdl)
+    return heapq.nlargest(max(1, top_k), scores.items(), key=lambda x: x[1])
+
+def search_many(queries: List[str], top_k: int = 5) -> Tuple[List[List[Tuple[str, float]]], List[Dict[str, float]]]:
+    """
+    search() for several queries at once, reading each distinct term's
+    postings a single time. Returns (rankings, idfs) per query; the idfs
+    equal term_idfs(query_terms(q)) without another query.
+    """
+    per_query = [query_terms(q) for q in queries]
+    stat = IndexStat.objects.filter(pk=1).first()
+    if not stat or not stat.n_docs:
+        return [[] for _ in queries], [{} for _ in queries]
+    avgdl = stat.total_len / stat.n_docs
+    union = sorted({t for terms in per_query for t in terms})
+    postings: Dict[str, List[tuple]] = {}
+    for i in range(0, len(union), 500):
+        rows = Posting.objects.filter(term__in=union[i:i + 500]).values_list("term", "doc_id", "tf", "dl")
+        for row in rows.iterator(chunk_size=2000):
+            postings.setdefault(row[0], []).append(row)
+    rankings, idfs = [], []
+    for terms in per_query:
+        scores = score_postings((r for t in terms for r in postings.get(t, ())), stat.n_docs, avgdl)
+        rankings.append(heapq.nlargest(max(1, top_k), scores.items(), key=lambda x: x[1]) if terms else [])
+        idfs.append({t: idf(stat.n_docs, len(postings[t])) for t in terms if t in postings})
+    return rankings, idfs
+
+def term_idfs(terms: List[str]) -> Dict[str, float]:
+    """Corpus IDF for each term that occurs in the index."""
+    stat = IndexStat.objects.filter(pk=1).first()
+    if not stat or not stat.n_docs or not terms:
+        return {}
+    dfs = Posting.objects.filter(term__in=terms).values_list("term").annotate(n=Count("id"))
+    return {t: idf(stat.n_docs, n) for t, n in dfs}
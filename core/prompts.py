@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Covenant Mobile v9.1 — core/prompts.py
+Prompt assembly as a stable prefix + variable suffix.
+
+llama-server keeps the KV cache of each slot between requests; with
+`cache_prompt` set it only evaluates the part of a new prompt that differs
+from what the slot last saw. Keeping every byte that does not depend on the
+request (system preamble, instructions) at the front, identical across
+calls, means that part is never re-evaluated.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Optional
+import hashlib
+import zlib
+
+SYSTEM_PREAMBLE = (
+    "You are Covenant. Answer using ONLY the context below. "
+    "If the answer is not present, say you don't know.\n\n"
+)
+QUERY_SUFFIX = "Context:\n{context}\n\nQuestion: {question}\nAnswer:"
+
+# changes whenever the template text changes (response cache key)
+TEMPLATE_ID = hashlib.sha1((SYSTEM_PREAMBLE + QUERY_SUFFIX).encode("utf-8")).hexdigest()[:12]
+
+@dataclass(frozen=True)
+class Prompt:
+    prefix: str
+    suffix: str
+
+    @property
+    def text(self) -> str:
+        return self.prefix + self.suffix
+
+def query_prompt(question: str, context: str) -> Prompt:
+    return Prompt(SYSTEM_PREAMBLE, QUERY_SUFFIX.format(context=context, question=question))
+
+def slot_for(prefix: str, n_slots: int, affinity: bool = True) -> Optional[int]:
+    """
+    llama-server slot id for a prefix, or None to let the server pick (it
+    prefers the slot with the longest matching cached prompt). Pinning is
+    stable across processes (crc32), so distinct prefixes such as the ICE
+    preamble and the workflows system prompt keep their own warm slot.
+    """
+    if not affinity or n_slots <= 1:
+        return None
+    return zlib.crc32(prefix.encode("utf-8")) % n_slots
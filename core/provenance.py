@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Covenant Mobile v9.1 — core/provenance.py
+Hash chain for provenance_log rows (written by store/audit.py).
+
+Each row hashes its own fields plus `prev_hash`, the hash of the previous
+step of the same run (GENESIS for step 1), so editing, dropping or
+reordering any step breaks every later link. The timestamp is not hashed
+(the DB assigns it on insert).
+
+Checkpoints seal contiguous id ranges with a Merkle root over the row hashes,
+signed with HMAC and chained to the previous checkpoint's root, so ranges
+can be verified independently (in parallel) and only rows past the last
+checkpoint need re-checking between full runs.
+"""
+from __future__ import annotations
+from typing import Any, Iterable, Iterator, Mapping, Sequence, Tuple
+import hashlib
+import hmac
+import json
+
+GENESIS = ""
+FIELDS = ("run_id", "step_no", "actor", "action", "input_hash", "output_hash", "policy_decision", "prev_hash")
+
+def digest(obj: Any) -> str:
+    """sha256 of the canonical JSON of obj (inputs/outputs are stored as digests)."""
+    raw = json.dumps(obj, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def entry_hash(values: Sequence[Any]) -> str:
+    """Hash of one row given its FIELDS values, in order."""
+    return hashlib.sha256("\x1f".join(map(str, values)).encode("utf-8")).hexdigest()
+
+def row_hash(row: Mapping[str, Any]) -> str:
+    return entry_hash([row[f] for f in FIELDS])
+
+def verify_rows(rows: Iterable[Tuple]) -> Iterator[Tuple[Any, str]]:
+    """
+    Check rows of (id, *FIELDS, hash) ordered by (run_id, step_no).
+    Yields (id, reason) for every row that fails; the chain resumes from the
+    stored hash so one bad row is reported once, not for the rest of the run.
+    """
+    run, step, prev = None, 0, GENESIS
+    for row in rows:
+        rid, values, stored = row[0], row[1:-1], row[-1]
+        run_id, step_no, prev_hash = values[0], values[1], values[-1]
+        if run_id != run:
+            run, step, prev = run_id, 0, GENESIS
+        if step_no != step + 1:
+            yield rid, f"step gap: expected {step + 1}, got {step_no}"
+        elif prev_hash != prev:
+            yield rid, "broken link: prev_hash does not match previous step"
+        elif entry_hash(values) != stored:
+            yield rid, "hash mismatch: row was modified"
+        step, prev = step_no, stored
+
+# ---------- checkpoints ----------
+
+def merkle_root(hashes: Sequence[str]) -> str:
+    """
+    Binary Merkle root over row hashes (domain-separated leaves and nodes; an
+    odd node is paired with itself).
+    """
+    level = [hashlib.sha256(b"\x00" + h.encode("utf-8")).digest() for h in hashes]
+    if not level:
+        return hashlib.sha256(b"").hexdigest()
+    while len(level) > 1:
+        if len(level) % 2:
+            level.append(level[-1])
+        level = [hashlib.sha256(b"\x01" + level[i] + level[i + 1]).digest() for i in range(0, len(level), 2)]
+    return level[0].hex()
+
+def sign(key: str, *parts: Any) -> str:
+    """HMAC-SHA256 over the parts; checkpoints are signed with it."""
+    msg = "\x1f".join(map(str, parts)).encode("utf-8")
+    return hmac.new(key.encode("utf-8"), msg, hashlib.sha256).hexdigest()
+
+def check_signature(key: str, signature: str, *parts: Any) -> bool:
+    return hmac.compare_digest(sign(key, *parts), signature)
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+Covenant Mobile v9.1 — core/response_cache.py
+Response cache for ICE.run_query.
+
+Key = sha256(normalized question, retrieved chunk ids + document versions,
+prompt template id). A re-ingested document gets a new version, so answers
+citing it stop matching even across processes; in-process ingest also
+evicts them eagerly via invalidate_docs().
+
+- in-memory LRU with TTL (thread-safe)
+- optional SQLite persistence (path) shared by restarts / processes
+- stats(): hits, misses, evictions, invalidations, size
+"""
+from __future__ import annotations
+from typing import Any, Dict, Iterable, Optional, Sequence, Set, Tuple
+from collections import OrderedDict
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+
+_WS = re.compile(r"\s+")
+
+def normalize_question(q: str) -> str:
+    return _WS.sub(" ", (q or "").strip().lower()).rstrip("?.! ")
+
+def make_key(question: str, sources: Sequence[Tuple[str, str]], template: str) -> str:
+    """sources: [(chunk_id, doc_version)] in retrieval order."""
+    h = hashlib.sha256()
+    h.update(normalize_question(question).encode("utf-8"))
+    for chunk_id, version in sources:
+        h.update(b"\x00" + chunk_id.encode("utf-8") + b"@" + version.encode("utf-8"))
+    h.update(b"\x01" + template.encode("utf-8"))
+    return h.hexdigest()
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 256, ttl: float = 3600.0, path: Optional[str] = None):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = float(ttl)
+        self._lock = threading.Lock()
+        # key -> (expires_at, value, doc_ids)
+        self._lru: "OrderedDict[str, Tuple[float, Any, Tuple[str, ...]]]" = OrderedDict()
+        self._by_doc: Dict[str, Set[str]] = {}
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.executescript(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS response_cache_docs ("
+                " key TEXT NOT NULL, doc_id TEXT NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS response_cache_docs_doc ON response_cache_docs(doc_id);"
+            )
+
+    # ---------- public API ----------
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            hit = self._lru.get(key)
+            if hit and hit[0] > now:
+                self._lru.move_to_end(key)
+                self._stats["hits"] += 1
+                return hit[1]
+            if hit:
+                self._drop(key)
+            row = self._db_get(key, now)
+            if row is not None:
+                value, doc_ids = row
+                self._store(key, now + self.ttl, value, doc_ids)
+                self._stats["hits"] += 1
+                return value
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, key: str, value: Any, doc_ids: Iterable[str] = ()) -> None:
+        doc_ids = tuple(dict.fromkeys(doc_ids))
+        expires = time.time() + self.ttl
+        with self._lock:
+            self._store(key, expires, value, doc_ids)
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?)",
+                                     (key, json.dumps(value), expires))
+                    self._db.execute("DELETE FROM response_cache_docs WHERE key = ?", (key,))
+                    self._db.executemany("INSERT INTO response_cache_docs VALUES (?, ?)",
+                                         [(key, d) for d in doc_ids])
+
+    def invalidate_docs(self, doc_ids: Iterable[str]) -> int:
+        """Drop every entry that cited any of doc_ids. Returns entries dropped."""
+        dropped: Set[str] = set()
+        with self._lock:
+            for doc_id in doc_ids:
+                for key in list(self._by_doc.get(doc_id, ())):
+                    self._drop(key)
+                    dropped.add(key)
+                if self._db is not None:
+                    with self._db:
+                        for (key,) in self._db.execute(
+                                "SELECT key FROM response_cache_docs WHERE doc_id = ?", (doc_id,)).fetchall():
+                            self._db_delete(key)
+                            dropped.add(key)
+            self._stats["invalidations"] += len(dropped)
+        return len(dropped)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._lru.clear()
+            self._by_doc.clear()
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("DELETE FROM response_cache")
+                    self._db.execute("DELETE FROM response_cache_docs")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "size": len(self._lru),
+                "hit_rate": round(self._stats["hits"] / total, 4) if total else 0.0,
+                "persistent": self._db is not None,
+            }
+
+    # ---------- internals (lock held) ----------
+
+    def _store(self, key: str, expires: float, value: Any, doc_ids: Tuple[str, ...]) -> None:
+        if key in self._lru:
+            self._drop(key)
+        self._lru[key] = (expires, value, doc_ids)
+        for d in doc_ids:
+            self._by_doc.setdefault(d, set()).add(key)
+        while len(self._lru) > self.max_entries:
+            oldest = next(iter(self._lru))
+            self._drop(oldest)
+            self._stats["evictions"] += 1
+
+    def _drop(self, key: str) -> None:
+        entry = self._lru.pop(key, None)
+        if entry is None:
+            return
+        for d in entry[2]:
+            keys = self._by_doc.get(d)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_doc[d]
+
+    def _db_get(self, key: str, now: float) -> Optional[Tuple[Any, Tuple[str, ...]]]:
+        if self._db is None:
+            return None
+        row = self._db.execute("SELECT value, expires_at FROM response_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            with self._db:
+                self._db_delete(key)
+            return None
+        docs = tuple(d for (d,) in self._db.execute(
+            "SELECT doc_id FROM response_cache_docs WHERE key = ?", (key,)))
+        return json.loads(row[0]), docs
+
+    def _db_delete(self, key: str) -> None:
+        self._db.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+        self._db.execute("DELETE FROM response_cache_docs WHERE key = ?", (key,))
@@ -2,24 +2,135 @@
 """
 Covenant Mobile v9.1 — core/retriever.py
 Deterministic, dependency-light retriever over Document rows.
-Upgrade path: FTS5 + sqlite-vec re-rank.
+
+Backends (settings.RETRIEVER_BACKEND):
+- "bm25": persistent inverted index (core/index.py); a query only reads the
+  postings for its terms instead of scanning every document
+- "fts5": SQLite FTS5 MATCH + bm25() (core/fts.py); hits carry a `snippet`
+  attribute and the document body is not loaded
+
+retrieve_chunks() ranks passages (settings.RETRIEVER_MODE):
+- "lexical": candidate documents from the active backend, then their chunks
+  scored with BM25 using corpus IDF
+- "dense": cosine top-k over chunk embeddings (core/dense.py)
+- "hybrid": reciprocal-rank fusion of the two lists
+retrieve_chunks_many() serves a batch of queries, sharing index reads.
 """
 from __future__ import annotations
 from typing import List, Tuple
-from apps.store.models import Document
+import heapq
+import logging
+from django.conf import settings
+from django.db import OperationalError
+from store.models import Chunk, Document
+from core import index, fts, dense
+from core.bm25 import query_terms, score_tfs, term_frequencies
+
+# how many candidate documents to expand into chunks per requested chunk
+CANDIDATE_FACTOR = 3
+# reciprocal-rank fusion constant (Cormack et al.)
+RRF_K = 60
+
+logger = logging.getLogger(__name__)
 
-def retrieve(query: str, top_k: int = 5) -> List[Tuple[Document, int]]:
-    q = (query or "").lower().strip()
-    if not q:
+def retrieve(query: str, top_k: int = 5) -> List[Tuple[Document, float]]:
+    if getattr(settings, "RETRIEVER_BACKEND", "bm25") == "fts5":
+        try:
+            return _retrieve_fts(query, top_k)
+        except OperationalError as e:
+            logger.warning("FTS5 retrieval unavailable (%s); falling back to bm25", e)
+    return _retrieve_bm25(query, top_k)
+
+def _retrieve_bm25(query: str, top_k: int) -> List[Tuple[Document, float]]:
+    ranked = index.search(query, top_k=top_k)
+    if not ranked:
+        return []
+    docs = Document.objects.only("id", "title", "content", "source_path").in_bulk([i for i, _ in ranked])
+    return [(docs[i], score) for i, score in ranked if i in docs]
+
+def _retrieve_fts(query: str, top_k: int) -> List[Tuple[Document, float]]:
+    ranked = fts.search(query, top_k=top_k)
+    if not ranked:
         return []
-    tokens = [t for t in q.split() if t]
-    scored: list[tuple[Document,int]] = []
-    # naive scoring: term counts in title+content
-    for d in Document.objects.all().only("id","title","content","source_path"):
-        text = f"{d.title}\n{d.content}".lower()
-        score = sum(text.count(tok) for tok in tokens[:6])
-        if score > 0:
-            scored.append((d, score))
-    scored.sort(key=lambda x: x[1], reverse=True)
-    return scored[:max(1, top_k)]
+    docs = Document.objects.only("id", "title", "source_path").in_bulk([i for i, _, _ in ranked])
+    hits = []
+    for doc_id, score, snippet in ranked:
+        d = docs.get(doc_id)
+        if d is not None:
+            d.snippet = snippet
+            hits.append((d, score))
+    return hits
+
+def retrieve_chunks(query: str, top_k: int = 5, mode: str | None = None) -> List[Tuple[Chunk, float]]:
+    """Top-k passages as [(Chunk, score)]; chunk.doc is loaded (no content)."""
+    mode = mode or getattr(settings, "RETRIEVER_MODE", "lexical")
+    if mode == "dense":
+        return _dense_chunks(query, top_k)
+    if mode == "hybrid":
+        return _hybrid_chunks(query, top_k)
+    return _lexical_chunks(query, top_k)
+
+def retrieve_chunks_many(queries: List[str], top_k: int = 5) -> List[List[Tuple[Chunk, float]]]:
+    """
+    retrieve_chunks() for a batch of queries (batch QA). With the lexical
+    mode on the bm25 backend, postings of shared terms and the chunks of
+    shared candidate documents are read once for the whole batch; other
+    modes fall back to one retrieve_chunks() per query.
+    """
+    if (getattr(settings, "RETRIEVER_MODE", "lexical") != "lexical"
+            or getattr(settings, "RETRIEVER_BACKEND", "bm25") != "bm25"):
+        return [retrieve_chunks(q, top_k) for q in queries]
+    rankings, idfs = index.search_many(queries, top_k=max(1, top_k) * CANDIDATE_FACTOR)
+    wanted = {doc_id for ranked in rankings for doc_id, _ in ranked}
+    by_doc: dict = {}
+    ids = list(wanted)
+    for i in range(0, len(ids), 500):
+        for c in _chunk_qs().filter(doc_id__in=ids[i:i + 500]):
+            by_doc.setdefault(c.doc_id, []).append(c)
+    out = []
+    for ranked, idfs_ in zip(rankings, idfs):
+        doc_rank = {doc_id: r for r, (doc_id, _) in enumerate(ranked) if doc_id in by_doc}
+        out.append(_rank_chunks([c for d in doc_rank for c in by_doc[d]], doc_rank, idfs_, top_k))
+    return out
+
+def _chunk_qs():
+    return Chunk.objects.select_related("doc").only(
+        "id", "ordinal", "start", "end", "text",
+        "doc__id", "doc__title", "doc__source_path", "doc__updated_at",
+    )
+
+def _lexical_chunks(query: str, top_k: int) -> List[Tuple[Chunk, float]]:
+    docs = retrieve(query, top_k=max(1, top_k) * CANDIDATE_FACTOR)
+    if not docs:
+        return []
+    doc_rank = {d.pk: r for r, (d, _) in enumerate(docs)}
+    idfs = index.term_idfs(query_terms(query))
+    return _rank_chunks(list(_chunk_qs().filter(doc_id__in=list(doc_rank))), doc_rank, idfs, top_k)
+
+def _rank_chunks(chunks: List[Chunk], doc_rank: dict, idfs: dict, top_k: int) -> List[Tuple[Chunk, float]]:
+    if not chunks:
+        return []
+    # lengths in index tokens, the same measure the passage scores use
+    tfs = [term_frequencies(c.text) for c in chunks]
+    avgdl = sum(sum(t.values()) for t in tfs) / len(chunks)
+    scored = [(c, score_tfs(t, idfs, avgdl)) for c, t in zip(chunks, tfs)]
+    scored = [x for x in scored if x[1] > 0] or scored
+    # best passage score first; ties go to the better-ranked document
+    return heapq.nsmallest(
+        max(1, top_k), scored,
+        key=lambda x: (-x[1], doc_rank[x[0].doc_id], x[0].ordinal),
+    )
+
+def _dense_chunks(query: str, top_k: int) -> List[Tuple[Chunk, float]]:
+    ranked = dense.search(query, top_k=max(1, top_k))
+    chunks = _chunk_qs().in_bulk([i for i, _ in ranked])
+    return [(chunks[i], score) for i, score in ranked if i in chunks]
 
+def _hybrid_chunks(query: str, top_k: int) -> List[Tuple[Chunk, float]]:
+    k = max(1, top_k) * CANDIDATE_FACTOR
+    fused: dict = {}
+    for hits in (_lexical_chunks(query, k), _dense_chunks(query, k)):
+        for rank, (c, _) in enumerate(hits):
+            entry = fused.setdefault(c.pk, [c, 0.0])
+            entry[1] += 1.0 / (RRF_K + rank + 1)
+    return heapq.nlargest(max(1, top_k), [(c, s) for c, s in fused.values()], key=lambda x: x[1])
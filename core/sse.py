@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Covenant Mobile v9.1 — core/sse.py
+Server-sent events helpers for the streaming views.
+Each event's data is JSON so token text with newlines survives framing.
+A stream shed by the LLM scheduler ends with a "shed" event carrying
+retry_after (the 200 response has already started).
+"""
+from __future__ import annotations
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, Optional, Union
+import json
+import logging
+from django.http import StreamingHttpResponse
+from providers.scheduler import Overloaded
+
+logger = logging.getLogger(__name__)
+
+def format_event(data: Any, event: Optional[str] = None) -> str:
+    head = f"event: {event}\n" if event else ""
+    return f"{head}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def shed_event(e: Overloaded) -> Dict[str, Any]:
+    """Load shedding after the response started: no 503 possible, so say when to retry."""
+    return {"event": "shed", "data": {"error": str(e), "retry_after": e.retry_after}}
+
+def token_events(pieces: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Wrap a plain text-piece iterator into token/done/error (or shed) events."""
+    n = 0
+    try:
+        for piece in pieces:
+            n += 1
+            yield {"event": "token", "data": piece}
+        yield {"event": "done", "data": {"n_pieces": n}}
+    except Overloaded as e:
+        yield shed_event(e)
+    except Exception as e:
+        logger.exception("stream failed: %s", e)
+        yield {"event": "error", "data": str(e)}
+
+async def atoken_events(pieces: AsyncIterable[str]) -> AsyncIterator[Dict[str, Any]]:
+    """Async twin of token_events() for async provider streams."""
+    n = 0
+    try:
+        async for piece in pieces:
+            n += 1
+            yield {"event": "token", "data": piece}
+        yield {"event": "done", "data": {"n_pieces": n}}
+    except Overloaded as e:
+        yield shed_event(e)
+    except Exception as e:
+        logger.exception("stream failed: %s", e)
+        yield {"event": "error", "data": str(e)}
+
+async def _aformat(events: AsyncIterable[Dict[str, Any]]) -> AsyncIterator[str]:
+    async for e in events:
+        yield format_event(e["data"], e["event"])
+
+def sse_response(events: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]]) -> StreamingHttpResponse:
+    """Sync iterators suit WSGI; async iterators stream on the ASGI event loop."""
+    if hasattr(events, "__aiter__"):
+        body = _aformat(events)
+    else:
+        body = (format_event(e["data"], e["event"]) for e in events)
+    resp = StreamingHttpResponse(body, content_type="text/event-stream")
+    resp["Cache-Control"] = "no-cache"
+    resp["X-Accel-Buffering"] = "no"  # disable proxy buffering (nginx)
+    return resp
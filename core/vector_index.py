@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Covenant Mobile v9.1 — core/vector_index.py
+Dense top-k over a contiguous float32 matrix memory-mapped from disk.
+
+Layout of an index directory:
+  vectors.npy  (n, dim) float32, rows L2-normalised (cosine == dot product)
+  ids.json     row -> chunk id
+  ivf.npz      optional IVF lists: centroids, row order, list offsets
+
+build() never rewrites a file in place (readers may have vectors.npy
+memory-mapped): each file is written to a temp file next to it and swapped
+in with os.replace(), ids.json last, so it is the commit point. load()
+re-reads while ids and rows disagree (a build in between) and raises
+ValueError if they still do; IVF lists that do not cover exactly the
+loaded rows are ignored (brute force) instead of returning wrong ids.
+
+Brute force is exact and fast enough for tens of thousands of rows; build
+with nlist > 0 to probe only the nearest `nprobe` clusters on larger corpora.
+"""
+from __future__ import annotations
+from typing import List, Optional, Sequence, Tuple
+from pathlib import Path
+import json
+import os
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.npy"
+IDS_FILE = "ids.json"
+IVF_FILE = "ivf.npz"
+
+def normalize(m: np.ndarray) -> np.ndarray:
+    m = np.asarray(m, dtype=np.float32)
+    norms = np.linalg.norm(m, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return m / norms
+
+def kmeans(m: np.ndarray, k: int, iters: int = 10, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Spherical k-means. Returns (centroids (k, dim), assignment (n,))."""
+    rng = np.random.default_rng(seed)
+    k = max(1, min(k, len(m)))
+    centroids = m[rng.choice(len(m), size=k, replace=False)].copy()
+    assign = np.zeros(len(m), dtype=np.int32)
+    for _ in range(iters):
+        assign = np.argmax(m @ centroids.T, axis=1).astype(np.int32)
+        for c in range(k):
+            members = m[assign == c]
+            if len(members):
+                centroids[c] = members.mean(axis=0)
+        centroids = normalize(centroids)
+    return centroids, assign
+
+def _top(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.argsort(-scores[part])]
+
+def _replace(target: Path, write) -> None:
+    """Write target through a temp file in the same directory, then swap it in."""
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "wb") as fh:
+            write(fh)
+        os.replace(tmp, target)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+class VectorIndex:
+    def __init__(self, ids: List[str], matrix: np.ndarray,
+                 centroids: Optional[np.ndarray] = None,
+                 order: Optional[np.ndarray] = None,
+                 offsets: Optional[np.ndarray] = None):
+        self.ids = ids
+        self.matrix = matrix
+        self.centroids = centroids
+        self.order = order
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dim(self) -> int:
+        return int(self.matrix.shape[1]) if self.matrix.ndim == 2 else 0
+
+    # ---------- build / load ----------
+
+    @classmethod
+    def build(cls, path: Path, ids: Sequence[str], vectors: np.ndarray, nlist: int = 0) -> "VectorIndex":
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        m = normalize(vectors) if len(ids) else np.zeros((0, 0), dtype=np.float32)
+        _replace(path / VECTORS_FILE, lambda fh: np.save(fh, np.ascontiguousarray(m)))
+        ivf = path / IVF_FILE
+        if nlist > 0 and len(ids) > nlist:
+            centroids, assign = kmeans(m, nlist)
+            order = np.argsort(assign, kind="stable").astype(np.int64)
+            offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=len(centroids)))]).astype(np.int64)
+            _replace(ivf, lambda fh: np.savez(fh, centroids=centroids, order=order, offsets=offsets))
+        elif ivf.exists():
+            ivf.unlink()
+        _replace(path / IDS_FILE, lambda fh: fh.write(json.dumps(list(ids)).encode("utf-8")))
+        return cls.load(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "VectorIndex":
+        path = Path(path)
+        for _ in range(3):
+            ids = json.loads((path / IDS_FILE).read_text())
+            matrix = np.load(path / VECTORS_FILE, mmap_mode="r")
+            n = matrix.shape[0] if matrix.ndim == 2 else 0
+            if len(ids) == n:
+                break
+            # a build swapped vectors.npy but not yet ids.json; read again
+        else:
+            raise ValueError(f"{path}: {len(ids)} ids for {n} vectors")
+        ivf = path / IVF_FILE
+        if ivf.exists():
+            with np.load(ivf) as z:
+                centroids, order, offsets = z["centroids"], z["order"], z["offsets"]
+            if (len(order) == n and len(offsets) == len(centroids) + 1 and offsets[-1] == n
+                    and (not n or int(order.max()) < n)):
+                return cls(ids, matrix, centroids, order, offsets)
+            logger.warning("%s: IVF lists do not match %d rows; searching brute force", path, n)
+        return cls(ids, matrix)
+
+    # ---------- query ----------
+
+    def search(self, query: np.ndarray, top_k: int = 5, nprobe: int = 8) -> List[Tuple[str, float]]:
+        """Cosine top-k as [(id, score)], best first."""
+        if not len(self.ids):
+            return []
+        q = normalize(np.asarray(query, dtype=np.float32).reshape(-1))
+        if self.centroids is None:
+            rows = None
+            scores = self.matrix @ q
+        else:
+            lists = _top(self.centroids @ q, max(1, nprobe))
+            rows = np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in lists])
+            rows.sort()  # sequential reads from the memory map
+            scores = self.matrix[rows] @ q
+        best = _top(scores, top_k)
+        if rows is not None:
+            return [(self.ids[int(rows[i])], float(scores[i])) for i in best]
+        return [(self.ids[int(i)], float(scores[i])) for i in best]
@@ -59,6 +59,7 @@ INSTALLED_APPS = [
 
     # project apps (note the apps.* paths)
     "apps.ui",
+    "store",        # documents, index, provenance (store.models / migrations)
     "apps.store",
     "apps.providers",
     "apps.audit",
@@ -77,6 +78,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'providers.middleware.OverloadedMiddleware',
 ]
 
 ROOT_URLCONF = 'covenant.urls'
@@ -156,10 +158,72 @@ STATICFILES_DIRS = [ BASE_DIR / "apps" / "ui" / "static" ]
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-
-
-
-
-
-
-
+# --- Covenant engine (core/, providers/, store/) ---
+# Retrieval backend for core.retriever: "bm25" (inverted index) or "fts5"
+RETRIEVER_BACKEND = os.getenv("RETRIEVER_BACKEND", "bm25")
+# Passage size/overlap (characters) for chunks written at ingest time
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "800"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
+# Passage ranking for core.retriever.retrieve_chunks: "lexical", "dense" or "hybrid"
+RETRIEVER_MODE = os.getenv("RETRIEVER_MODE", "lexical")
+# Embeddings for dense retrieval: "hash" (local stand-in) or "llama" (/embedding)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "hash")
+EMBEDDING_ENDPOINT = os.getenv("EMBEDDING_ENDPOINT", "")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "llama")
+VECTOR_INDEX_DIR = BASE_DIR / "data" / "index"
+VECTOR_NPROBE = int(os.getenv("VECTOR_NPROBE", "8"))
+# Keep-alive connections per LLM host (match llama-server --parallel)
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "2"))
+# llama-server slots (--parallel); with affinity on, each prompt prefix is
+# pinned to one slot (id_slot) so its KV cache stays warm
+LLM_SLOTS = int(os.getenv("LLM_SLOTS", "2"))
+LLM_SLOT_AFFINITY = env_bool("LLM_SLOT_AFFINITY", False)
+# providers.scheduler: at most LLM_SLOTS generations in flight; requests are
+# shed with 503 once LLM_QUEUE_DEPTH are waiting or the wait would exceed
+# LLM_QUEUE_TIMEOUT seconds
+LLM_QUEUE_DEPTH = int(os.getenv("LLM_QUEUE_DEPTH", "16"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "30"))
+# providers.singleflight: identical requests in flight at once (temperature
+# <= LLM_COALESCE_MAX_TEMPERATURE) share one generation
+LLM_COALESCE = env_bool("LLM_COALESCE", True)
+LLM_COALESCE_MAX_TEMPERATURE = float(os.getenv("LLM_COALESCE_MAX_TEMPERATURE", "0.3"))
+# llama-server -c (split across LLM_SLOTS) for context packing; token counts
+# from "approx" (local estimate) or "llama" (/tokenize on MODEL_ENDPOINT)
+LLM_CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", "4096"))
+TOKEN_COUNTER = os.getenv("TOKEN_COUNTER", "approx")
+# ICE answer cache: LRU size, TTL seconds, optional SQLite file for persistence
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "")
+
+
+
+
+
+
+
+
+# Ingestion: default source folder for IngestorAgent, extraction processes
+# for the pipelined ingester (0 = cpu count - 1) and documents per write
+# transaction; each document's text is capped at INGEST_MAX_DOC_CHARS
+# (0 = no cap; otherwise at most what INGEST_MEMORY_MB can index, about
+# 32 bytes per character) and text in flight / awaiting write is kept near
+# INGEST_MEMORY_MB
+DOCS_PATH = os.getenv("DOCS_PATH", str(BASE_DIR / "data" / "docs"))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "0"))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "200"))
+INGEST_MAX_DOC_CHARS = int(os.getenv("INGEST_MAX_DOC_CHARS", "4000000"))
+INGEST_MEMORY_MB = int(os.getenv("INGEST_MEMORY_MB", "256"))
+# Provenance: ICE run events are hash-chained into provenance_log by a
+# background writer (store/audit.py) in batches of AUDIT_BATCH_SIZE rows
+AUDIT_ENABLED = env_bool("AUDIT_ENABLED", True)
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "0.5"))
+# Signed Merkle checkpoint every N provenance rows (0 = only via
+# `verify_provenance --checkpoint`); HMAC key defaults to SECRET_KEY, and
+# nothing is sealed while that is still DEFAULT_SECRET_KEY
+PROVENANCE_CHECKPOINT_ROWS = int(os.getenv("PROVENANCE_CHECKPOINT_ROWS", "10000"))
+PROVENANCE_SIGNING_KEY = os.getenv("PROVENANCE_SIGNING_KEY", "")
+# a range with id holes is sealed only once rows after it are this many
+# seconds old (a lower id may still be in an uncommitted transaction)
+PROVENANCE_SEAL_LAG = float(os.getenv("PROVENANCE_SEAL_LAG", "60"))
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+asyncio-native HttpLLM for ASGI views.
+
+Same configuration, payloads and per-endpoint dialect cache as HttpLLM, but
+every request goes through the pooled httpx.AsyncClient in
+providers.transport, so one uvicorn worker can keep every llama-server
+slot busy without a thread per request; admission and priority go through
+providers.scheduler and providers.singleflight as for HttpLLM. The inherited sync methods still work
+for non-async callers.
+"""
+from __future__ import annotations
+from typing import Any, AsyncIterator, Dict
+import time
+
+from .http_llm import HttpLLM, DialectMismatch, DIALECT_TTL, LLAMA, OPENAI, MISMATCH_STATUS, _dialects
+from . import transport
+from .scheduler import get_scheduler
+from .singleflight import get_singleflight
+
+class AsyncHttpLLM(HttpLLM):
+
+    # ---------- public API ----------
+
+    async def agenerate(self, prompt: str, **kw) -> str:
+        if not self.cfg.endpoint:
+            return "[MODEL_ENDPOINT not configured]"
+        level = kw.pop("priority", None)
+
+        async def run() -> str:
+            async with get_scheduler().aslot(level):
+                return await self._agenerate_any(prompt, kw)
+
+        flights = get_singleflight()
+        key = flights.key(self.cfg.endpoint, prompt, {"model": self.cfg.model, **kw, "priority": level})
+        return await flights.ado(key, run)
+
+    async def astream(self, prompt: str, **kw) -> AsyncIterator[str]:
+        if not self.cfg.endpoint:
+            yield "[MODEL_ENDPOINT not configured]"
+            return
+        async with get_scheduler().aslot(kw.pop("priority", None)):
+            async for piece in self._astream_any(prompt, kw):
+                yield piece
+
+    async def adialect(self) -> str:
+        hit = _dialects.get(self.cfg.endpoint)
+        if hit and (time.monotonic() - hit[1]) < DIALECT_TTL:
+            return hit[0]
+        d = await self._aprobe()
+        self._remember(d)
+        return d
+
+    async def ahealth(self) -> Dict[str, Any]:
+        info: Dict[str, Any] = {"ok": False, "provider": "AsyncHttpLLM", "endpoint": self.cfg.endpoint}
+        if not self.cfg.endpoint:
+            info["reason"] = "MODEL_ENDPOINT not set"
+            return info
+        for path in ("/health", "/version", "/"):
+            try:
+                r = await transport.aget(f"{self.cfg.endpoint}{path}", timeout=5)
+            except Exception as e:
+                info["reason"] = str(e)
+                continue
+            if r.status_code < 400:
+                info.pop("reason", None)
+                info.update(ok=True, status=r.text[:200], dialect=await self.adialect())
+                return info
+        return info
+
+    # ---------- internals ----------
+
+    async def _aprobe(self) -> str:
+        for path, dialect in (("/props", LLAMA), ("/v1/models", OPENAI)):
+            try:
+                r = await transport.aget(f"{self.cfg.endpoint}{path}", headers=self._headers(), timeout=5)
+                if r.status_code < 400 and isinstance(r.json(), dict):
+                    return dialect
+            except Exception:
+                continue
+        return LLAMA
+
+    async def _agenerate_any(self, prompt: str, kw: Dict[str, Any]) -> str:
+        dialect = await self.adialect()
+        try:
+            return await self._agenerate(dialect, prompt, kw)
+        except DialectMismatch:
+            self.forget_dialect()
+            retry = await self.adialect()
+            if retry == dialect:
+                retry = OPENAI if dialect == LLAMA else LLAMA
+                self._remember(retry)
+            try:
+                return await self._agenerate(retry, prompt, kw)
+            except DialectMismatch as e:
+                self.forget_dialect()
+                return f"[Provider error: {e}]"
+        except Exception as e:
+            self.forget_dialect()
+            return f"[Provider error: {e}]"
+
+    async def _astream_any(self, prompt: str, kw: Dict[str, Any]) -> AsyncIterator[str]:
+        dialect = await self.adialect()
+        for attempt in (dialect, OPENAI if dialect == LLAMA else LLAMA):
+            url, body = self._request(attempt, prompt, kw, stream=True)
+            try:
+                async with transport.astream("POST", url, json=body, headers=self._headers(), timeout=self.cfg.timeout) as r:
+                    if r.status_code in MISMATCH_STATUS:
+                        self.forget_dialect()
+                        continue
+                    if r.status_code >= 400:
+                        await r.aread()
+                        yield f"[HTTP {r.status_code}] {r.text[:200]}"
+                        return
+                    self._remember(attempt)
+                    async for chunk in transport.aiter_sse(r):
+                        piece = self._piece(attempt, chunk)
+                        if piece:
+                            yield piece
+                        if chunk.get("stop"):
+                            break
+                    return
+            except Exception as e:
+                self.forget_dialect()
+                yield f"[Provider error: {e}]"
+                return
+        yield "[Provider error: no supported completion endpoint]"
+
+    async def _agenerate(self, dialect: str, prompt: str, kw: Dict[str, Any]) -> str:
+        url, body = self._request(dialect, prompt, kw)
+        r = await transport.apost(url, json=body, headers=self._headers(), timeout=self.cfg.timeout)
+        if r.status_code in MISMATCH_STATUS:
+            raise DialectMismatch(f"{url} HTTP {r.status_code}")
+        if r.status_code >= 400:
+            return f"[HTTP {r.status_code}] {r.text[:200]}"
+        return self._parse(dialect, r.json())
@@ -4,20 +4,51 @@ HTTP provider that talks to:
 - llama.cpp server (e.g., /completion or /v1/chat/completions)
 - OpenAI-compatible endpoints
 
+The endpoint dialect is probed once (GET /props -> llama.cpp, GET /v1/models
+-> OpenAI-compatible), cached per endpoint for DIALECT_TTL seconds, and
+re-probed when a call fails in a way that suggests the wrong dialect, so
+each generation normally hits exactly one endpoint.
+
+llama.cpp requests set `cache_prompt` so a repeated prompt prefix is served
+from the slot's KV cache; pass slot=<id> to pin a request to a slot
+(`id_slot`). Neither is sent to plain OpenAI-compatible servers.
+
+generate() / stream() run under providers.scheduler (slot limit, priority
+via priority=<level>, load shedding with scheduler.Overloaded); identical
+low-temperature generate() calls in flight at once share one generation
+(providers.singleflight).
+
 Reads env via Django settings:
   MODEL_ENDPOINT: base URL (e.g., http://127.0.0.1:11434 or http://localhost:8080)
   MODEL_NAME:     optional model name for chat APIs
   MODEL_API_KEY:  optional bearer token for secured endpoints
 """
 from __future__ import annotations
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterator, Optional, Tuple
 from dataclasses import dataclass
-import requests
+import threading
+import time
 from django.conf import settings
 
 from .llm_provider import LLMProvider
+from . import transport
+from .scheduler import get_scheduler
+from .singleflight import get_singleflight
 
 DEFAULT_TIMEOUT = 60
+DIALECT_TTL = 300.0
+
+LLAMA = "llama"    # POST /completion
+OPENAI = "openai"  # POST /v1/chat/completions
+# statuses meaning "this server does not speak that API"
+MISMATCH_STATUS = (404, 405, 501)
+
+# endpoint -> (dialect, probed_at); shared by every HttpLLM instance
+_dialects: Dict[str, Tuple[str, float]] = {}
+_dialect_lock = threading.Lock()
+
+class DialectMismatch(Exception):
+    """The endpoint answered in a way that means we are speaking the wrong API."""
 
 @dataclass
 class HttpConfig:
@@ -40,53 +71,39 @@ class HttpLLM(LLMProvider):
     def generate(self, prompt: str, **kw) -> str:
         if not self.cfg.endpoint:
             return "[MODEL_ENDPOINT not configured]"
-        # headers
-        headers = {"Content-Type": "application/json"}
-        if self.cfg.api_key:
-            headers["Authorization"] = f"Bearer {self.cfg.api_key}"
+        level = kw.pop("priority", None)
 
-        # 1) Try llama.cpp style /completion (simple)
-        try:
-            payload = {
-                "prompt": prompt,
-                "n_predict": kw.get("max_tokens", 512),
-                "temperature": kw.get("temperature", 0.2),
-                "stop": kw.get("stop"),
-            }
-            url = f"{self.cfg.endpoint}/completion"
-            r = requests.post(url, json=payload, headers=headers, timeout=self.cfg.timeout)
-            if r.ok:
-                j = r.json()
-                # common llama.cpp field names
-                for key in ("content", "text", "response"):
-                    if key in j and isinstance(j[key], str):
-                        return j[key]
-        except Exception as e:
-            pass
+        def run() -> str:
+            with get_scheduler().slot(level):
+                return self._generate_any(prompt, kw)
 
-        # 2) Try OpenAI-compatible /v1/chat/completions
-        try:
-            data = {
-                "model": kw.get("model", self.cfg.model),
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": kw.get("temperature", 0.2),
-                "max_tokens": kw.get("max_tokens", 512),
-                "top_p": kw.get("top_p", 1.0),
-                "stream": False,
-            }
-            url = f"{self.cfg.endpoint}/v1/chat/completions"
-            r = requests.post(url, json=data, headers=headers, timeout=self.cfg.timeout)
-            if r.ok:
-                j = r.json()
-                if isinstance(j, dict) and "choices" in j and j["choices"]:
-                    return j["choices"][0]["message"]["content"]
-                # some servers return { "text": "..." }
-                if "text" in j:
-                    return j["text"]
-                return str(j)
-            return f"[HTTP {r.status_code}] {r.text[:200]}"
-        except Exception as e:
-            return f"[Provider error: {e}]"
+        flights = get_singleflight()
+        key = flights.key(self.cfg.endpoint, prompt, {"model": self.cfg.model, **kw, "priority": level})
+        return flights.do(key, run)
+
+    def stream(self, prompt: str, **kw) -> Iterator[str]:
+        """Yield text pieces as llama-server / OpenAI SSE chunks arrive."""
+        if not self.cfg.endpoint:
+            yield "[MODEL_ENDPOINT not configured]"
+            return
+        with get_scheduler().slot(kw.pop("priority", None)):
+            yield from self._stream_any(prompt, kw)
+
+    def dialect(self) -> str:
+        """Active endpoint dialect (LLAMA or OPENAI), probing if unknown or expired."""
+        hit = _dialects.get(self.cfg.endpoint)
+        if hit and (time.monotonic() - hit[1]) < DIALECT_TTL:
+            return hit[0]
+        with _dialect_lock:
+            hit = _dialects.get(self.cfg.endpoint)
+            if hit and (time.monotonic() - hit[1]) < DIALECT_TTL:
+                return hit[0]
+            d = self._probe()
+            _dialects[self.cfg.endpoint] = (d, time.monotonic())
+            return d
+
+    def forget_dialect(self) -> None:
+        _dialects.pop(self.cfg.endpoint, None)
 
     def health(self) -> Dict[str, Any]:
         info: Dict[str, Any] = {"ok": False, "provider": "HttpLLM", "endpoint": self.cfg.endpoint}
@@ -98,23 +115,167 @@ class HttpLLM(LLMProvider):
             for path in ("/health", "/version", "/"):
                 url = f"{self.cfg.endpoint}{path}"
                 try:
-                    r = requests.get(url, timeout=5)
+                    r = transport.get(url, timeout=5)
                     if r.ok:
                         info["ok"] = True
                         info["status"] = r.text[:200]
+                        info["dialect"] = self.dialect()
                         return info
                 except Exception:
                     continue
             # If all else fails, mark reachable via a short POST to /completion with small prompt
             try:
-                r = requests.post(f"{self.cfg.endpoint}/completion",
-                                  json={"prompt": "ping", "n_predict": 1},
-                                  timeout=5)
+                r = transport.post(f"{self.cfg.endpoint}/completion",
+                                   json={"prompt": "ping", "n_predict": 1},
+                                   timeout=5)
                 info["ok"] = r.ok
                 info["status"] = "completion ping ok" if r.ok else f"HTTP {r.status_code}"
+                if r.ok:
+                    self._remember(LLAMA)
+                    info["dialect"] = LLAMA
             except Exception as e:
                 info["reason"] = str(e)
         except Exception as e:
             info["reason"] = str(e)
         return info
 
+    # ---------- internals ----------
+
+    def _headers(self) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        if self.cfg.api_key:
+            headers["Authorization"] = f"Bearer {self.cfg.api_key}"
+        return headers
+
+    def _remember(self, dialect: str) -> None:
+        _dialects[self.cfg.endpoint] = (dialect, time.monotonic())
+
+    def _probe(self) -> str:
+        # llama.cpp exposes /props; it also serves /v1/models, so check it first
+        for path, dialect in (("/props", LLAMA), ("/v1/models", OPENAI)):
+            try:
+                r = transport.get(f"{self.cfg.endpoint}{path}", headers=self._headers(), timeout=5)
+                if r.ok and isinstance(r.json(), dict):
+                    return dialect
+            except Exception:
+                continue
+        return LLAMA
+
+    def _request(self, dialect: str, prompt: str, kw: Dict[str, Any], stream: bool = False) -> Tuple[str, Dict[str, Any]]:
+        """(url, json body) for one generation in the given dialect."""
+        if dialect == OPENAI:
+            return f"{self.cfg.endpoint}/v1/chat/completions", self._chat_payload(prompt, kw, stream)
+        return f"{self.cfg.endpoint}/completion", self._completion_payload(prompt, kw, stream)
+
+    def _generate_any(self, prompt: str, kw: Dict[str, Any]) -> str:
+        """Generate in the cached dialect, re-probing once on a dialect mismatch."""
+        dialect = self.dialect()
+        try:
+            return self._generate(dialect, prompt, kw)
+        except DialectMismatch:
+            # server changed or first probe guessed wrong: re-probe, retry once
+            self.forget_dialect()
+            retry = self.dialect()
+            if retry == dialect:
+                retry = OPENAI if dialect == LLAMA else LLAMA
+                self._remember(retry)
+            try:
+                return self._generate(retry, prompt, kw)
+            except DialectMismatch as e:
+                self.forget_dialect()
+                return f"[Provider error: {e}]"
+        except Exception as e:
+            self.forget_dialect()
+            return f"[Provider error: {e}]"
+
+    def _stream_any(self, prompt: str, kw: Dict[str, Any]) -> Iterator[str]:
+        dialect = self.dialect()
+        try:
+            resp = self._open_stream(dialect, prompt, kw)
+        except DialectMismatch:
+            self.forget_dialect()
+            dialect = OPENAI if dialect == LLAMA else LLAMA
+            try:
+                resp = self._open_stream(dialect, prompt, kw)
+                self._remember(dialect)
+            except Exception as e:
+                yield f"[Provider error: {e}]"
+                return
+        except Exception as e:
+            self.forget_dialect()
+            yield f"[Provider error: {e}]"
+            return
+        if not resp.ok:
+            yield f"[HTTP {resp.status_code}] {resp.text[:200]}"
+            return
+        for chunk in transport.iter_sse(resp):
+            piece = self._piece(dialect, chunk)
+            if piece:
+                yield piece
+            if chunk.get("stop"):
+                break
+
+    def _generate(self, dialect: str, prompt: str, kw: Dict[str, Any]) -> str:
+        url, body = self._request(dialect, prompt, kw)
+        r = transport.post(url, json=body, headers=self._headers(), timeout=self.cfg.timeout)
+        if r.status_code in MISMATCH_STATUS:
+            raise DialectMismatch(f"{url} HTTP {r.status_code}")
+        if not r.ok:
+            return f"[HTTP {r.status_code}] {r.text[:200]}"
+        return self._parse(dialect, r.json())
+
+    def _open_stream(self, dialect: str, prompt: str, kw: Dict[str, Any]):
+        url, body = self._request(dialect, prompt, kw, stream=True)
+        r = transport.post(url, json=body, headers=self._headers(), timeout=self.cfg.timeout, stream=True)
+        if r.status_code in MISMATCH_STATUS:
+            r.close()
+            raise DialectMismatch(f"{url} HTTP {r.status_code}")
+        return r
+
+    def _completion_payload(self, prompt: str, kw: Dict[str, Any], stream: bool = False) -> Dict[str, Any]:
+        # llama.cpp style /completion (simple)
+        payload = {
+            "prompt": prompt,
+            "n_predict": kw.get("max_tokens", 512),
+            "temperature": kw.get("temperature", 0.2),
+            "stop": kw.get("stop"),
+            "stream": stream,
+            "cache_prompt": kw.get("cache_prompt", True),
+        }
+        if kw.get("slot") is not None:
+            payload["id_slot"] = int(kw["slot"])
+        return payload
+
+    def _chat_payload(self, prompt: str, kw: Dict[str, Any], stream: bool = False) -> Dict[str, Any]:
+        # OpenAI-compatible /v1/chat/completions
+        return {
+            "model": kw.get("model", self.cfg.model),
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": kw.get("temperature", 0.2),
+            "max_tokens": kw.get("max_tokens", 512),
+            "top_p": kw.get("top_p", 1.0),
+            "stream": stream,
+        }
+
+    @staticmethod
+    def _parse(dialect: str, j: Any) -> str:
+        if dialect == OPENAI:
+            if isinstance(j, dict) and "choices" in j and j["choices"]:
+                return j["choices"][0]["message"]["content"]
+            # some servers return { "text": "..." }
+            if isinstance(j, dict) and "text" in j:
+                return j["text"]
+            return str(j)
+        # common llama.cpp field names
+        for key in ("content", "text", "response"):
+            if isinstance(j, dict) and isinstance(j.get(key), str):
+                return j[key]
+        raise DialectMismatch("unexpected /completion response shape")
+
+    @staticmethod
+    def _piece(dialect: str, chunk: Dict[str, Any]) -> str:
+        """Text carried by one streamed SSE chunk."""
+        if dialect == OPENAI:
+            choices = chunk.get("choices") or [{}]
+            return (choices[0].get("delta") or {}).get("content") or ""
+        return chunk.get("content") or ""
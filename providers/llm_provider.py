@@ -1,10 +1,11 @@
 # -*- coding: utf-8 -*-
 """
 LLMProvider interface for Covenant Mobile.
-Concrete implementations must implement generate() and may implement health().
+Concrete implementations must implement generate() and may implement
+stream() and health().
 """
 from __future__ import annotations
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterator, Optional
 from abc import ABC, abstractmethod
 
 class LLMProvider(ABC):
@@ -13,6 +14,10 @@ class LLMProvider(ABC):
         """Return a text completion given a prompt."""
         raise NotImplementedError
 
+    def stream(self, prompt: str, **kw) -> Iterator[str]:
+        """Yield the completion in pieces as they are produced (default: one piece)."""
+        yield self.generate(prompt, **kw)
+
     def health(self) -> Dict[str, Any]:
         """Optional health info for diagnostics UI."""
         return {"ok": True, "provider": self.__class__.__name__}
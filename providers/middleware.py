@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+"""
+Turns scheduler.Overloaded raised by a view into a fast 503 with
+Retry-After instead of a 500 (or a request left hanging on the server).
+"""
+from __future__ import annotations
+from django.http import JsonResponse
+from django.utils.deprecation import MiddlewareMixin
+from .scheduler import Overloaded
+
+class OverloadedMiddleware(MiddlewareMixin):
+    def process_exception(self, request, exception):
+        if not isinstance(exception, Overloaded):
+            return None
+        resp = JsonResponse({"ok": False, "error": str(exception), "retry_after": exception.retry_after}, status=503)
+        resp["Retry-After"] = str(exception.retry_after)
+        return resp
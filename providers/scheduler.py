@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+Admission control for LLM generations (HttpLLM / AsyncHttpLLM,
+apps.providers.client, ui.services.llm_client).
+
+llama-server decodes at most --parallel requests at once; anything beyond
+that queues inside the server where it cannot be prioritised or shed, and
+a burst makes every request time out together. The scheduler keeps that
+queue on our side:
+- at most `slots` generations in flight (LLM_SLOTS), shared by threads and
+  event loops in this process
+- waiters are served by priority (INTERACTIVE before BATCH), FIFO within a
+  priority; the priority comes from the `priority` kwarg or the current
+  context (`with priority(BATCH): ...`)
+- a request is shed at once (Overloaded -> HTTP 503 via
+  providers.middleware) when `max_queue` requests of its priority or higher
+  are already waiting, or when the expected wait (requests ahead / slots x
+  mean generation time) exceeds `queue_timeout`; a waiter that is not
+  admitted within `queue_timeout` is shed as well
+- stats(): queue wait and generation time percentiles, counters per outcome
+"""
+from __future__ import annotations
+from typing import Any, Dict, Iterator, List, Optional, AsyncIterator
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from django.conf import settings
+
+INTERACTIVE = 0  # chat / ask / QA views
+BATCH = 10       # management commands, background agents
+
+_priority: ContextVar[int] = ContextVar("llm_priority", default=INTERACTIVE)
+
+@contextmanager
+def priority(level: int) -> Iterator[None]:
+    """Run LLM calls made in this context (thread / task) at `level`."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def current_priority(level: Optional[int] = None) -> int:
+    """`level`, or the priority of the current context if None."""
+    return _priority.get() if level is None else level
+
+class Overloaded(Exception):
+    """The request was shed; callers should answer 503 with Retry-After."""
+
+    def __init__(self, reason: str, retry_after: int = 1):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+class _Waiter:
+    __slots__ = ("priority", "t0", "granted", "cancelled", "event", "loop", "future")
+
+    def __init__(self, level: int, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.priority = level
+        self.t0 = time.monotonic()
+        self.granted = False
+        self.cancelled = False
+        self.loop = loop
+        self.event = None if loop else threading.Event()
+        self.future = loop.create_future() if loop else None
+
+    def wake(self) -> None:
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+def _resolve(fut: "asyncio.Future[None]") -> None:
+    if not fut.done():
+        fut.set_result(None)
+
+def _pct(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return round(s[min(len(s) - 1, int(q * len(s)))], 4)
+
+class LLMScheduler:
+    WINDOW = 1024  # samples kept for percentiles
+
+    def __init__(self, slots: int = 2, max_queue: int = 16, queue_timeout: float = 30.0):
+        self.slots = max(1, slots)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._heap: List[Any] = []
+        self._seq = itertools.count()
+        self._active = 0
+        self._waiting: Dict[int, int] = {}
+        self._gen_avg = 0.0
+        self._waits: "deque[float]" = deque(maxlen=self.WINDOW)
+        self._gens: "deque[float]" = deque(maxlen=self.WINDOW)
+        self._counts = {"admitted": 0, "queued": 0, "completed": 0, "shed_queue": 0, "shed_wait": 0,
+                        "shed_timeout": 0, "cancelled": 0}
+
+    # ---------- public API ----------
+
+    def check(self, level: Optional[int] = None) -> None:
+        """Raise Overloaded if a request at `level` would be shed right now (no slot is taken)."""
+        with self._lock:
+            self._shed_reason(self._level(level))
+
+    @contextmanager
+    def slot(self, level: Optional[int] = None) -> Iterator[None]:
+        """Hold one generation slot for the body of the with-block (threads)."""
+        self._await(self._admit(self._level(level)))
+        t0 = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - t0)
+
+    @asynccontextmanager
+    async def aslot(self, level: Optional[int] = None) -> AsyncIterator[None]:
+        """Async twin of slot(); waiting does not block the event loop."""
+        await self._aawait(self._admit(self._level(level), asyncio.get_running_loop()))
+        t0 = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - t0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waits, gens = list(self._waits), list(self._gens)
+            out: Dict[str, Any] = {
+                "slots": self.slots, "active": self._active, "waiting": sum(self._waiting.values()),
+                "max_queue": self.max_queue, "queue_timeout": self.queue_timeout, **self._counts,
+            }
+        out["queue_wait_s"] = {"p50": _pct(waits, 0.5), "p95": _pct(waits, 0.95), "p99": _pct(waits, 0.99)}
+        out["generation_s"] = {"p50": _pct(gens, 0.5), "p95": _pct(gens, 0.95), "p99": _pct(gens, 0.99)}
+        return out
+
+    # ---------- internals ----------
+
+    @staticmethod
+    def _level(level: Optional[int]) -> int:
+        return current_priority(level)
+
+    def _ahead(self, level: int) -> int:
+        return sum(n for p, n in self._waiting.items() if p <= level)
+
+    def _shed_reason(self, level: int) -> None:
+        """Raise Overloaded if a new request at `level` cannot be queued (lock held)."""
+        ahead = self._ahead(level)
+        if self._active < self.slots and not ahead:
+            return
+        if ahead >= self.max_queue:
+            self._counts["shed_queue"] += 1
+            raise Overloaded(f"LLM queue full ({ahead} waiting)", self._retry_after(ahead))
+        expected = (ahead + 1) / self.slots * self._gen_avg
+        if self.queue_timeout and expected > self.queue_timeout:
+            self._counts["shed_wait"] += 1
+            raise Overloaded(f"LLM busy (expected wait {expected:.0f}s)", self._retry_after(ahead))
+
+    def _retry_after(self, ahead: int) -> int:
+        return max(1, int((ahead + 1) / self.slots * (self._gen_avg or 1.0)))
+
+    def _admit(self, level: int, loop: Optional[asyncio.AbstractEventLoop] = None) -> _Waiter:
+        w = _Waiter(level, loop)
+        with self._lock:
+            self._shed_reason(level)
+            if self._active < self.slots and not self._ahead(level):
+                self._grant(w)
+            else:
+                self._waiting[level] = self._waiting.get(level, 0) + 1
+                self._counts["queued"] += 1
+                heapq.heappush(self._heap, (level, next(self._seq), w))
+        return w
+
+    def _grant(self, w: _Waiter) -> None:
+        w.granted = True
+        self._active += 1
+        self._counts["admitted"] += 1
+        self._waits.append(time.monotonic() - w.t0)
+
+    def _release(self, held: Optional[float]) -> None:
+        with self._lock:
+            self._active -= 1
+            if held is not None:
+                self._counts["completed"] += 1
+                self._gens.append(held)
+                self._gen_avg = held if not self._gen_avg else 0.8 * self._gen_avg + 0.2 * held
+            while self._heap and self._active < self.slots:
+                _, _, w = heapq.heappop(self._heap)
+                if w.cancelled:
+                    continue
+                self._waiting[w.priority] -= 1
+                self._grant(w)
+                w.wake()
+
+    def _abandon(self, w: _Waiter, outcome: str) -> bool:
+        """Give up waiting; False if the slot was granted meanwhile (caller owns it)."""
+        with self._lock:
+            if w.granted:
+                return False
+            w.cancelled = True
+            self._waiting[w.priority] -= 1
+            self._counts[outcome] += 1
+            return True
+
+    def _await(self, w: _Waiter) -> None:
+        if w.granted:
+            return
+        w.event.wait(self.queue_timeout or None)
+        if self._abandon(w, "shed_timeout"):
+            raise Overloaded(f"LLM queue wait exceeded {self.queue_timeout:.0f}s", self._retry_after(0))
+
+    async def _aawait(self, w: _Waiter) -> None:
+        if w.granted:
+            return
+        try:
+            await asyncio.wait_for(w.future, self.queue_timeout or None)
+        except asyncio.TimeoutError:
+            if self._abandon(w, "shed_timeout"):
+                raise Overloaded(f"LLM queue wait exceeded {self.queue_timeout:.0f}s", self._retry_after(0))
+        except asyncio.CancelledError:
+            # client went away while queued; hand the slot on if it was just granted
+            if not self._abandon(w, "cancelled"):
+                self._release(None)
+            raise
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler() -> LLMScheduler:
+    """Process-wide scheduler configured from settings (LLM_SLOTS, LLM_QUEUE_*)."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = LLMScheduler(
+                    slots=getattr(settings, "LLM_SLOTS", 2),
+                    max_queue=getattr(settings, "LLM_QUEUE_DEPTH", 16),
+                    queue_timeout=getattr(settings, "LLM_QUEUE_TIMEOUT", 30.0),
+                )
+    return _scheduler
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Single-flight coalescing of identical in-flight LLM requests.
+
+When the same question arrives several times at once (popular question,
+double-submitted form), only the first caller (the leader) generates; the
+others wait on its result and get the same text, or the same exception.
+Nothing is kept after the call finishes, so this is not a cache (ICE's
+ResponseCache is).
+
+- key(): digest of endpoint, prompt/messages and every parameter that
+  changes the output; None (never coalesced) when temperature is above
+  max_temperature, since sampled outputs are expected to differ
+- the scheduler priority is part of the key: followers wait in the
+  leader's queue, so an interactive caller must never follow a batch
+  leader that may be shed or time out
+- do() for threads, ado() for event loops; both share one table, so a
+  sync and an async caller with the same key coalesce too
+- the async leader generates in its own task, so a cancelled leader (client
+  gone) does not cancel the followers' result
+"""
+from __future__ import annotations
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+from concurrent.futures import Future
+import asyncio
+import hashlib
+import json
+import threading
+from django.conf import settings
+from .scheduler import current_priority
+
+T = TypeVar("T")
+
+# request kwargs that do not change the generated text
+IGNORED = ("slot", "id_slot", "cache_prompt", "stream")
+
+class SingleFlight:
+    def __init__(self, max_temperature: float = 0.3, enabled: bool = True):
+        self.max_temperature = max_temperature
+        self.enabled = enabled
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    # ---------- public API ----------
+
+    def key(self, endpoint: str, prompt: Any, params: Dict[str, Any], default_temperature: float = 0.2) -> Optional[str]:
+        """Coalescing key for one request, or None if it must run on its own."""
+        if not self.enabled:
+            return None
+        temperature = params.get("temperature", default_temperature)
+        if temperature is None or float(temperature) > self.max_temperature:
+            return None
+        body = {k: v for k, v in params.items() if k not in IGNORED}
+        body["temperature"] = temperature
+        body["priority"] = current_priority(params.get("priority"))
+        raw = json.dumps([endpoint, prompt, body], sort_keys=True, default=str, separators=(",", ":"))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def do(self, key: Optional[str], fn: Callable[[], T]) -> T:
+        """Run fn() once per key among concurrent callers; everyone gets its result."""
+        if key is None:
+            return fn()
+        fut, leader = self._join(key)
+        if not leader:
+            if fut.owner == threading.get_ident():
+                return fn()  # leader is a task on this thread's event loop; waiting would deadlock
+            return fut.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, fut, exc=e)
+            raise
+        self._finish(key, fut, result)
+        return result
+
+    async def ado(self, key: Optional[str], fn: Callable[[], Awaitable[T]]) -> T:
+        """Async twin of do(); fn is a coroutine function."""
+        if key is None:
+            return await fn()
+        fut, leader = self._join(key)
+        if leader:
+            task = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda t: self._settle(key, fut, t))
+        return await asyncio.shield(asyncio.wrap_future(fut))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"in_flight": len(self._calls), "leaders": self.leaders, "coalesced": self.coalesced}
+
+    # ---------- internals ----------
+
+    def _join(self, key: str):
+        with self._lock:
+            fut = self._calls.get(key)
+            if fut is not None:
+                self.coalesced += 1
+                return fut, False
+            fut = self._calls[key] = Future()
+            fut.owner = threading.get_ident()
+            self.leaders += 1
+            return fut, True
+
+    def _finish(self, key: str, fut: Future, result: Any = None, exc: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self._calls.pop(key, None)
+        if exc is not None:
+            fut.set_exception(exc)
+        else:
+            fut.set_result(result)
+
+    def _settle(self, key: str, fut: Future, task: "asyncio.Future[Any]") -> None:
+        if task.cancelled():
+            self._finish(key, fut, exc=asyncio.CancelledError())
+        elif task.exception() is not None:
+            self._finish(key, fut, exc=task.exception())
+        else:
+            self._finish(key, fut, task.result())
+
+_flights: Optional[SingleFlight] = None
+_flights_lock = threading.Lock()
+
+def get_singleflight() -> SingleFlight:
+    """Process-wide table configured from LLM_COALESCE / LLM_COALESCE_MAX_TEMPERATURE."""
+    global _flights
+    if _flights is None:
+        with _flights_lock:
+            if _flights is None:
+                _flights = SingleFlight(
+                    max_temperature=getattr(settings, "LLM_COALESCE_MAX_TEMPERATURE", 0.3),
+                    enabled=getattr(settings, "LLM_COALESCE", True),
+                )
+    return _flights
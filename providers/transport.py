@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Shared HTTP transport for all LLM clients (HttpLLM, apps.providers.client,
+ui.services.llm_client, embeddings).
+
+One requests.Session per process, created lazily and guarded by a lock:
+- keep-alive connections reused across calls (no TCP handshake per request)
+- connection pool sized by settings.LLM_POOL_SIZE (match llama-server --parallel)
+- per-request timeouts as (connect, read)
+- iter_sse() decodes `data:` lines of streamed (stream=True) responses
+The session is rebuilt after fork so worker processes never share sockets.
+
+Async callers (ASGI views, AsyncHttpLLM) use get_async_client(): one pooled
+httpx.AsyncClient per event loop with the same limits, plus aiter_sse().
+"""
+from __future__ import annotations
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+import asyncio
+import json
+import os
+import threading
+import weakref
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+DEFAULT_TIMEOUT = 60
+CONNECT_TIMEOUT = 5
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_pid: Optional[int] = None
+
+def pool_size() -> int:
+    return max(1, int(getattr(settings, "LLM_POOL_SIZE", 2)))
+
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+def get_session() -> requests.Session:
+    global _session, _pid
+    s = _session
+    if s is not None and _pid == os.getpid():
+        return s
+    with _lock:
+        if _session is None or _pid != os.getpid():
+            s = requests.Session()
+            # bursts beyond pool_maxsize get short-lived extra sockets; only
+            # pool_maxsize connections per host are kept alive
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size(), pool_block=False)
+            s.mount("http://", adapter)
+            s.mount("https://", adapter)
+            s.headers.update({"Connection": "keep-alive"})
+            _session, _pid = s, os.getpid()
+        return _session
+
+def close() -> None:
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+def get_async_client() -> httpx.AsyncClient:
+    """Pooled keep-alive client bound to the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        n = pool_size()
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=None, max_keepalive_connections=n),
+            timeout=httpx.Timeout(DEFAULT_TIMEOUT, connect=CONNECT_TIMEOUT),
+        )
+        _async_clients[loop] = client
+    return client
+
+async def aclose() -> None:
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+def request(method: str, url: str, timeout: Optional[float] = None, **kw) -> requests.Response:
+    return get_session().request(method, url, timeout=(CONNECT_TIMEOUT, timeout or DEFAULT_TIMEOUT), **kw)
+
+def get(url: str, timeout: Optional[float] = None, **kw) -> requests.Response:
+    return request("GET", url, timeout=timeout, **kw)
+
+def post(url: str, timeout: Optional[float] = None, **kw) -> requests.Response:
+    return request("POST", url, timeout=timeout, **kw)
+
+def iter_sse(resp: requests.Response) -> Iterator[Dict[str, Any]]:
+    """Decode server-sent events from a streamed response; stops at [DONE]."""
+    resp.encoding = "utf-8"  # SSE is always UTF-8
+    try:
+        for line in resp.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                return
+            try:
+                yield json.loads(data)
+            except ValueError:
+                continue
+    finally:
+        resp.close()
+
+async def arequest(method: str, url: str, timeout: Optional[float] = None, **kw) -> httpx.Response:
+    t = httpx.Timeout(timeout or DEFAULT_TIMEOUT, connect=CONNECT_TIMEOUT)
+    return await get_async_client().request(method, url, timeout=t, **kw)
+
+async def aget(url: str, timeout: Optional[float] = None, **kw) -> httpx.Response:
+    return await arequest("GET", url, timeout=timeout, **kw)
+
+async def apost(url: str, timeout: Optional[float] = None, **kw) -> httpx.Response:
+    return await arequest("POST", url, timeout=timeout, **kw)
+
+def astream(method: str, url: str, timeout: Optional[float] = None, **kw):
+    """Async context manager yielding a streamed httpx.Response."""
+    t = httpx.Timeout(timeout or DEFAULT_TIMEOUT, connect=CONNECT_TIMEOUT)
+    return get_async_client().stream(method, url, timeout=t, **kw)
+
+async def aiter_sse(resp: httpx.Response) -> AsyncIterator[Dict[str, Any]]:
+    """Async twin of iter_sse() for a streamed httpx.Response."""
+    async for line in resp.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+        try:
+            yield json.loads(data)
+        except ValueError:
+            continue
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""
+Batched, hash-chained provenance persistence (table: provenance_log).
+
+AuditWriter subscribes to every bus event whose meta carries a `run_id`
+(ICE tags run.started / retrieve.done / cache.* / run.completed) and to
+explicit record() calls from AuditAgent. On the request path a bus event
+costs one queue put; chaining (core/provenance.py), hashing and the
+bulk_create of up to `batch_size` rows per transaction happen on the
+writer thread, every `interval` seconds or sooner when a batch fills up.
+Every `checkpoint_rows` rows the writer also seals signed Merkle checkpoints
+(store/checkpoints.py) so verification stays incremental.
+
+Chains survive restarts: a run without an in-memory head (new process,
+LRU-evicted, caller-supplied run_id) continues from its last row in
+provenance_log. A batch that hits a transient database error (locked,
+connection lost) is retried with backoff, never dropped, so no step gaps
+appear. On any other error the batch is written row by row: a row that
+collides with a step another writer already stored is re-chained onto the
+stored head, and a row that still cannot be written rewinds its run's head,
+so the next step of that run links to the last stored one. (record()
+returns the row as first chained; a re-chained row is stored with a new
+step_no and hash.)
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+from collections import OrderedDict
+import atexit
+import logging
+import queue
+import threading
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, connection, transaction
+from core.event_bus import bus
+from core.provenance import GENESIS, FIELDS, digest, entry_hash, row_hash
+from store.checkpoints import seal
+from store.models import ProvenanceLog
+
+logger = logging.getLogger(__name__)
+
+class AuditWriter:
+    MAX_RUNS = 10_000  # chain heads kept in memory (LRU by run)
+    RETRY_MAX = 5.0    # seconds between retries of a batch, at most
+
+    def __init__(self, batch_size: int = 500, interval: float = 0.5, checkpoint_rows: int = 0) -> None:
+        self.batch_size = max(1, batch_size)
+        self.interval = interval
+        self.checkpoint_rows = checkpoint_rows
+        self._unsealed = 0
+        self._q: "queue.SimpleQueue[Tuple[str, Dict[str, Any]]]" = queue.SimpleQueue()
+        self._heads: "OrderedDict[str, Tuple[int, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition()
+        self._pending = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.written = 0
+        self.failed = 0
+        self.retried = 0
+        self.rechained = 0
+
+    # ---------- public API ----------
+
+    def start(self) -> None:
+        """Subscribe to the bus and start the writer thread. Idempotent."""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="covenant-audit-writer", daemon=True)
+            self._thread.start()
+        bus.subscribe("**", self._on_event)
+        atexit.register(self.stop)
+
+    def stop(self) -> None:
+        bus.unsubscribe("**", self._on_event)
+        self.flush()
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def record(self, run_id: str, actor: str, action: str, input: Any = "", output: Any = "",
+               policy_decision: str = "") -> Dict[str, Any]:
+        """Chain one step now (so the caller gets its hash) and queue it for writing."""
+        row = self._chain(run_id, actor, action, digest(input), digest(output), policy_decision)
+        self._put("row", row)
+        return row
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait until everything queued so far is written. True on success."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def stats(self) -> Dict[str, int]:
+        return {"written": self.written, "failed": self.failed, "retried": self.retried,
+                "rechained": self.rechained, "pending": self._pending}
+
+    # ---------- internals ----------
+
+    def _on_event(self, evt: Dict[str, Any]) -> None:
+        if evt["meta"].get("run_id"):
+            self._put("evt", evt)
+
+    def _put(self, kind: str, item: Dict[str, Any]) -> None:
+        with self._idle:
+            self._pending += 1
+        self._q.put((kind, item))
+
+    def _chain(self, run_id: str, actor: str, action: str, input_hash: str, output_hash: str,
+               policy_decision: str) -> Dict[str, Any]:
+        with self._lock:
+            head = self._heads.pop(run_id, None)
+            step, prev = head if head is not None else self._stored_head(run_id)
+            row = dict(zip(FIELDS, (run_id, step + 1, actor, action, input_hash, output_hash,
+                                    str(policy_decision), prev)))
+            row["hash"] = entry_hash([row[f] for f in FIELDS])
+            self._heads[run_id] = (step + 1, row["hash"])
+            while len(self._heads) > self.MAX_RUNS:
+                self._heads.popitem(last=False)
+        return row
+
+    def _from_event(self, evt: Dict[str, Any]) -> Dict[str, Any]:
+        meta, payload = evt["meta"], evt["payload"]
+        return self._chain(
+            meta["run_id"],
+            meta.get("actor", "ice"),
+            evt["topic"],
+            digest({k: v for k, v in meta.items() if k != "run_id"}),
+            digest(payload),
+            payload.get("policy_decision", ""),
+        )
+
+    @staticmethod
+    def _stored_head(run_id: str) -> Tuple[int, str]:
+        """(step_no, hash) of the run's last stored row, or (0, GENESIS)."""
+        last = (ProvenanceLog.objects.filter(run_id=run_id).order_by("-step_no")
+                .values_list("step_no", "hash").first())
+        return last if last else (0, GENESIS)
+
+    def _run(self) -> None:
+        rows: List[ProvenanceLog] = []
+        delay = 0.0
+        try:
+            while not self._stop.is_set():
+                if not rows:
+                    try:
+                        batch = [self._q.get(timeout=self.interval)]
+                    except queue.Empty:
+                        continue
+                    while len(batch) < self.batch_size:
+                        try:
+                            batch.append(self._q.get_nowait())
+                        except queue.Empty:
+                            break
+                    rows = self._rows(batch)
+                if self._write(rows):
+                    rows, delay = [], 0.0
+                else:
+                    # keep the rows (already chained) and try again; dropping
+                    # them would leave step gaps that look like tampering
+                    self.retried += 1
+                    delay = min(self.RETRY_MAX, delay * 2 or 0.05)
+                    self._stop.wait(delay)
+            if rows:
+                logger.error("audit writer stopped with %d rows not written", len(rows))
+        finally:
+            connection.close()
+
+    def _rows(self, batch: List[Tuple[str, Dict[str, Any]]]) -> List[ProvenanceLog]:
+        rows = []
+        for kind, item in batch:
+            try:
+                rows.append(ProvenanceLog(**(self._from_event(item) if kind == "evt" else item)))
+            except Exception as e:
+                self.failed += 1
+                logger.exception("audit event not chained: %s", e)
+                self._done(1)
+        return rows
+
+    def _done(self, n: int) -> None:
+        with self._idle:
+            self._pending -= n
+            self._idle.notify_all()
+
+    def _write(self, rows: List[ProvenanceLog]) -> bool:
+        """Persist one batch; False if it should be retried as a whole."""
+        if not rows:
+            return True
+        try:
+            with transaction.atomic():
+                ProvenanceLog.objects.bulk_create(rows, batch_size=self.batch_size)
+            self.written += len(rows)
+            self._unsealed += len(rows)
+        except OperationalError as e:
+            logger.warning("audit batch of %d not written, retrying: %s", len(rows), e)
+            connection.close_if_unusable_or_obsolete()
+            return False
+        except Exception as e:
+            logger.warning("audit batch of %d failed (%s); writing rows one by one", len(rows), e)
+            self._write_each(rows)
+        self._done(len(rows))
+        self._seal()
+        return True
+
+    def _write_each(self, rows: List[ProvenanceLog]) -> None:
+        """Fallback for a failed batch: one savepoint per row, re-chaining runs that collide."""
+        heads: Dict[str, Tuple[int, str]] = {}  # run_id -> stored head, for runs re-chained here
+        chained: Dict[str, Tuple[int, str]] = {}  # run_id -> (step, hash) as first chained
+        for row in rows:
+            chained[row.run_id] = (row.step_no, row.hash)
+            if row.run_id in heads:
+                self._link(row, heads[row.run_id])
+            for attempt in range(2):
+                try:
+                    with transaction.atomic():
+                        row.save(force_insert=True)
+                    heads[row.run_id] = (row.step_no, row.hash)
+                    self.written += 1
+                    self._unsealed += 1
+                    break
+                except IntegrityError as e:
+                    if attempt == 0:
+                        # that step is already stored (another process or an
+                        # earlier writer of this run): continue after it
+                        self._link(row, self._stored_head(row.run_id))
+                        self.rechained += 1
+                        continue
+                    self._lost(row, heads, e)
+                except Exception as e:
+                    self._lost(row, heads, e)
+                    break
+        with self._lock:
+            for run_id, head in heads.items():
+                # move the in-memory head unless newer steps were chained meanwhile
+                if self._heads.get(run_id) == chained[run_id]:
+                    self._heads[run_id] = head
+
+    def _lost(self, row: ProvenanceLog, heads: Dict[str, Tuple[int, str]], e: Exception) -> None:
+        self.failed += 1
+        logger.error("audit row %s/%d not written: %s", row.run_id, row.step_no, e)
+        # later steps of this run link to the last stored one instead
+        heads[row.run_id] = (row.step_no - 1, row.prev_hash)
+
+    @staticmethod
+    def _link(row: ProvenanceLog, head: Tuple[int, str]) -> None:
+        row.step_no, row.prev_hash = head[0] + 1, head[1]
+        row.hash = row_hash({f: getattr(row, f) for f in FIELDS})
+
+    def _seal(self) -> None:
+        if self.checkpoint_rows and self._unsealed >= self.checkpoint_rows:
+            self._unsealed = 0
+            try:
+                seal(self.checkpoint_rows)
+            except Exception as e:
+                logger.error("provenance checkpoint not sealed: %s", e)
+
+
+audit_writer = AuditWriter(
+    batch_size=getattr(settings, "AUDIT_BATCH_SIZE", 500),
+    interval=getattr(settings, "AUDIT_FLUSH_INTERVAL", 0.5),
+    checkpoint_rows=getattr(settings, "PROVENANCE_CHECKPOINT_ROWS", 10000),
+)
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+Signed Merkle checkpoints over provenance_log and range-parallel
+verification (used by `manage.py verify_provenance` and the audit writer).
+
+- a checkpoint seals the rows with first_id <= id <= last_id: their count,
+  the Merkle root of their hashes (id order) and the previous checkpoint's
+  root, HMAC-signed with PROVENANCE_SIGNING_KEY (default SECRET_KEY)
+- verify_range() checks one id range on its own: every row's hash, and its
+  prev_hash against the previous step of its run (looked up outside the
+  range when needed), so ranges can be checked in a process pool
+- rows after the last checkpoint are the only ones an incremental check has
+  to read; sealed ranges are re-read only on a full check
+- a range that fails verification is still sealed, with its failure count
+  (failed_rows, signed), so sealing moves on and every check reports it
+- a range is sealed once every id in it is taken, or, if it has holes,
+  once the rows after it are PROVENANCE_SEAL_LAG seconds old: ids are not
+  committed in id order with concurrent writers, and a row landing in a
+  sealed range would read as tampering on the next full check
+- nothing is sealed while the signing key is the public DEFAULT_SECRET_KEY
+  from settings.py: anyone with the repo could forge those checkpoints
+"""
+from __future__ import annotations
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+import logging
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.db.models import Max, Min
+from django.utils import timezone
+from core.provenance import FIELDS, GENESIS, check_signature, entry_hash, merkle_root, sign
+from store.models import ProvenanceCheckpoint, ProvenanceLog
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class RangeResult:
+    first_id: int
+    last_id: int
+    n_rows: int = 0
+    root: str = ""
+    failures: List[Tuple[int, str]] = field(default_factory=list)
+    seconds: float = 0.0
+
+def signing_key() -> str:
+    return getattr(settings, "PROVENANCE_SIGNING_KEY", "") or settings.SECRET_KEY
+
+def default_key_in_use() -> bool:
+    """True if checkpoints would be signed with the key published in settings.py."""
+    return signing_key() == getattr(settings, "DEFAULT_SECRET_KEY", None)
+
+def _signed_parts(cp: ProvenanceCheckpoint) -> tuple:
+    # failed_rows only when set, so checkpoints sealed before it existed still verify
+    parts = (cp.first_id, cp.last_id, cp.n_rows, cp.root, cp.prev_root)
+    return parts + (cp.failed_rows,) if cp.failed_rows else parts
+
+def checkpoint_signature(cp: ProvenanceCheckpoint, key: Optional[str] = None) -> str:
+    return sign(key or signing_key(), *_signed_parts(cp))
+
+def split(first_id: int, last_id: int, size: int) -> List[Tuple[int, int]]:
+    return [(a, min(a + size - 1, last_id)) for a in range(first_id, last_id + 1, max(1, size))]
+
+def verify_range(first_id: int, last_id: int) -> RangeResult:
+    t0 = time.perf_counter()
+    rows = list(
+        ProvenanceLog.objects.filter(id__gte=first_id, id__lte=last_id)
+        .order_by("id").values_list("id", *FIELDS, "hash")
+    )
+    heads = {(r[1], r[2]): r[-1] for r in rows}
+    outside = _step_hashes({r[1] for r in rows if r[2] > 1 and (r[1], r[2] - 1) not in heads})
+    res = RangeResult(first_id, last_id, len(rows), merkle_root([r[-1] for r in rows]))
+    for r in rows:
+        rid, values, stored = r[0], r[1:-1], r[-1]
+        run_id, step_no, prev_hash = values[0], values[1], values[-1]
+        if entry_hash(values) != stored:
+            res.failures.append((rid, "hash mismatch: row was modified"))
+            continue
+        key = (run_id, step_no - 1)
+        expected = GENESIS if step_no == 1 else heads.get(key, outside.get(key))
+        if expected is None:
+            res.failures.append((rid, f"step gap: step {step_no - 1} of the run is missing"))
+        elif prev_hash != expected:
+            res.failures.append((rid, "broken link: prev_hash does not match previous step"))
+    res.seconds = time.perf_counter() - t0
+    return res
+
+def verify_ranges(bounds: List[Tuple[int, int]], workers: int = 1) -> Iterator[RangeResult]:
+    """verify_range over each (first_id, last_id), in order, on a process pool if workers > 1."""
+    if workers <= 1 or len(bounds) <= 1:
+        yield from (verify_range(a, b) for a, b in bounds)
+        return
+    connections.close_all()  # children open their own
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        yield from pool.map(_verify_job, bounds)
+
+def check_checkpoints(cps: Iterable[ProvenanceCheckpoint], key: Optional[str] = None) -> List[Tuple[ProvenanceCheckpoint, str]]:
+    """Signature, root chaining and id contiguity of checkpoints ordered by first_id."""
+    key = key or signing_key()
+    bad, prev = [], None
+    for cp in cps:
+        if not check_signature(key, cp.signature, *_signed_parts(cp)):
+            bad.append((cp, "bad signature"))
+        elif cp.failed_rows:
+            bad.append((cp, f"sealed with {cp.failed_rows} rows that failed verification"))
+        if prev is not None and cp.prev_root != prev.root:
+            bad.append((cp, "prev_root does not match the previous checkpoint"))
+        if prev is not None and cp.first_id != prev.last_id + 1:
+            bad.append((cp, f"gap or overlap after id {prev.last_id}"))
+        prev = cp
+    return bad
+
+def seal(range_size: int, workers: int = 1, lag: Optional[float] = None) -> List[ProvenanceCheckpoint]:
+    """
+    Checkpoint every full `range_size` id range past the last checkpoint
+    that is settled (see module doc). Ranges are verified first; one that
+    fails is sealed with failed_rows set and logged, and sealing goes on.
+    Raises ImproperlyConfigured while the signing key is the public default.
+    """
+    if default_key_in_use():
+        raise ImproperlyConfigured("refusing to sign provenance checkpoints with the public default key; "
+                                   "set PROVENANCE_SIGNING_KEY (or DJANGO_SECRET_KEY)")
+    lag = getattr(settings, "PROVENANCE_SEAL_LAG", 60.0) if lag is None else lag
+    last = ProvenanceCheckpoint.objects.order_by("-last_id").first()
+    agg = ProvenanceLog.objects.aggregate(lo=Min("id"), hi=Max("id"))
+    if agg["hi"] is None:
+        return []
+    start = last.last_id + 1 if last else agg["lo"]
+    bounds = [(a, b) for a, b in split(start, agg["hi"], range_size) if b - a + 1 == range_size]
+    settled_before = timezone.now() - timedelta(seconds=lag)
+    prev_root = last.root if last else ""
+    created = []
+    for res in verify_ranges(bounds, workers):
+        if res.n_rows < range_size and not _settled(res.last_id, settled_before):
+            break  # holes may still fill; checkpoints must stay contiguous
+        cp = ProvenanceCheckpoint(first_id=res.first_id, last_id=res.last_id, n_rows=res.n_rows,
+                                  root=res.root, prev_root=prev_root, failed_rows=len(res.failures))
+        cp.signature = checkpoint_signature(cp)
+        cp.save()
+        if res.failures:
+            rid, reason = res.failures[0]
+            logger.error("provenance range %d-%d sealed with %d failed rows (first: row %d: %s)",
+                         res.first_id, res.last_id, len(res.failures), rid, reason)
+        created.append(cp)
+        prev_root = cp.root
+    return created
+
+# ---------- internals ----------
+
+def _settled(last_id: int, before) -> bool:
+    """True if the first row after last_id was written before `before`."""
+    ts = ProvenanceLog.objects.filter(id__gt=last_id).order_by("id").values_list("timestamp", flat=True).first()
+    return ts is not None and ts <= before
+
+def _step_hashes(runs: Iterable[str]) -> Dict[Tuple[str, int], str]:
+    runs, out = list(runs), {}
+    for i in range(0, len(runs), 500):
+        qs = ProvenanceLog.objects.filter(run_id__in=runs[i:i + 500]).values_list("run_id", "step_no", "hash")
+        out.update({(r, s): h for r, s, h in qs})
+    return out
+
+def _init_worker() -> None:
+    import django
+    from django.apps import apps
+    if not apps.ready:  # spawn start method
+        django.setup()
+
+def _verify_job(bounds: Tuple[int, int]) -> RangeResult:
+    return verify_range(*bounds)
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Text extraction for ingestion. Deliberately Django-free: these functions run
+inside ingest worker processes (see store/ingest.py), which never touch the
+ORM and must import cleanly under any multiprocessing start method.
+
+Extraction is streaming: iter_segments() yields one PDF page or one block of
+a text file at a time, and read_capped() stops pulling segments once the
+per-document cap is reached, so a multi-hundred-MB log never sits in memory
+whole.
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional, Tuple
+import hashlib
+
+try:
+    from pypdf import PdfReader
+except Exception:
+    PdfReader = None
+
+EXTENSIONS = (".txt", ".md", ".log", ".pdf")
+SEGMENT_CHARS = 1 << 20  # text files are read in blocks of this many chars
+
+class Extracted(NamedTuple):
+    path: str
+    text: Optional[str]  # None: file still matches the known hash, not parsed
+    error: str
+    sha256: str
+    truncated: bool = False
+
+def iter_segments(path: Path, segment_chars: int = SEGMENT_CHARS) -> Iterator[str]:
+    suffix = path.suffix.lower()
+    if suffix == ".pdf" and PdfReader:
+        reader = PdfReader(str(path))
+        for i, page in enumerate(reader.pages):
+            try:
+                text = page.extract_text() or ""
+            except Exception:
+                text = ""
+            yield ("\n" if i else "") + text
+        return
+    if suffix in [".txt", ".md", ".log"]:
+        yield from _iter_file(path, segment_chars)
+        return
+    # default: best effort
+    try:
+        yield from _iter_file(path, segment_chars)
+    except Exception:
+        return
+
+def read_capped(path: Path, max_chars: int = 0) -> Tuple[str, bool]:
+    """(text, truncated); max_chars <= 0 means no cap."""
+    parts, n = [], 0
+    for seg in iter_segments(path, min(SEGMENT_CHARS, max_chars) if max_chars > 0 else SEGMENT_CHARS):
+        if max_chars > 0 and n + len(seg) > max_chars:
+            parts.append(seg[:max_chars - n])
+            return "".join(parts), True
+        parts.append(seg)
+        n += len(seg)
+    return "".join(parts), False
+
+def read_text(path: Path) -> str:
+    return read_capped(path)[0]
+
+def file_hash(path: Path, block: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for buf in iter(lambda: f.read(block), b""):
+            h.update(buf)
+    return h.hexdigest()
+
+def extract(path: str, known_hash: str = "", max_chars: int = 0) -> Extracted:
+    """
+    Worker entrypoint. Never raises. Text is capped at `max_chars` (0 = no
+    cap); the parse is skipped when the file still hashes to `known_hash`
+    (touched, not changed).
+    """
+    try:
+        digest = file_hash(Path(path))
+        if known_hash and digest == known_hash:
+            return Extracted(path, None, "", digest)
+        text, truncated = read_capped(Path(path), max_chars)
+        return Extracted(path, text, "", digest, truncated)
+    except Exception as e:
+        return Extracted(path, "", f"{type(e).__name__}: {e}", "")
+
+def _iter_file(path: Path, segment_chars: int) -> Iterator[str]:
+    with open(path, errors="ignore") as f:
+        for buf in iter(lambda: f.read(segment_chars), ""):
+            yield buf
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+Pipelined, incremental ingestion shared by `manage.py ingest_docs` and
+IngestorAgent.
+
+  walker (stat only) -> process pool (hash + text extraction) -> writer (main)
+
+- the manifest (store.models.IngestManifest: path, size, mtime, sha256) lets
+  the walker skip files whose size and mtime are unchanged without opening
+  them; touched-but-identical files are hashed but not parsed
+- a new path whose hash matches a file that disappeared is a rename: the
+  document keeps its id and is only re-indexed if its title changed
+- a path without a manifest row adopts the document an older ingest wrote
+  for it (same source_path, or the id ingest_docs derived from the path as
+  given, unresolved) instead of adding a second copy
+- files that disappeared from under `src` are deleted from the store, and
+  so are the documents of files that now come out empty; a file that fails
+  to extract (locked, mid-copy, I/O error) keeps its document and manifest
+  row and is retried on the next run. Files with an extension outside
+  `exts` are left alone unless they no longer exist
+- each document's text is capped at `max_doc_chars` (streamed, see
+  store/extract.py), at most what `memory_mb` can index at once; files in
+  flight and the writer's buffer, costed at INDEX_BYTES_PER_CHAR, are both
+  sized from `memory_mb`, so peak RSS stays around twice that budget
+  however big the tree or the individual files are
+- results are written by the single calling thread as they complete (any
+  order), which keeps SQLite writes serialized; rows are buffered and
+  flushed every `batch_size` documents (or before indexing the buffer would
+  exceed the memory budget) with bulk upserts
+  (bulk_create(update_conflicts=True)) and one bulk re-index, each flush in
+  its own short transaction, so a crash loses at most one batch and the
+  manifest never runs ahead of the documents
+- "ingest.progress" events go out on the event bus every `progress_every`
+  files and once more at the end (done=True)
+"""
+from __future__ import annotations
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, asdict
+from pathlib import Path
+import hashlib
+import os
+import time
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Q
+from store.models import Document, IngestManifest
+from store.extract import EXTENSIONS, extract
+from core.event_bus import bus
+from core.index import index_document, index_documents, remove_document
+
+INFLIGHT_PER_WORKER = 4
+# peak memory of chunking + indexing (chunk rows, token lists, postings) per
+# buffered character of text, measured on log and prose files
+INDEX_BYTES_PER_CHAR = 32
+
+@dataclass
+class IngestStats:
+    seen: int = 0
+    written: int = 0
+    unchanged: int = 0
+    renamed: int = 0
+    deleted: int = 0
+    empty: int = 0
+    truncated: int = 0
+    failed: int = 0
+    seconds: float = 0.0
+
+def walk(src: Path, exts: Sequence[str] = EXTENSIONS) -> Iterator[str]:
+    exts = {e.lower() for e in exts}
+    for root, _, files in os.walk(src):
+        for name in files:
+            if Path(name).suffix.lower() in exts:
+                yield str(Path(root) / name)
+
+def doc_id_for(path: str) -> str:
+    return hashlib.sha1(Path(path).as_posix().encode()).hexdigest()[:40]
+
+def default_workers() -> int:
+    return max(1, (os.cpu_count() or 2) - 1)
+
+class Ingester:
+    def __init__(self, workers: Optional[int] = None, exts: Sequence[str] = EXTENSIONS, progress_every: int = 25,
+                 batch_size: Optional[int] = None, max_doc_chars: Optional[int] = None,
+                 memory_mb: Optional[int] = None):
+        self.workers = max(1, int(workers or default_workers()))
+        self.exts = tuple(exts)
+        self.progress_every = max(1, int(progress_every))
+        self.batch_size = max(1, int(batch_size or getattr(settings, "INGEST_BATCH_SIZE", 200)))
+        self.max_doc_chars = int(max_doc_chars if max_doc_chars is not None else getattr(settings, "INGEST_MAX_DOC_CHARS", 0))
+        self.memory = int(memory_mb or getattr(settings, "INGEST_MEMORY_MB", 256)) * 1024 * 1024
+        if self.max_doc_chars > 0:  # one document has to fit the budget once indexed
+            self.max_doc_chars = min(self.max_doc_chars, self.memory // INDEX_BYTES_PER_CHAR)
+        self._docs: List[Document] = []
+        self._buffered = 0
+        self._manifest: List[IngestManifest] = []
+        self._claimed: Dict[str, str] = {}  # doc_id -> path of buffered manifest rows
+        self._roots: Optional[Tuple[Path, Path]] = None  # (resolved, as given) source
+
+    def run(self, src: Path) -> IngestStats:
+        given = Path(src).expanduser()
+        src = given.resolve()
+        self._roots = (src, given)
+        stats = IngestStats()
+        t0 = time.perf_counter()
+        manifest: Dict[str, IngestManifest] = {
+            m.path: m for m in IngestManifest.objects.filter(path__startswith=str(src) + os.sep)
+        }
+
+        todo: List[Tuple[str, str]] = []
+        stat: Dict[str, os.stat_result] = {}
+        for path in walk(src, self.exts):
+            stats.seen += 1
+            st = stat[path] = os.stat(path)
+            m = manifest.get(path)
+            if m and m.size == st.st_size and m.mtime == st.st_mtime:
+                stats.unchanged += 1
+            else:
+                todo.append((path, m.sha256 if m else ""))
+        # not walked: gone, unless the walk skipped it for its extension
+        # (ingested by a run with a wider `exts`) and it is still there
+        exts = {e.lower() for e in self.exts}
+        gone: Dict[str, List[IngestManifest]] = {}
+        for p, m in manifest.items():
+            if p not in stat and (Path(p).suffix.lower() in exts or not os.path.exists(p)):
+                gone.setdefault(m.sha256, []).append(m)
+        # ingested before, but now extracts empty
+        dropped: List[IngestManifest] = []
+
+        done = stats.unchanged
+        for path, text, error, digest, truncated in self._extracted(todo):
+            st, m = stat[path], manifest.get(path)
+            stats.truncated += truncated
+            if error:
+                stats.failed += 1  # manifest row kept: retried next run
+            elif text is None:
+                self._record(path, st, digest, m.doc_id)
+                stats.unchanged += 1
+            elif not text.strip():
+                stats.empty += 1
+                if m:
+                    dropped.append(m)
+            elif m is None and gone.get(digest):
+                self.rename(gone[digest].pop(), path, st)
+                stats.renamed += 1
+            else:
+                self.write(path, text, st, digest, m)
+                stats.written += 1
+            done += 1
+            if (len(self._docs) >= self.batch_size or len(self._manifest) >= self.batch_size * 4
+                    or self._buffered * INDEX_BYTES_PER_CHAR >= self.memory):
+                self.flush()
+            if done % self.progress_every == 0:
+                self._progress(stats, t0, src)
+        self.flush()
+
+        stale = [m for ms in gone.values() for m in ms] + dropped
+        for i in range(0, len(stale), self.batch_size):
+            with transaction.atomic():
+                for m in stale[i:i + self.batch_size]:
+                    self.delete(m)
+        stats.deleted = len(stale)
+        self._progress(stats, t0, src, done=True)
+        return stats
+
+    def write(self, path: str, text: str, st: os.stat_result, digest: str,
+              m: Optional[IngestManifest] = None) -> Document:
+        """Buffer one document; it is persisted and indexed on the next flush()."""
+        if self._docs and (self._buffered + len(text)) * INDEX_BYTES_PER_CHAR > self.memory:
+            self.flush()  # indexing both at once would exceed the budget
+        p = Path(path)
+        doc = Document(
+            id=m.doc_id if m else self._new_id(path, digest),
+            title=p.name,
+            content=text,
+            policy_tags="",
+            source_path=str(p),
+        )
+        self._docs.append(doc)
+        self._buffered += len(text)
+        self._record(path, st, digest, doc.pk)
+        return doc
+
+    def flush(self) -> int:
+        """Upsert buffered documents + manifest rows and index them in one transaction."""
+        docs, rows = self._docs, self._manifest
+        if not docs and not rows:
+            return 0
+        self._docs, self._manifest, self._buffered = [], [], 0
+        self._claimed = {}
+        with transaction.atomic():
+            Document.objects.bulk_create(
+                docs, batch_size=500, update_conflicts=True, unique_fields=["id"],
+                update_fields=["title", "content", "policy_tags", "source_path", "updated_at"],
+            )
+            index_documents(docs)
+            IngestManifest.objects.bulk_create(
+                rows, batch_size=500, update_conflicts=True, unique_fields=["path"],
+                update_fields=["size", "mtime", "sha256", "doc"],
+            )
+        return len(docs)
+
+    def rename(self, m: IngestManifest, path: str, st: os.stat_result) -> Document:
+        doc = m.doc
+        title = Path(path).name
+        retitled = doc.title != title
+        doc.title, doc.source_path = title, path
+        doc.save(update_fields=["title", "source_path", "updated_at"])
+        if retitled:
+            index_document(doc)
+        m.path, m.size, m.mtime = path, st.st_size, st.st_mtime
+        m.save()
+        return doc
+
+    def delete(self, m: IngestManifest) -> None:
+        remove_document(m.doc_id)
+        Document.objects.filter(pk=m.doc_id).delete()  # cascades chunks, vectors, manifest
+
+    # ---------- internals ----------
+
+    def _new_id(self, path: str, digest: str) -> str:
+        old = self._adoptable(path)
+        if old:
+            return old
+        # path-derived (stable across runs) unless a renamed document already
+        # carries that id, persisted or still buffered for the next flush
+        doc_id = doc_id_for(path)
+        if (self._claimed.get(doc_id, path) != path
+                or IngestManifest.objects.filter(doc_id=doc_id).exclude(path=path).exists()):
+            doc_id = hashlib.sha1(f"{Path(path).as_posix()}:{digest}".encode()).hexdigest()[:40]
+        return doc_id
+
+    def _adoptable(self, path: str) -> Optional[str]:
+        """Id of a document ingested for `path` before it had a manifest row."""
+        paths = {path}
+        if self._roots:
+            src, given = self._roots
+            paths.add(str(given / Path(path).relative_to(src)))
+        ids = [doc_id_for(p) for p in paths]
+        found = (Document.objects.filter(Q(pk__in=ids) | Q(source_path__in=paths), manifest__isnull=True)
+                 .values_list("pk", flat=True))
+        return next((pk for pk in found if pk not in self._claimed), None)
+
+    def _record(self, path: str, st: os.stat_result, digest: str, doc_id: str) -> None:
+        self._manifest.append(IngestManifest(path=path, size=st.st_size, mtime=st.st_mtime, sha256=digest, doc_id=doc_id))
+        self._claimed.setdefault(doc_id, path)
+
+    def _extracted(self, todo: Iterable[Tuple[str, str]]) -> Iterator[tuple]:
+        if self.workers == 1:
+            yield from (extract(path, known, self.max_doc_chars) for path, known in todo)
+            return
+        # children must not inherit open DB handles (can't close mid-transaction)
+        if not transaction.get_connection().in_atomic_block:
+            connections.close_all()
+        limit = self._inflight()
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            pending = set()
+            for path, known in todo:
+                pending.add(pool.submit(extract, path, known, self.max_doc_chars))
+                if len(pending) >= limit:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for f in done:
+                        yield f.result()
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for f in done:
+                    yield f.result()
+
+    def _inflight(self) -> int:
+        # worst case every in-flight result is a capped document
+        limit = self.workers * INFLIGHT_PER_WORKER
+        if self.max_doc_chars > 0:
+            limit = min(limit, max(self.workers, self.memory // self.max_doc_chars))
+        return limit
+
+    def _progress(self, stats: IngestStats, t0: float, src, done: bool = False) -> None:
+        stats.seconds = round(time.perf_counter() - t0, 3)
+        bus.publish("ingest.progress", {**asdict(stats), "source": str(src), "done": done,
+                                        "files_per_s": round(stats.seen / stats.seconds, 2) if stats.seconds else 0.0})
@@ -0,0 +1,47 @@
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from core.batch_qa import BatchQA
+from core.event_bus import bus
+
+class Command(BaseCommand):
+    help = (
+        "Answer questions from a JSONL file through ICE.run_query and stream the answers "
+        "to a JSONL file; re-running resumes where the last run stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--input", required=True, help="JSONL with a `question` (and optional `id`) per line")
+        parser.add_argument("--output", required=True, help="JSONL answers (appended to when resuming)")
+        parser.add_argument("--concurrency", type=int, default=0, help="Generations in flight (0 = LLM_SLOTS)")
+        parser.add_argument("--top-k", type=int, default=5, help="Passages per answer")
+        parser.add_argument("--group-size", type=int, default=64, help="Questions retrieved together")
+        parser.add_argument("--retries", type=int, default=3, help="Retries when the LLM sheds a request")
+        parser.add_argument("--restart", action="store_true", help="Ignore and overwrite an existing output file")
+
+    def handle(self, *args, **opts):
+        src, out = Path(opts["input"]).expanduser(), Path(opts["output"]).expanduser()
+        if not src.is_file():
+            raise CommandError(f"Input not found: {src}")
+
+        shown = [0]
+
+        def progress(evt):
+            p = evt["payload"]
+            n = p["ok"] + p["failed"]
+            if not p["done"] and n // 25 > shown[0] // 25:
+                shown[0] = n
+                self.stdout.write(f"  {n + p['skipped']}/{p['total']} answered ({p['failed']} failed)")
+
+        runner = BatchQA(concurrency=opts["concurrency"], top_k=opts["top_k"],
+                         group_size=opts["group_size"], retries=opts["retries"])
+        bus.subscribe("batch.progress", progress)
+        try:
+            stats = runner.run(src, out, resume=not opts["restart"])
+        finally:
+            bus.unsubscribe("batch.progress", progress)
+        msg = (f"Answered {stats.ok} of {stats.total} questions into {out} "
+               f"({stats.skipped} already done, {stats.failed} failed, {stats.invalid} invalid, "
+               f"{stats.retried} retries, {runner.concurrency} concurrent, {stats.seconds}s)")
+        if stats.failed:
+            raise CommandError(msg + "; re-run to retry the failures")
+        self.stdout.write(self.style.SUCCESS(msg))
@@ -0,0 +1,56 @@
+import json
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from benchmarks.corpus import CorpusSpec
+from benchmarks.retrieval import checks_for, run
+from benchmarks.stats import compare
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark core.retriever.retrieve on a synthetic corpus ingested into a throwaway "
+        "database: latency percentiles, memory, index build time and recall@k, as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--docs", type=int, default=1000, help="Documents to generate (1k-1M)")
+        parser.add_argument("--queries", type=int, default=200, help="Queries with planted relevant docs")
+        parser.add_argument("--median-words", type=int, default=300, help="Median document length")
+        parser.add_argument("--vocab", type=int, default=20000, help="Vocabulary size")
+        parser.add_argument("--seed", type=int, default=7)
+        parser.add_argument("--backend", action="append", choices=("bm25", "fts5"),
+                            help="Retriever backend(s) to measure (repeatable; default RETRIEVER_BACKEND)")
+        parser.add_argument("--top-k", type=int, default=10)
+        parser.add_argument("--repeat", type=int, default=3, help="Timed passes over the queries")
+        parser.add_argument("--workers", type=int, default=None, help="Ingest extraction processes")
+        parser.add_argument("--workdir", default=str(Path(settings.BASE_DIR) / "data" / "bench"),
+                            help="Corpus and benchmark database location")
+        parser.add_argument("--regenerate", action="store_true", help="Rebuild the corpus even if the spec matches")
+        parser.add_argument("--keep-db", action="store_true", help="Keep the benchmark database afterwards")
+        parser.add_argument("--output", default="", help="Write the JSON result here (default: stdout)")
+        parser.add_argument("--baseline", default="", help="Earlier JSON result to compare against")
+        parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression (0.2 = 20%%)")
+
+    def handle(self, *args, **opts):
+        spec = CorpusSpec(n_docs=opts["docs"], n_queries=opts["queries"], vocab=opts["vocab"],
+                          median_words=opts["median_words"], seed=opts["seed"])
+        backends = opts["backend"] or [getattr(settings, "RETRIEVER_BACKEND", "bm25")]
+        result = run(spec, Path(opts["workdir"]), backends=backends, top_k=opts["top_k"],
+                     repeat=opts["repeat"], workers=opts["workers"], regenerate=opts["regenerate"],
+                     keep_db=opts["keep_db"])
+
+        if opts["baseline"]:
+            baseline = json.loads(Path(opts["baseline"]).read_text())
+            result["comparison"] = compare(result, baseline, checks_for(backends), opts["tolerance"])
+        text = json.dumps(result, indent=2)
+        if opts["output"]:
+            Path(opts["output"]).write_text(text + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Wrote {opts['output']}"))
+        else:
+            self.stdout.write(text)
+
+        regressed = [r for r in result.get("comparison", []) if r["regressed"]]
+        for r in regressed:
+            self.stderr.write(f"  {r['metric']}: {r['baseline']} -> {r['current']} ({r['change']:+.1%})")
+        if regressed:
+            raise CommandError(f"{len(regressed)} metrics regressed beyond {opts['tolerance']:.0%}")
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from core.dense import embed_chunks, build_index
+
+class Command(BaseCommand):
+    help = "Embed new chunks into the vectors table and rebuild the dense index file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=64)
+        parser.add_argument("--nlist", type=int, default=0,
+                            help="IVF cluster count (0 = exact brute force)")
+
+    def handle(self, *args, **opts):
+        n = embed_chunks(batch_size=opts["batch_size"])
+        idx = build_index(nlist=opts["nlist"])
+        mode = f"IVF nlist={opts['nlist']}" if idx.centroids is not None else "brute force"
+        self.stdout.write(self.style.SUCCESS(
+            f"Embedded {n} chunks; index has {len(idx)} vectors (dim={idx.dim}, {mode})"
+        ))
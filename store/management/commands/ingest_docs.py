@@ -1,62 +1,37 @@
-import os, hashlib, uuid
 from pathlib import Path
+from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
-from store.models import Document
-from django.db import transaction
-
-try:
-    from pypdf import PdfReader
-except Exception:
-    PdfReader = None
-
-def read_text(path: Path) -> str:
-    suffix = path.suffix.lower()
-    if suffix in [".txt", ".md", ".log"]:
-        return path.read_text(errors="ignore")
-    if suffix == ".pdf" and PdfReader:
-        text = []
-        reader = PdfReader(str(path))
-        for page in reader.pages:
-            try:
-                text.append(page.extract_text() or "")
-            except Exception:
-                pass
-        return "\n".join(text)
-    # default: best effort
-    try:
-        return path.read_text(errors="ignore")
-    except Exception:
-        return ""
+from core.event_bus import bus
+from store.ingest import Ingester
 
 class Command(BaseCommand):
     help = "Ingest documents from a directory into the local store"
 
     def add_arguments(self, parser):
         parser.add_argument("--source", required=True, help="Folder with docs")
+        parser.add_argument("--workers", type=int, default=getattr(settings, "INGEST_WORKERS", 0),
+                            help="Extraction processes (0 = cpu count - 1)")
+        parser.add_argument("--batch-size", type=int, default=getattr(settings, "INGEST_BATCH_SIZE", 200),
+                            help="Documents per write transaction")
 
-    @transaction.atomic
     def handle(self, *args, **opts):
         src = Path(opts["source"]).expanduser()
         if not src.exists() or not src.is_dir():
             raise CommandError(f"Source not found or not a dir: {src}")
 
-        count = 0
-        for root, _, files in os.walk(src):
-            for name in files:
-                p = Path(root) / name
-                if p.suffix.lower() in {".txt", ".md", ".log", ".pdf"}:
-                    content = read_text(p)
-                    if not content.strip():
-                        continue
-                    doc_id = hashlib.sha1(p.as_posix().encode()).hexdigest()[:40]
-                    Document.objects.update_or_create(
-                        id=doc_id,
-                        defaults={
-                            "title": p.name,
-                            "content": content,
-                            "policy_tags": "",
-                        },
-                    )
-                    count += 1
-        self.stdout.write(self.style.SUCCESS(f"Ingested/updated {count} docs from {src}"))
+        def progress(evt):
+            p = evt["payload"]
+            if not p.get("done"):
+                self.stdout.write(f"  {p['seen']} files, {p['written']} written, {p['unchanged']} unchanged")
 
+        bus.subscribe("ingest.progress", progress)
+        try:
+            stats = Ingester(workers=opts["workers"], batch_size=opts["batch_size"]).run(src)
+        finally:
+            bus.unsubscribe("ingest.progress", progress)
+        self.stdout.write(self.style.SUCCESS(
+            f"Ingested/updated {stats.written} docs from {src} "
+            f"({stats.seen} seen, {stats.unchanged} unchanged, {stats.renamed} renamed, "
+            f"{stats.deleted} deleted, {stats.empty} empty, {stats.truncated} truncated, "
+            f"{stats.failed} failed, {stats.seconds}s)"
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from core.index import rebuild_index
+from core import fts
+
+class Command(BaseCommand):
+    help = "Rebuild the BM25 inverted index and the FTS5 mirror from all stored documents"
+
+    def handle(self, *args, **opts):
+        n = rebuild_index()
+        fts.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {n} docs"))
@@ -0,0 +1,78 @@
+import os
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from core.provenance import FIELDS, verify_rows
+from store.checkpoints import check_checkpoints, default_key_in_use, seal, split, verify_ranges
+from store.models import ProvenanceCheckpoint, ProvenanceLog
+
+class Command(BaseCommand):
+    help = (
+        "Verify the provenance_log hash chain. By default checks the signed checkpoints "
+        "and only the rows written since the last one; --full re-reads sealed ranges too."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--run", default="", help="Only verify this run_id (sequential)")
+        parser.add_argument("--full", action="store_true", help="Also re-verify rows under checkpoints")
+        parser.add_argument("--checkpoint", action="store_true", help="Seal verified full ranges afterwards")
+        parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                            help="Verification processes")
+        parser.add_argument("--range-size", type=int,
+                            default=getattr(settings, "PROVENANCE_CHECKPOINT_ROWS", 0) or 10000,
+                            help="Rows per range / checkpoint")
+        parser.add_argument("--show", type=int, default=20, help="Print at most this many failures")
+
+    def handle(self, *args, **opts):
+        if opts["run"]:
+            return self._verify_run(opts["run"], opts["show"])
+
+        if default_key_in_use():
+            self.stderr.write(self.style.WARNING(
+                "Checkpoint signatures use the public default key (set PROVENANCE_SIGNING_KEY); "
+                "they prove nothing"))
+        t0 = time.perf_counter()
+        failures = []
+        cps = list(ProvenanceCheckpoint.objects.order_by("first_id"))
+        failures += [(f"checkpoint {cp.first_id}-{cp.last_id}", reason) for cp, reason in check_checkpoints(cps)]
+
+        sealed = {(cp.first_id, cp.last_id): cp for cp in cps} if opts["full"] else {}
+        hi = ProvenanceLog.objects.aggregate(hi=Max("id"))["hi"] or 0
+        tail_from = cps[-1].last_id + 1 if cps else 1
+        bounds = list(sealed) + (split(tail_from, hi, opts["range_size"]) if hi >= tail_from else [])
+
+        n_rows = 0
+        for res in verify_ranges(bounds, opts["workers"]):
+            n_rows += res.n_rows
+            failures += [(f"row {rid}", reason) for rid, reason in res.failures]
+            cp = sealed.get((res.first_id, res.last_id))
+            if cp and (cp.root != res.root or cp.n_rows != res.n_rows):
+                failures.append((f"range {cp.first_id}-{cp.last_id}", "Merkle root mismatch (rows changed, added or removed)"))
+
+        secs = time.perf_counter() - t0
+        rate = int(n_rows / secs) if secs else n_rows
+        summary = (f"Verified {n_rows} rows in {len(bounds)} ranges and {len(cps)} checkpoints "
+                   f"in {secs:.2f}s ({rate} rows/s, {opts['workers']} workers)")
+        for where, reason in failures[:opts["show"]]:
+            self.stdout.write(self.style.ERROR(f"  {where}: {reason}"))
+        if failures:
+            raise CommandError(f"{summary}: {len(failures)} problems")
+        self.stdout.write(self.style.SUCCESS(f"{summary}: chain intact"))
+
+        if opts["checkpoint"]:
+            if default_key_in_use():
+                raise CommandError("Not sealing: set PROVENANCE_SIGNING_KEY or DJANGO_SECRET_KEY first")
+            created = seal(opts["range_size"], opts["workers"])
+            self.stdout.write(self.style.SUCCESS(f"Sealed {len(created)} new checkpoints"))
+
+    def _verify_run(self, run_id, show):
+        t0 = time.perf_counter()
+        rows = list(ProvenanceLog.objects.filter(run_id=run_id).order_by("step_no").values_list("id", *FIELDS, "hash"))
+        bad = list(verify_rows(rows))
+        for rid, reason in bad[:show]:
+            self.stdout.write(self.style.ERROR(f"  row {rid}: {reason}"))
+        summary = f"Verified {len(rows)} rows of run {run_id} in {time.perf_counter() - t0:.3f}s"
+        if bad:
+            raise CommandError(f"{summary}: {len(bad)} bad rows")
+        self.stdout.write(self.style.SUCCESS(f"{summary}: chain intact"))
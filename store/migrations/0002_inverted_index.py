@@ -0,0 +1,44 @@
+# Generated by Django 5.0.6 on 2026-10-18 15:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('n_docs', models.IntegerField(default=0)),
+                ('total_len', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'index_stats',
+            },
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='source_path',
+            field=models.CharField(blank=True, max_length=1024),
+        ),
+        migrations.CreateModel(
+            name='Posting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('tf', models.IntegerField()),
+                ('dl', models.IntegerField()),
+                ('doc', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='store.document')),
+            ],
+            options={
+                'db_table': 'postings',
+                'unique_together': {('term', 'doc')},
+            },
+        ),
+    ]
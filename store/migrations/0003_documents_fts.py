@@ -0,0 +1,51 @@
+# FTS5 mirror of the documents table, kept in sync by triggers.
+
+from django.db import migrations
+
+FTS_SQL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+        title, content, policy_tags,
+        content='documents', content_rowid='rowid'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS documents_fts_ai AFTER INSERT ON documents BEGIN
+        INSERT INTO documents_fts(rowid, title, content, policy_tags)
+        VALUES (new.rowid, new.title, new.content, new.policy_tags);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS documents_fts_ad AFTER DELETE ON documents BEGIN
+        INSERT INTO documents_fts(documents_fts, rowid, title, content, policy_tags)
+        VALUES ('delete', old.rowid, old.title, old.content, old.policy_tags);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS documents_fts_au AFTER UPDATE ON documents BEGIN
+        INSERT INTO documents_fts(documents_fts, rowid, title, content, policy_tags)
+        VALUES ('delete', old.rowid, old.title, old.content, old.policy_tags);
+        INSERT INTO documents_fts(rowid, title, content, policy_tags)
+        VALUES (new.rowid, new.title, new.content, new.policy_tags);
+    END""",
+    "INSERT INTO documents_fts(documents_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS documents_fts_au",
+    "DROP TRIGGER IF EXISTS documents_fts_ad",
+    "DROP TRIGGER IF EXISTS documents_fts_ai",
+    "DROP TABLE IF EXISTS documents_fts",
+]
+
+def _run(sql):
+    def apply(apps, schema_editor):
+        if schema_editor.connection.vendor != "sqlite":
+            return
+        for stmt in sql:
+            schema_editor.execute(stmt)
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0002_inverted_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(FTS_SQL), _run(DROP_SQL)),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-18 15:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0003_documents_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Chunk',
+            fields=[
+                ('id', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('ordinal', models.IntegerField()),
+                ('start', models.IntegerField()),
+                ('end', models.IntegerField()),
+                ('text', models.TextField()),
+                ('doc', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='store.document')),
+            ],
+            options={
+                'db_table': 'chunks',
+                'unique_together': {('doc', 'ordinal')},
+            },
+        ),
+    ]
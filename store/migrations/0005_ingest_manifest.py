@@ -0,0 +1,28 @@
+# Generated by Django 5.0.6 on 2026-10-18 15:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0004_chunks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestManifest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=1024, unique=True)),
+                ('size', models.BigIntegerField()),
+                ('mtime', models.FloatField()),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('doc', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='manifest', to='store.document')),
+            ],
+            options={
+                'db_table': 'ingest_manifest',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-18 15:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0005_ingest_manifest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='provenancelog',
+            name='hash',
+            field=models.CharField(blank=True, max_length=128),
+        ),
+    ]
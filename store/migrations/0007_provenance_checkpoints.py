@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-18 15:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0006_provenance_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProvenanceCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_id', models.BigIntegerField()),
+                ('last_id', models.BigIntegerField(unique=True)),
+                ('n_rows', models.IntegerField()),
+                ('root', models.CharField(max_length=64)),
+                ('prev_root', models.CharField(blank=True, max_length=64)),
+                ('signature', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'provenance_checkpoints',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-18 15:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_provenance_checkpoints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='provenancecheckpoint',
+            name='failed_rows',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -5,6 +5,7 @@ class Document(models.Model):
     title = models.CharField(max_length=512, blank=True)
     content = models.TextField(blank=True)
     policy_tags = models.CharField(max_length=512, blank=True)
+    source_path = models.CharField(max_length=1024, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -14,6 +15,48 @@ class Document(models.Model):
     def __str__(self):
         return self.title or self.id
 
+class Chunk(models.Model):
+    id = models.CharField(primary_key=True, max_length=64)  # "<doc_id>:<ordinal>"
+    doc = models.ForeignKey(Document, on_delete=models.CASCADE, related_name="chunks")
+    ordinal = models.IntegerField()
+    start = models.IntegerField()  # char offsets into Document.content
+    end = models.IntegerField()
+    text = models.TextField()
+
+    class Meta:
+        db_table = "chunks"
+        unique_together = (("doc", "ordinal"),)
+
+class Posting(models.Model):
+    term = models.CharField(max_length=64)
+    doc = models.ForeignKey(Document, on_delete=models.CASCADE, related_name="postings")
+    tf = models.IntegerField()
+    dl = models.IntegerField()  # document length in tokens (denormalized for BM25)
+
+    class Meta:
+        db_table = "postings"
+        unique_together = (("term", "doc"),)
+
+class IndexStat(models.Model):
+    # single row (pk=1): corpus totals for BM25 avgdl / idf
+    n_docs = models.IntegerField(default=0)
+    total_len = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = "index_stats"
+
+class IngestManifest(models.Model):
+    # one row per ingested file: lets re-ingest skip unchanged files by
+    # (size, mtime) and detect renames by content hash
+    path = models.CharField(max_length=1024, unique=True)
+    size = models.BigIntegerField()
+    mtime = models.FloatField()
+    sha256 = models.CharField(max_length=64, db_index=True)
+    doc = models.ForeignKey(Document, on_delete=models.CASCADE, related_name="manifest")
+
+    class Meta:
+        db_table = "ingest_manifest"
+
 class Vector(models.Model):
     id = models.CharField(primary_key=True, max_length=64)
     doc = models.ForeignKey(Document, on_delete=models.CASCADE, related_name="vectors")
@@ -35,8 +78,22 @@ class ProvenanceLog(models.Model):
     policy_decision = models.CharField(max_length=128, blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
     prev_hash = models.CharField(max_length=128, blank=True)
+    hash = models.CharField(max_length=128, blank=True)  # core.provenance.entry_hash of this row
 
     class Meta:
         db_table = "provenance_log"
         unique_together = (("run_id", "step_no"),)
 
+class ProvenanceCheckpoint(models.Model):
+    # seals provenance_log rows first_id..last_id (see store/checkpoints.py)
+    first_id = models.BigIntegerField()
+    last_id = models.BigIntegerField(unique=True)
+    n_rows = models.IntegerField()
+    root = models.CharField(max_length=64)  # Merkle root of the rows' hashes, id order
+    prev_root = models.CharField(max_length=64, blank=True)
+    signature = models.CharField(max_length=64)
+    failed_rows = models.IntegerField(default=0)  # rows that failed verification when sealed
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "provenance_checkpoints"
@@ -0,0 +1,24 @@
+import os
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def django_db(tmp_path_factory):
+    """Migrated throwaway SQLite database under the real settings."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "covenant.settings")
+    import django
+    django.setup()
+    from django.db import connection
+    connection.settings_dict.setdefault("TEST", {})["NAME"] = str(tmp_path_factory.mktemp("db") / "test.sqlite3")
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    yield
+    connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+@pytest.fixture
+def db(django_db):
+    yield
+    from django.core.management import call_command
+    call_command("flush", interactive=False, verbosity=0)
@@ -0,0 +1,127 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from providers import async_http_llm, http_llm, scheduler
+from providers.async_http_llm import AsyncHttpLLM
+from providers.http_llm import LLAMA, OPENAI
+from providers.scheduler import LLMScheduler, Overloaded
+
+
+class FakeResponse:
+    def __init__(self, status=200, body=None, chunks=()):
+        self.status_code = status
+        self._body = body if body is not None else {}
+        self.text = str(self._body)
+        self.chunks = list(chunks)
+
+    def json(self):
+        return self._body
+
+    async def aread(self):
+        return self.text.encode()
+
+
+class FakeAsyncTransport:
+    """Routes by (method, path); records every request as (method, path)."""
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.calls = []
+
+    def _hit(self, method, url):
+        path = url.split("http://llm", 1)[1]
+        self.calls.append((method, path))
+        return self.routes.get((method, path), FakeResponse(404))
+
+    async def aget(self, url, **kw):
+        return self._hit("GET", url)
+
+    async def apost(self, url, **kw):
+        return self._hit("POST", url)
+
+    @asynccontextmanager
+    async def astream(self, method, url, **kw):
+        yield self._hit(method, url)
+
+    async def aiter_sse(self, resp):
+        for chunk in resp.chunks:
+            yield chunk
+
+
+@pytest.fixture
+def fake(monkeypatch, django_db):
+    http_llm._dialects.clear()  # shared by HttpLLM and AsyncHttpLLM
+    monkeypatch.setattr(scheduler, "_scheduler", LLMScheduler(slots=2, max_queue=4, queue_timeout=5))
+
+    def install(routes):
+        t = FakeAsyncTransport(routes)
+        monkeypatch.setattr(async_http_llm, "transport", t)
+        return t
+    yield install
+    http_llm._dialects.clear()
+
+
+def _llm():
+    return AsyncHttpLLM(endpoint="http://llm", model="m", api_key="k", timeout=5)
+
+
+async def _collect(agen):
+    return [piece async for piece in agen]
+
+
+def test_agenerate_falls_back_to_openai_and_remembers_it(fake):
+    t = fake({("GET", "/props"): FakeResponse(body={}),
+              ("POST", "/completion"): FakeResponse(404),
+              ("POST", "/v1/chat/completions"): FakeResponse(body={"choices": [{"message": {"content": "hi"}}]})})
+    llm = _llm()
+    assert asyncio.run(llm.agenerate("q")) == "hi"
+    assert asyncio.run(llm.adialect()) == OPENAI
+    t.calls.clear()
+    assert asyncio.run(llm.agenerate("q again")) == "hi"
+    assert t.calls == [("POST", "/v1/chat/completions")]
+
+
+def test_agenerate_server_error_keeps_dialect(fake):
+    t = fake({("GET", "/props"): FakeResponse(body={}),
+              ("POST", "/completion"): FakeResponse(500, {"error": "oom"})})
+    llm = _llm()
+    assert asyncio.run(llm.agenerate("q")).startswith("[HTTP 500]")
+    assert ("POST", "/v1/chat/completions") not in t.calls
+    assert asyncio.run(llm.adialect()) == LLAMA
+
+
+def test_astream_falls_back_to_openai_chunks(fake):
+    deltas = [{"choices": [{"delta": {"content": p}}]} for p in ("Iso", "late")]
+    fake({("GET", "/v1/models"): FakeResponse(body={"data": []}),
+          ("POST", "/v1/chat/completions"): FakeResponse(404),
+          ("POST", "/completion"): FakeResponse(chunks=[{"content": "Iso"}, {"content": "late", "stop": True},
+                                                        {"content": "never"}])})
+    llm = _llm()
+    assert asyncio.run(llm.adialect()) == OPENAI
+    assert asyncio.run(_collect(llm.astream("q"))) == ["Iso", "late"]
+    assert asyncio.run(llm.adialect()) == LLAMA
+
+    http_llm._dialects.clear()
+    fake({("GET", "/v1/models"): FakeResponse(body={"data": []}),
+          ("POST", "/v1/chat/completions"): FakeResponse(chunks=deltas)})
+    assert asyncio.run(_collect(_llm().astream("q"))) == ["Iso", "late"]
+
+
+def test_astream_http_error_is_yielded_not_retried(fake):
+    t = fake({("GET", "/props"): FakeResponse(body={}),
+              ("POST", "/completion"): FakeResponse(503, {"error": "loading model"})})
+    assert asyncio.run(_collect(_llm().astream("q"))) == ["[HTTP 503] {'error': 'loading model'}"]
+    assert ("POST", "/v1/chat/completions") not in t.calls
+
+
+def test_agenerate_is_shed_when_the_queue_is_full(fake, monkeypatch):
+    fake({("GET", "/props"): FakeResponse(body={}),
+          ("POST", "/completion"): FakeResponse(body={"content": "hi"})})
+    s = LLMScheduler(slots=1, max_queue=0, queue_timeout=5)
+    monkeypatch.setattr(scheduler, "_scheduler", s)
+    with s.slot():
+        with pytest.raises(Overloaded):
+            asyncio.run(_llm().agenerate("q"))
+    assert asyncio.run(_llm().agenerate("q")) == "hi"
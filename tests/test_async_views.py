@@ -0,0 +1,129 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+import pytest
+
+from providers import scheduler
+from providers.scheduler import LLMScheduler
+
+
+class FakeResponse:
+    def __init__(self, body=None, chunks=()):
+        self.status_code = 200
+        self._body = body or {}
+        self.chunks = list(chunks)
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeAsyncTransport:
+    """Answers every POST with `resp`; records the JSON payloads."""
+
+    def __init__(self, resp):
+        self.resp = resp
+        self.payloads = []
+
+    async def apost(self, url, json=None, **kw):
+        self.payloads.append(json)
+        return self.resp
+
+    @asynccontextmanager
+    async def astream(self, method, url, json=None, **kw):
+        self.payloads.append(json)
+        yield self.resp
+
+    async def aiter_sse(self, resp):
+        for chunk in resp.chunks:
+            yield chunk
+
+
+@pytest.fixture
+def sched(django_db, monkeypatch):
+    s = LLMScheduler(slots=1, max_queue=0, queue_timeout=5)
+    monkeypatch.setattr(scheduler, "_scheduler", s)
+    return s
+
+
+@pytest.fixture
+def client(sched):
+    from django.test import AsyncClient, override_settings
+    with override_settings(ALLOWED_HOSTS=["testserver"]):
+        yield AsyncClient()
+
+
+async def _body(resp):
+    return b"".join([chunk async for chunk in resp.streaming_content]).decode()
+
+
+def _events(body):
+    out = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        out.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return out
+
+
+def _openai(monkeypatch, resp):
+    from apps.providers import client
+    t = FakeAsyncTransport(resp)
+    monkeypatch.setattr(client, "transport", t)
+    return t
+
+
+def test_qa_view_answers_json(client, monkeypatch):
+    _openai(monkeypatch, FakeResponse({"choices": [{"message": {"content": "Lock out the pump."}}]}))
+    resp = asyncio.run(client.post("/workflows/qa", {"q": "How do I isolate P-101?"}))
+    assert resp.status_code == 200
+    assert resp.json() == {"ok": True, "answer": "Lock out the pump."}
+
+
+def test_qa_stream_sends_token_events_then_done(client, monkeypatch):
+    deltas = [{"choices": [{"delta": {"content": p}}]} for p in ("Lock", " out\n", "the pump.")]
+    t = _openai(monkeypatch, FakeResponse(chunks=deltas))
+
+    async def go():
+        resp = await client.get("/workflows/qa_stream", {"q": "How do I isolate P-101?"})
+        return resp, await _body(resp)
+    resp, body = asyncio.run(go())
+    assert resp.status_code == 200 and resp["Content-Type"] == "text/event-stream"
+    assert _events(body) == [("token", "Lock"), ("token", " out\n"), ("token", "the pump."),
+                             ("done", {"n_pieces": 3})]
+    assert t.payloads[0]["stream"] is True
+
+
+def test_qa_stream_is_refused_with_503_when_overloaded(client, sched, monkeypatch):
+    t = _openai(monkeypatch, FakeResponse(chunks=[]))
+    with sched.slot():
+        resp = asyncio.run(client.get("/workflows/qa_stream", {"q": "busy?"}))
+    assert resp.status_code == 503
+    assert resp["Retry-After"] and resp.json()["ok"] is False
+    assert t.payloads == []
+
+
+def test_chat_stream_shed_after_the_response_started_ends_with_shed_event(sched, monkeypatch):
+    from django.test import AsyncRequestFactory
+    from ui import views_llm
+    from ui.services import llm_client
+    monkeypatch.setattr(llm_client, "transport", FakeAsyncTransport(FakeResponse(chunks=[{"content": "never"}])))
+    req = AsyncRequestFactory().get("/chat/stream", {"q": "hello"})
+    resp = asyncio.run(views_llm.chat_stream(req))  # admission check passes
+    assert resp.status_code == 200
+    with sched.slot():  # slot taken before the generation starts
+        (event, data), = _events(asyncio.run(_body(resp)))
+    assert event == "shed" and data["retry_after"] >= 1
+
+
+def test_llm_ping_view(sched, monkeypatch):
+    from django.test import AsyncRequestFactory
+    from ui import views_llm
+    from ui.services import llm_client
+    t = FakeAsyncTransport(FakeResponse({"content": "Pong!"}))
+    monkeypatch.setattr(llm_client, "transport", t)
+    resp = asyncio.run(views_llm.llm_ping(AsyncRequestFactory().get("/diagnostics/llm")))
+    assert json.loads(resp.content) == {"ok": True, "reply": "Pong!"}
+    assert t.payloads == [{"prompt": "pong", "n_predict": 128, "cache_prompt": True}]
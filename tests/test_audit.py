@@ -0,0 +1,74 @@
+from django.db import OperationalError
+
+from core.provenance import FIELDS, verify_rows
+
+
+def _writer():
+    from store.audit import AuditWriter
+    return AuditWriter(batch_size=50, interval=0.01)
+
+
+def _problems():
+    from store.models import ProvenanceLog
+    rows = ProvenanceLog.objects.order_by("run_id", "step_no").values_list("id", *FIELDS, "hash")
+    return list(verify_rows(rows))
+
+
+def _steps(run_id):
+    from store.models import ProvenanceLog
+    return list(ProvenanceLog.objects.filter(run_id=run_id).order_by("step_no").values_list("step_no", flat=True))
+
+
+def test_chain_continues_from_stored_head_in_a_new_writer(db):
+    w = _writer()
+    w.start()
+    w.record("r1", "agent", "a")
+    w.record("r1", "agent", "b")
+    assert w.flush()
+    w.stop()
+
+    w = _writer()  # e.g. after a restart: no in-memory head for r1
+    w.start()
+    assert w.record("r1", "agent", "c")["step_no"] == 3
+    assert w.flush()
+    w.stop()
+    assert _steps("r1") == [1, 2, 3] and _problems() == []
+
+
+def test_transient_errors_retry_the_batch(db, monkeypatch):
+    from store.models import ProvenanceLog
+    real, calls = ProvenanceLog.objects.bulk_create, []
+
+    def locked(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            raise OperationalError("database is locked")
+        return real(*args, **kwargs)
+    monkeypatch.setattr(ProvenanceLog.objects, "bulk_create", locked)
+    w = _writer()
+    w.start()
+    for action in "abc":
+        w.record("r1", "agent", action)
+    assert w.flush()
+    w.stop()
+    assert w.stats()["retried"] >= 1 and w.stats()["failed"] == 0
+    assert _steps("r1") == [1, 2, 3] and _problems() == []
+
+
+def test_colliding_step_is_rechained_without_losing_other_runs(db):
+    from core.provenance import GENESIS, entry_hash
+    from store.models import ProvenanceLog
+    w = _writer()
+    w.record("r1", "agent", "mine")  # queued; writer thread not started yet
+    w.record("r2", "agent", "other run")
+    # meanwhile another process stores step 1 of r1
+    values = ("r1", 1, "agent", "theirs", "", "", "", GENESIS)
+    ProvenanceLog.objects.create(**dict(zip(FIELDS, values)), hash=entry_hash(values))
+    w.start()
+    assert w.flush()
+    assert w.record("r1", "agent", "next")["step_no"] == 3
+    assert w.flush()
+    w.stop()
+    assert w.stats()["rechained"] == 1 and w.stats()["failed"] == 0
+    assert _steps("r1") == [1, 2, 3] and _steps("r2") == [1]
+    assert _problems() == []
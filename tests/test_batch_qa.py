@@ -0,0 +1,44 @@
+import json
+
+
+def test_shared_retrieval_matches_per_query_retrieval(db):
+    from core.index import index_documents
+    from core.retriever import retrieve_chunks, retrieve_chunks_many
+    from store.models import Document
+    bodies = [
+        "Isolate pump P-101 and apply the LOTO padlock before opening the casing.",
+        "The relief valve on line 4 is tested quarterly; record the lift pressure.",
+        "Pump seals leak when the valve upstream is throttled too far.",
+        "Confined space entry needs a permit, a gas test and a standby person.",
+        "Canteen opening hours: 07:00 to 15:00. Parking behind building C.",
+    ] * 3
+    index_documents([Document.objects.create(id=f"d{i}", title=f"doc {i}", content=b) for i, b in enumerate(bodies)])
+    queries = ["pump valve", "LOTO padlock pump", "permit gas test", "relief valve pressure", "nothing matches"]
+
+    def ranked(hits):
+        return [(c.pk, round(s, 9)) for c, s in hits]
+    assert [ranked(h) for h in retrieve_chunks_many(queries, top_k=4)] == \
+        [ranked(retrieve_chunks(q, top_k=4)) for q in queries]
+
+
+def test_resume_skips_answered_retries_failed_and_drops_torn_line(db, tmp_path, monkeypatch):
+    from core import batch_qa
+    from core.ice import RunResult
+    src, out = tmp_path / "q.jsonl", tmp_path / "a.jsonl"
+    src.write_text("".join(json.dumps({"id": i, "question": f"question {i}"}) + "\n" for i in (1, 2, 3)))
+    out.write_text(json.dumps({"id": "1", "ok": True, "answer": "one"}) + "\n"
+                   + json.dumps({"id": "2", "ok": False, "answer": "[HTTP 500] oom"}) + "\n"
+                   + '{"id": "3", "ok": tr')  # killed mid-write
+    asked = []
+
+    def run_query(question, top_k=5, hits=None):
+        asked.append(question)
+        return RunResult(ok=True, answer=question.upper())
+    monkeypatch.setattr(batch_qa.ice, "run_query", run_query)
+    monkeypatch.setattr(batch_qa, "retrieve_chunks_many", lambda qs, k: [[] for _ in qs])
+
+    stats = batch_qa.BatchQA(concurrency=2).run(src, out)
+    assert sorted(asked) == ["question 2", "question 3"]
+    assert (stats.skipped, stats.ok, stats.failed) == (1, 2, 0)
+    rows = [json.loads(line) for line in out.read_text().splitlines()]
+    assert sorted(r["id"] for r in rows) == ["1", "2", "3"] and all(r["ok"] for r in rows)
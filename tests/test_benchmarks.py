@@ -0,0 +1,27 @@
+from benchmarks.corpus import CorpusSpec, generate
+from benchmarks.stats import HIGHER_IS_WORSE, LOWER_IS_WORSE, compare, percentiles, recall_at_k
+
+
+def test_corpus_is_reproducible_and_plants_query_terms(tmp_path):
+    spec = CorpusSpec(n_docs=40, n_queries=5, vocab=500, median_words=50, seed=3)
+    queries, info = generate(spec, tmp_path / "a")
+    again, _ = generate(spec, tmp_path / "b")
+    assert [q.text for q in queries] == [q.text for q in again]
+    assert (tmp_path / "a" / queries[0].relevant[0]).read_bytes() == (tmp_path / "b" / queries[0].relevant[0]).read_bytes()
+    assert info["words"] >= 40 * spec.min_words
+    for q in queries:
+        topic = [t for t in q.text.split() if t.startswith("x")]
+        assert 2 <= len(topic) <= 3
+        for rel in q.relevant:
+            words = set((tmp_path / "a" / rel).read_text().split())
+            assert set(topic) <= words
+
+
+def test_percentiles_recall_and_baseline_comparison():
+    p = percentiles([float(i) for i in range(1, 101)])
+    assert (p["p50"], p["p95"], p["p99"], p["mean"]) == (50.0, 95.0, 99.0, 50.5)
+    assert recall_at_k(["a", "x", "b"], {"a", "b"}, 2) == 0.5
+    cur = {"q": {"p95": 13.0, "recall": 0.7}}
+    base = {"q": {"p95": 10.0, "recall": 0.9}}
+    rows = compare(cur, base, {"q.p95": HIGHER_IS_WORSE, "q.recall": LOWER_IS_WORSE, "q.missing": HIGHER_IS_WORSE})
+    assert [(r["metric"], r["regressed"]) for r in rows] == [("q.p95", True), ("q.recall", True)]
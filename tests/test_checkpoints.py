@@ -0,0 +1,68 @@
+import pytest
+
+from core.provenance import FIELDS, GENESIS, entry_hash
+
+
+@pytest.fixture
+def key(db):
+    from django.test import override_settings
+    with override_settings(PROVENANCE_SIGNING_KEY="test-signing-key"):
+        yield
+
+
+def _store(run_id, steps, start=1):
+    """Chained rows for steps start..start+steps-1; returns their ids."""
+    from store.models import ProvenanceLog
+    ids, prev = [], GENESIS
+    for step in range(1, start + steps):
+        values = (run_id, step, "ice", f"a{step}", "", "", "", prev)
+        prev = entry_hash(values)
+        if step >= start:
+            ids.append(ProvenanceLog.objects.create(**dict(zip(FIELDS, values)), hash=prev).pk)
+    return ids
+
+
+def test_verify_range_checks_links_across_range_bounds(db):
+    from store.checkpoints import verify_range
+    from store.models import ProvenanceLog
+    ids = _store("r1", 6)
+    assert verify_range(ids[3], ids[5]).failures == []  # step 4 links to step 3 outside the range
+
+    ProvenanceLog.objects.filter(pk=ids[1]).update(action="forged")
+    res = verify_range(ids[0], ids[5])
+    assert res.n_rows == 6 and res.failures == [(ids[1], "hash mismatch: row was modified")]
+
+
+def test_seal_moves_past_a_failing_range(key):
+    from store.checkpoints import check_checkpoints, seal
+    from store.models import ProvenanceCheckpoint
+    _store("r1", 1)
+    _store("r1", 3, start=3)  # step 2 missing: gap in the first range
+    _store("r2", 8)
+    created = seal(4, lag=0)
+    assert [cp.failed_rows for cp in created] == [1, 0, 0]
+    assert seal(4, lag=0) == []  # nothing left to retry
+    problems = check_checkpoints(ProvenanceCheckpoint.objects.order_by("first_id"))
+    assert [reason for _, reason in problems] == ["sealed with 1 rows that failed verification"]
+
+
+def test_range_with_holes_waits_for_the_seal_lag(key):
+    from store.checkpoints import seal
+    from store.models import ProvenanceLog
+    ids = _store("r1", 9)
+    ProvenanceLog.objects.filter(pk=ids[1]).delete()  # e.g. a lower id not committed yet
+    assert seal(4, lag=3600) == []
+    assert [cp.n_rows for cp in seal(4, lag=0)] == [3, 4]
+
+
+def test_refuses_to_seal_with_the_public_default_key(db):
+    from django.conf import settings
+    from django.core.exceptions import ImproperlyConfigured
+    from django.test import override_settings
+    from store.checkpoints import seal
+    from store.models import ProvenanceCheckpoint
+    _store("r1", 8)
+    with override_settings(PROVENANCE_SIGNING_KEY="", SECRET_KEY=settings.DEFAULT_SECRET_KEY):
+        with pytest.raises(ImproperlyConfigured):
+            seal(4, lag=0)
+    assert not ProvenanceCheckpoint.objects.exists()
@@ -0,0 +1,35 @@
+from core.context_packer import ApproxCounter, Passage, approx_tokens, pack
+
+DOC = " ".join(f"word{i}" for i in range(400))
+
+
+def _p(key, doc_id, start, end, text=None):
+    return Passage(key=key, doc_id=doc_id, title=doc_id, path="", start=start, end=end,
+                   text=DOC[start:end] if text is None else text)
+
+
+def test_approx_tokens_counts_word_pieces_and_punctuation():
+    assert approx_tokens("") == 0
+    assert approx_tokens("a b, c.") == 5
+    assert approx_tokens("documentation") == 4
+
+
+def test_overlapping_passages_merge_and_duplicates_drop():
+    a, b = _p("d:0", "d", 0, 300), _p("d:1", "d", 200, 500)
+    dup = _p("e:0", "e", 0, 0, text=a.text)
+    packed = pack([a, b, dup], budget=10_000, counter=ApproxCounter())
+    assert len(packed.passages) == 1 and packed.merged == 1 and packed.dropped == 1
+    merged = packed.passages[0]
+    assert (merged.start, merged.end) == (0, 500) and merged.text == DOC[0:500]
+    assert a.end == 300  # inputs are not mutated
+
+
+def test_budget_is_respected_with_a_cut_passage():
+    texts = [" ".join(f"d{i}w{j}" for j in range(300)) for i in range(5)]
+    passages = [_p(f"d{i}:0", f"d{i}", 0, len(t), text=t) for i, t in enumerate(texts)]
+    counter = ApproxCounter()
+    packed = pack(passages, budget=1000, counter=counter)
+    assert packed.tokens <= 1000 and counter.count(packed.context) <= 1000
+    assert packed.cut == 1 and len(packed.passages) == 2 and packed.dropped == 3
+    last = packed.passages[-1]
+    assert texts[1].startswith(last.text) and last.end == len(last.text) < len(texts[1])
@@ -0,0 +1,152 @@
+import threading
+import time
+
+from core.event_bus import EventBus
+
+
+def test_worker_pool_keeps_per_topic_order():
+    bus = EventBus(workers=4)
+    seen = {"a.x": [], "b.y": []}
+    bus.subscribe("a.x", lambda e: seen["a.x"].append(e["payload"]["i"]))
+    bus.subscribe("b.y", lambda e: seen["b.y"].append(e["payload"]["i"]))
+    bus.start()
+    try:
+        for i in range(200):
+            bus.enqueue("a.x", {"i": i})
+            bus.enqueue("b.y", {"i": i})
+        assert bus.drain()
+    finally:
+        bus.stop()
+    assert seen["a.x"] == list(range(200)) and seen["b.y"] == list(range(200))
+    assert bus.stats()["processed"] == 400
+
+
+def test_drop_policies_count_what_they_drop():
+    newest = EventBus(queue_size=2, overflow="drop-newest")
+    assert [newest.enqueue("t", {"i": i}) for i in range(4)] == [True, True, False, False]
+    assert newest.stats()["dropped"] == 2
+
+    oldest = EventBus(queue_size=2, overflow="drop-oldest")
+    got = []
+    oldest.subscribe("t", lambda e: got.append(e["payload"]["i"]))
+    for i in range(4):
+        oldest.enqueue("t", {"i": i})
+    oldest.start()
+    try:
+        assert oldest.drain()
+    finally:
+        oldest.stop()
+    assert got == [2, 3] and oldest.stats()["dropped"] == 2
+
+
+def test_spill_preserves_order_and_replays(tmp_path):
+    bus = EventBus(queue_size=2, overflow="spill", spill_dir=str(tmp_path))
+    got = []
+    gate = threading.Event()
+
+    def slow(e):
+        gate.wait(2)
+        got.append(e["payload"]["i"])
+
+    bus.subscribe("t", slow)
+    bus.start()
+    try:
+        for i in range(10):
+            bus.enqueue("t", {"i": i})
+        assert bus.stats()["spilled"] >= 7
+        gate.set()
+        assert bus.drain()
+    finally:
+        bus.stop()
+    assert got == list(range(10))
+
+
+def test_wildcards_and_snapshot_updates():
+    bus = EventBus()
+    hits = []
+    for pattern in ("run.*", "*.completed", "ingest.**", "**"):
+        bus.subscribe(pattern, lambda e, p=pattern: hits.append(p))
+    bus.publish("run.completed")
+    assert hits == ["run.*", "*.completed", "**"]
+
+    hits.clear()
+    bus.publish("ingest.document.indexed")
+    assert hits == ["ingest.**", "**"]
+
+    hits.clear()
+    bus.subscribe("ingest.document.indexed", lambda e: hits.append("exact"))
+    bus.publish("ingest.document.indexed")
+    assert hits == ["exact", "ingest.**", "**"]
+
+
+def test_coroutine_handlers_run_as_tasks_with_timeouts():
+    import asyncio
+
+    bus = EventBus()
+    got = []
+
+    async def fast(e):
+        await asyncio.sleep(0.01)
+        got.append(e["topic"])
+
+    async def stuck(e):
+        await asyncio.sleep(10)
+
+    bus.subscribe("run.*", fast)
+    bus.subscribe("run.completed", stuck, timeout=0.05)
+
+    async def main():
+        evt = await bus.publish_async("run.completed", {"ok": True})
+        assert got == [] and evt["topic"] == "run.completed"  # publisher did not wait
+        assert await bus.adrain()
+        await bus.publish_async("run.started", wait=True)
+
+    asyncio.run(main())
+    assert got == ["run.completed", "run.started"]
+    assert bus.stats()["timeouts"] == 1
+
+
+def test_coroutine_handler_from_sync_publish_without_loop():
+    import asyncio
+
+    bus = EventBus()
+    got = []
+
+    async def handler(e):
+        await asyncio.sleep(0)
+        got.append(e["payload"]["i"])
+
+    bus.subscribe("t", handler)
+    bus.publish("t", {"i": 1})
+    assert got == [1]
+
+
+def test_resubscribing_with_new_timeout_updates_dispatch():
+    bus = EventBus()
+
+    async def handler(evt):
+        pass
+    bus.subscribe("t", handler, timeout=1.0)
+    bus.subscribe("t", handler, timeout=0.01)
+    assert bus._snap.timeouts[handler] == 0.01
+
+
+def test_publish_keeps_dispatching_while_the_log_cannot_write(tmp_path, monkeypatch):
+    from core.event_log import EventLog
+
+    log = EventLog(tmp_path, fsync_interval=0.01)
+    bus = EventBus()
+    bus.attach_log(log)
+    got = []
+    bus.subscribe("t", lambda evt: got.append(evt["payload"]["i"]))
+
+    def disk_full(batch):
+        raise OSError(28, "No space left on device")
+    monkeypatch.setattr(log, "_append_lines", disk_full)
+    bus.publish("t", {"i": 1})
+    while log._error is None:
+        time.sleep(0.01)
+    bus.publish("t", {"i": 2})
+    assert got == [1, 2]
+    assert bus.stats()["log_errors"] == 1
+    log.close()
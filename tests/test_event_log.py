@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+from core.event_bus import EventBus
+from core.event_log import EventLog, EventLogError
+
+
+def test_bus_events_are_logged_and_replayed_from_a_cursor(tmp_path):
+    log = EventLog(tmp_path, segment_bytes=400)
+    bus = EventBus()
+    bus.attach_log(log)
+    for i in range(20):
+        bus.publish("run.completed" if i % 2 else "run.started", {"i": i})
+    assert log.flush()
+    assert len(list(tmp_path.glob("*.jsonl"))) > 1  # rotated
+
+    got = []
+    assert log.catch_up("kpi", lambda e: got.append(e["payload"]["i"]), pattern="*.completed") == 10
+    assert got == list(range(1, 20, 2)) and log.cursor("kpi") == 20
+
+    bus.publish("run.completed", {"i": 20})
+    log.flush()
+    assert [e["payload"]["i"] for e in log.replay(log.cursor("kpi"))] == [20]
+    log.close()
+
+
+def test_reopen_truncates_torn_tail_and_continues_sequence(tmp_path):
+    log = EventLog(tmp_path)
+    for i in range(3):
+        log.append({"topic": "t", "payload": {"i": i}})
+    log.close()
+    seg = sorted(tmp_path.glob("*.jsonl"))[-1]
+    with open(seg, "a") as f:
+        f.write('{"seq": 4, "topic": "t"')  # crash mid-write
+
+    log = EventLog(tmp_path)
+    assert log.last_seq == 3
+    assert log.append({"topic": "t"}) == 4
+    log.flush()
+    assert [e["seq"] for e in log.replay()] == [1, 2, 3, 4]
+    log.close()
+
+
+def test_failed_write_is_retried_without_losing_or_duplicating(tmp_path, monkeypatch):
+    log = EventLog(tmp_path, fsync_interval=0.01)
+    log.append({"topic": "t"})
+    assert log.flush()
+
+    real, failures = log._append_lines, []
+
+    def flaky(batch):
+        if len(failures) < 2:
+            failures.append(batch[0][0])
+            real(batch[:1])  # half-written batch
+            raise OSError(28, "No space left on device")
+        real(batch)
+    monkeypatch.setattr(log, "_append_lines", flaky)
+    log.append({"topic": "t"})
+    log.append({"topic": "t"})
+    with pytest.raises(EventLogError):
+        log.flush()
+    with pytest.raises(EventLogError):
+        log.append({"topic": "t"})
+    for _ in range(100):  # retried with backoff
+        if log.durable_seq == 3:
+            break
+        time.sleep(0.05)
+    assert log.append({"topic": "t"}) == 4
+    assert log.flush()
+    assert [e["seq"] for e in log.replay()] == [1, 2, 3, 4]
+    log.close()
@@ -0,0 +1,25 @@
+from store.extract import extract, file_hash, read_capped
+
+
+def test_extract_reads_text_and_never_raises(tmp_path):
+    f = tmp_path / "a.md"
+    f.write_text("# Relief\nwater and shelter")
+    assert extract(str(f)) == (str(f), "# Relief\nwater and shelter", "", file_hash(f), False)
+
+    path, text, error, digest, _ = extract(str(tmp_path / "missing.txt"))
+    assert text == "" and digest == "" and error.startswith("FileNotFoundError")
+
+
+def test_extract_skips_parse_when_hash_is_known(tmp_path):
+    f = tmp_path / "a.txt"
+    f.write_text("unchanged")
+    assert extract(str(f), known_hash=file_hash(f))[1] is None
+    assert extract(str(f), known_hash="0" * 64)[1] == "unchanged"
+
+
+def test_read_capped_streams_up_to_the_cap(tmp_path):
+    f = tmp_path / "big.log"
+    f.write_text("x" * 5000)
+    assert read_capped(f, 1234) == ("x" * 1234, True)
+    assert read_capped(f) == ("x" * 5000, False)
+    assert extract(str(f), max_chars=100).truncated
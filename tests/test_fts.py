@@ -0,0 +1,39 @@
+from django.db import OperationalError
+from django.test import override_settings
+
+from core.fts import match_expr
+
+
+def test_match_expr_quotes_terms_and_neutralises_operators():
+    assert match_expr('pump NOT "valve" OR title:loto*') == '"pump" OR "not" OR "valve" OR "or" OR "title" OR "loto"'
+    assert match_expr("?! --") == ""
+
+
+def test_triggers_keep_fts_mirror_in_sync(db):
+    from core import fts
+    from store.models import Document
+    doc = Document.objects.create(id="d1", title="Pump", content="lockout the breaker before work")
+    Document.objects.create(id="d2", title="Canteen", content="opening hours")
+    hits = fts.search("breaker", top_k=5)
+    assert [h[0] for h in hits] == ["d1"] and "breaker" in hits[0][2]
+
+    doc.content = "relief valve inspection"
+    doc.save()
+    assert fts.search("breaker") == []
+    assert [h[0] for h in fts.search("relief valve")] == ["d1"]
+
+    doc.delete()
+    assert fts.search("relief valve") == []
+
+
+def test_fts_errors_fall_back_to_bm25(db, monkeypatch):
+    from core import fts, retriever
+    from core.index import index_document
+    from store.models import Document
+    index_document(Document.objects.create(id="d1", title="Pump", content="lockout the breaker"))
+
+    def broken(*args, **kwargs):
+        raise OperationalError("no such module: fts5")
+    monkeypatch.setattr(fts, "search", broken)
+    with override_settings(RETRIEVER_BACKEND="fts5"):
+        assert [d.pk for d, _ in retriever.retrieve("breaker")] == ["d1"]
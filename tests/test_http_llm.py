@@ -0,0 +1,96 @@
+import pytest
+
+from providers import http_llm
+from providers.http_llm import LLAMA, OPENAI, HttpLLM
+
+
+class FakeResponse:
+    def __init__(self, status=200, body=None):
+        self.status_code = status
+        self.ok = status < 400
+        self._body = body if body is not None else {}
+        self.text = str(self._body)
+
+    def json(self):
+        return self._body
+
+    def close(self):
+        pass
+
+
+class FakeTransport:
+    """Routes by path; records every request as (method, path)."""
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.calls = []
+
+    def _hit(self, method, url):
+        path = url.split("http://llm", 1)[1]
+        self.calls.append((method, path))
+        return self.routes.get((method, path), FakeResponse(404))
+
+    def get(self, url, **kw):
+        return self._hit("GET", url)
+
+    def post(self, url, **kw):
+        return self._hit("POST", url)
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    monkeypatch.setattr(http_llm, "_dialects", {})
+
+    def install(routes):
+        t = FakeTransport(routes)
+        monkeypatch.setattr(http_llm, "transport", t)
+        return t
+    return install
+
+
+def _llm():
+    return HttpLLM(endpoint="http://llm", model="m", api_key="k", timeout=5)
+
+
+def test_probe_checks_props_before_v1_models(fake):
+    t = fake({("GET", "/props"): FakeResponse(body={"n_ctx": 4096}),
+              ("GET", "/v1/models"): FakeResponse(body={"data": []})})
+    assert _llm().dialect() == LLAMA
+    assert t.calls == [("GET", "/props")]
+
+    _llm().forget_dialect()
+    t = fake({("GET", "/v1/models"): FakeResponse(body={"data": []})})
+    assert _llm().dialect() == OPENAI
+    assert t.calls == [("GET", "/props"), ("GET", "/v1/models")]
+
+
+def test_dialect_is_cached_per_endpoint_until_ttl(fake, monkeypatch):
+    t = fake({("GET", "/props"): FakeResponse(body={})})
+    assert _llm().dialect() == LLAMA
+    assert _llm().dialect() == LLAMA  # another instance, same endpoint
+    assert len(t.calls) == 1
+    monkeypatch.setattr(http_llm, "DIALECT_TTL", 0.0)
+    _llm().dialect()
+    assert len(t.calls) == 2
+
+
+@pytest.mark.parametrize("status", [404, 405, 501])
+def test_mismatch_status_retries_other_dialect_and_remembers_it(fake, status):
+    t = fake({("GET", "/props"): FakeResponse(body={}),
+              ("POST", "/completion"): FakeResponse(status),
+              ("POST", "/v1/chat/completions"): FakeResponse(body={"choices": [{"message": {"content": "hi"}}]})})
+    llm = _llm()
+    assert llm._generate_any("q", {}) == "hi"
+    assert llm.dialect() == OPENAI
+    t.calls.clear()
+    assert llm._generate_any("q", {}) == "hi"
+    assert t.calls == [("POST", "/v1/chat/completions")]
+
+
+def test_other_http_errors_do_not_switch_dialect(fake):
+    t = fake({("GET", "/props"): FakeResponse(body={}),
+              ("POST", "/completion"): FakeResponse(500, {"error": "oom"})})
+    llm = _llm()
+    assert llm._generate_any("q", {}).startswith("[HTTP 500]")
+    assert ("POST", "/v1/chat/completions") not in t.calls
+    assert llm.dialect() == LLAMA
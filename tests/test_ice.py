@@ -0,0 +1,50 @@
+import pytest
+
+
+class FakeLLM:
+    def __init__(self, pieces):
+        self.pieces = pieces
+        self.calls = 0
+
+    def stream(self, prompt, **kw):
+        self.calls += 1
+        yield from self.pieces
+
+
+@pytest.fixture
+def ice(db, monkeypatch):
+    from core.ice import ice
+    ice.cache.clear()
+    return ice
+
+
+def _answer(events):
+    return "".join(e["data"] for e in events if e["event"] == "token")
+
+
+def test_stream_failing_midway_is_not_cached(ice, monkeypatch):
+    broken = FakeLLM(["The valve ", "[Provider error: connection reset]"])
+    monkeypatch.setattr(ice, "llm", broken)
+    assert list(ice.stream_query("relief valve?"))[-1]["event"] == "done"
+    list(ice.stream_query("relief valve?"))
+    assert broken.calls == 2
+
+    good = FakeLLM(["The valve ", "is tested quarterly."])
+    monkeypatch.setattr(ice, "llm", good)
+    list(ice.stream_query("relief valve?"))
+    events = list(ice.stream_query("relief valve?"))
+    assert good.calls == 1
+    assert _answer(events) == "The valve is tested quarterly." and events[-1]["data"]["cache"] == "hit"
+
+
+def test_shed_while_streaming_is_a_shed_event_not_an_error(ice, monkeypatch, caplog):
+    from providers.scheduler import Overloaded
+
+    class ShedLLM:
+        def stream(self, prompt, **kw):
+            raise Overloaded("LLM queue full (16 waiting)", retry_after=7)
+            yield  # pragma: no cover
+    monkeypatch.setattr(ice, "llm", ShedLLM())
+    events = list(ice.stream_query("relief valve?"))
+    assert events[-1] == {"event": "shed", "data": {"error": "LLM queue full (16 waiting)", "retry_after": 7}}
+    assert not [r for r in caplog.records if r.levelname == "ERROR"]
@@ -0,0 +1,91 @@
+import os
+
+
+def _ingest(src, exts):
+    from store.ingest import Ingester
+    return Ingester(workers=1, exts=exts).run(src)
+
+
+def _ids():
+    from store.models import Document
+    return sorted(Document.objects.values_list("title", flat=True))
+
+
+def test_narrower_extension_set_keeps_other_documents(db, tmp_path):
+    (tmp_path / "pump.txt").write_text("isolate the pump before work")
+    (tmp_path / "plant.log").write_text("valve 7 opened at 06:00")
+    _ingest(tmp_path, (".txt", ".log"))
+    assert _ids() == ["plant.log", "pump.txt"]
+
+    stats = _ingest(tmp_path, (".txt",))
+    assert stats.deleted == 0 and _ids() == ["plant.log", "pump.txt"]
+
+    os.remove(tmp_path / "plant.log")
+    stats = _ingest(tmp_path, (".txt",))
+    assert stats.deleted == 1 and _ids() == ["pump.txt"]
+
+
+def test_file_that_now_extracts_empty_drops_its_document(db, tmp_path):
+    from store.models import IngestManifest
+    f = tmp_path / "pump.txt"
+    f.write_text("isolate the pump before work")
+    _ingest(tmp_path, (".txt",))
+    f.write_text("   \n")
+    os.utime(f, (1, 1))
+    stats = _ingest(tmp_path, (".txt",))
+    assert stats.empty == 1 and stats.deleted == 1
+    assert _ids() == [] and not IngestManifest.objects.exists()
+
+
+def test_new_id_does_not_reuse_an_id_buffered_for_another_path(db, tmp_path):
+    from store.ingest import Ingester, doc_id_for
+    from store.models import Document, IngestManifest
+    old, new = str(tmp_path / "a.txt"), str(tmp_path / "b.txt")
+    st = os.stat(tmp_path)
+    ing = Ingester(workers=1)
+    # b.txt's document was renamed from a.txt earlier, so it carries a.txt's id
+    ing.write(new, "renamed document", st, "h1", IngestManifest(doc_id=doc_id_for(old)))
+    doc = ing.write(old, "a new file at the old path", st, "h2")
+    assert doc.pk != doc_id_for(old)
+    ing.flush()
+    assert Document.objects.count() == 2
+
+
+def test_first_incremental_run_adopts_documents_of_the_old_ingest(db, tmp_path, monkeypatch):
+    from store.ingest import Ingester, doc_id_for
+    from store.models import Document
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "pump.txt").write_text("isolate the pump before work")
+    # what `ingest_docs --source docs` wrote before the manifest existed
+    Document.objects.create(id=doc_id_for("docs/pump.txt"), title="pump.txt", content="old text",
+                            source_path="docs/pump.txt")
+    stats = Ingester(workers=1).run("docs")
+    assert stats.written == 1
+    assert list(Document.objects.values_list("pk", "content")) == [
+        (doc_id_for("docs/pump.txt"), "isolate the pump before work")]
+
+
+def test_extraction_error_keeps_the_indexed_document(db, tmp_path, monkeypatch):
+    from store import ingest
+    from store.models import IngestManifest
+    f = tmp_path / "pump.txt"
+    f.write_text("isolate the pump before work")
+    _ingest(tmp_path, (".txt",))
+    os.utime(f, (1, 1))
+    monkeypatch.setattr(ingest, "extract", lambda path, known, cap: (path, None, "PermissionError: locked", "", False))
+    stats = _ingest(tmp_path, (".txt",))
+    assert stats.failed == 1 and stats.deleted == 0
+    assert _ids() == ["pump.txt"] and IngestManifest.objects.count() == 1
+
+
+def test_buffer_is_flushed_before_indexing_would_exceed_the_budget(db, tmp_path):
+    from store.ingest import INDEX_BYTES_PER_CHAR, Ingester
+    from store.models import Document
+    ing = Ingester(workers=1, memory_mb=1, max_doc_chars=10 ** 9)
+    assert ing.max_doc_chars == (1 << 20) // INDEX_BYTES_PER_CHAR
+    st = os.stat(tmp_path)
+    half = "pump valve " * (ing.max_doc_chars // 20)
+    ing.write(str(tmp_path / "a.txt"), half, st, "h1")
+    ing.write(str(tmp_path / "b.txt"), half + half, st, "h2")
+    assert Document.objects.count() == 1 and len(ing._docs) == 1
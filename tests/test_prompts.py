@@ -0,0 +1,44 @@
+import zlib
+
+from core.prompts import SYSTEM_PREAMBLE, query_prompt, slot_for
+from providers.http_llm import HttpLLM
+
+
+def test_query_prompt_prefix_is_identical_across_questions():
+    a = query_prompt("How do I isolate P-101?", "[1] Lock out the pump.")
+    b = query_prompt("Who signs the permit?", "[1] The area authority signs.")
+    assert a.prefix == b.prefix == SYSTEM_PREAMBLE
+    assert a.text.startswith(a.prefix) and "P-101" in a.suffix and "P-101" not in a.prefix
+    assert a.suffix != b.suffix
+
+
+def test_slot_affinity_is_deterministic():
+    prefix = query_prompt("q", "c").prefix
+    slot = slot_for(prefix, 4)
+    assert slot == slot_for(prefix, 4) == zlib.crc32(prefix.encode("utf-8")) % 4  # same in every process
+    assert 0 <= slot < 4
+    assert slot_for(prefix, 4, affinity=False) is None
+    assert slot_for(prefix, 1) is None
+
+
+def test_http_llm_sends_cache_fields_only_to_llama_completion():
+    llm = HttpLLM(endpoint="http://llm", model="m", api_key="k", timeout=5)
+    body = llm._completion_payload("p", {})
+    assert body["cache_prompt"] is True and "id_slot" not in body
+    assert llm._completion_payload("p", {"slot": 1})["id_slot"] == 1
+    assert llm._completion_payload("p", {"cache_prompt": False})["cache_prompt"] is False
+    chat = llm._chat_payload("p", {"slot": 1})
+    assert "cache_prompt" not in chat and "id_slot" not in chat
+
+
+def test_provider_client_sends_cache_fields_only_when_enabled(monkeypatch):
+    from apps.providers import client
+    msgs = [{"role": "user", "content": "q"}]
+    monkeypatch.setattr(client, "PROVIDER_PROMPT_CACHE", False)
+    body = client._payload(msgs, 0.2, 64, None, None, slot=1)
+    assert "cache_prompt" not in body and "id_slot" not in body
+
+    monkeypatch.setattr(client, "PROVIDER_PROMPT_CACHE", True)
+    assert client._payload(msgs, 0.2, 64, None, None)["cache_prompt"] is True
+    assert "id_slot" not in client._payload(msgs, 0.2, 64, None, None)
+    assert client._payload(msgs, 0.2, 64, None, None, slot=1)["id_slot"] == 1
@@ -0,0 +1,40 @@
+from core.provenance import FIELDS, GENESIS, entry_hash, verify_rows
+
+
+def _chain(run_id, n):
+    rows, prev = [], GENESIS
+    for step in range(1, n + 1):
+        values = (run_id, step, "ice", f"a{step}", "in", "out", "", prev)
+        prev = entry_hash(values)
+        rows.append((f"{run_id}-{step}", *values, prev))
+    return rows
+
+
+def test_intact_chains_verify():
+    assert len(FIELDS) == 8
+    assert list(verify_rows(_chain("r1", 4) + _chain("r2", 3))) == []
+
+
+def test_tampering_gaps_and_broken_links_are_reported_once():
+    rows = _chain("r1", 5)
+    edited = list(rows[1])
+    edited[4] = "forged"  # action
+    rows[1] = tuple(edited)
+    assert list(verify_rows(rows)) == [("r1-2", "hash mismatch: row was modified")]
+
+    rows = _chain("r1", 5)
+    del rows[2]
+    assert [rid for rid, _ in verify_rows(rows)] == ["r1-4"]
+
+
+def test_merkle_root_and_signatures():
+    from core.provenance import check_signature, merkle_root, sign
+
+    hashes = [entry_hash(("r", i)) for i in range(5)]
+    root = merkle_root(hashes)
+    assert root == merkle_root(list(hashes))
+    assert root != merkle_root(hashes[:4]) and root != merkle_root(hashes[::-1])
+
+    sig = sign("k", 1, 100, 100, root, "")
+    assert check_signature("k", sig, 1, 100, 100, root, "")
+    assert not check_signature("other", sig, 1, 100, 100, root, "")
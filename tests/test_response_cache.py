@@ -0,0 +1,41 @@
+import time
+
+from core.response_cache import ResponseCache, make_key, normalize_question
+
+
+def test_key_normalizes_question_but_tracks_sources_and_template():
+    src = [("d1:0", "2025-01-01T00:00:00")]
+    assert normalize_question("  What is LOTO?? ") == "what is loto"
+    assert make_key("What is LOTO?", src, "t1") == make_key("what is  loto", src, "t1")
+    assert make_key("what is loto", src, "t1") != make_key("what is loto", src, "t2")
+    bumped = [("d1:0", "2025-02-01T00:00:00")]
+    assert make_key("what is loto", src, "t1") != make_key("what is loto", bumped, "t1")
+
+
+def test_lru_eviction_and_stats():
+    c = ResponseCache(max_entries=2)
+    c.put("a", "A")
+    c.put("b", "B")
+    assert c.get("a") == "A"  # a is now most recent
+    c.put("c", "C")           # evicts b
+    assert c.get("b") is None
+    s = c.stats()
+    assert (s["hits"], s["misses"], s["evictions"], s["size"]) == (1, 1, 1, 2)
+
+
+def test_ttl_expiry():
+    c = ResponseCache(ttl=0.01)
+    c.put("k", "v")
+    time.sleep(0.02)
+    assert c.get("k") is None
+
+
+def test_invalidate_by_document_and_persistence(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    c = ResponseCache(path=path)
+    c.put("k1", "v1", doc_ids=["d1", "d2"])
+    c.put("k2", "v2", doc_ids=["d3"])
+    assert ResponseCache(path=path).get("k2") == "v2"  # survives a restart
+    assert c.invalidate_docs(["d2"]) == 1
+    assert c.get("k1") is None and c.get("k2") == "v2"
+    assert ResponseCache(path=path).get("k1") is None
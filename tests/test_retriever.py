@@ -0,0 +1,63 @@
+from core.bm25 import tokenize, query_terms, idf, score_postings
+
+
+def test_tokenize_lowercases_and_drops_long_tokens():
+    assert tokenize("Pump P-101 LOTO " + "x" * 80) == ["pump", "p", "101", "loto"]
+
+
+def test_query_terms_unique_in_order():
+    assert query_terms("valve Valve pressure valve") == ["valve", "pressure"]
+
+
+def test_rare_terms_weigh_more():
+    assert idf(100, 1) > idf(100, 50) > 0
+
+
+def test_score_postings_ranks_by_bm25():
+    rows = [
+        ("valve", "a", 3, 100),
+        ("valve", "b", 1, 100),
+        ("pressure", "b", 1, 100),
+    ]
+    scores = score_postings(rows, n_docs=10, avgdl=100.0)
+    assert set(scores) == {"a", "b"}
+    # "b" matches both terms; rare-term coverage beats repeated common term
+    assert scores["b"] > scores["a"]
+
+
+def test_chunks_overlap_and_map_back_to_source():
+    from core.chunker import chunk_text
+
+    text = " ".join(f"word{i}" for i in range(200))
+    spans = chunk_text(text, size=100, overlap=30)
+    assert len(spans) > 1
+    for a, b in zip(spans, spans[1:]):
+        assert b.start < a.end  # overlapping windows
+    for sp in spans:
+        assert text[sp.start:sp.end] == sp.text
+        assert not sp.text.startswith(" ") and len(sp.text) <= 100
+    assert spans[-1].end == len(text)
+
+
+def _docs(*bodies):
+    from store.models import Document
+    from core.index import index_document
+    docs = [Document.objects.create(id=f"d{i}", title=f"doc {i}", content=body) for i, body in enumerate(bodies)]
+    for d in docs:
+        index_document(d)
+    return docs
+
+
+def test_index_search_and_retrieve_chunks(db):
+    from core.index import search
+    from core.retriever import retrieve, retrieve_chunks
+    _docs(
+        "Isolate pump P-101 before maintenance. Apply the LOTO padlock to the breaker.",
+        "The relief valve on the pressure line is tested every quarter.",
+        "Canteen opening hours and parking rules.",
+    )
+    assert [d for d, _ in search("relief valve pressure", top_k=3)][0] == "d1"
+    assert [d.pk for d, _ in retrieve("pump loto", top_k=1)] == ["d0"]
+    hits = retrieve_chunks("LOTO padlock", top_k=2)
+    assert hits and hits[0][0].doc_id == "d0"
+    assert "padlock" in hits[0][0].text
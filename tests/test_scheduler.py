@@ -0,0 +1,79 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from providers.scheduler import BATCH, INTERACTIVE, LLMScheduler, Overloaded, priority
+
+
+def _hold(s, secs, order, name, level=None):
+    with s.slot(level):
+        order.append(name)
+        time.sleep(secs)
+
+
+def test_slots_limit_concurrency_and_interactive_jumps_batch():
+    s = LLMScheduler(slots=1, max_queue=8, queue_timeout=5)
+    order = []
+    first = threading.Thread(target=_hold, args=(s, 0.2, order, "first"))
+    first.start()
+    time.sleep(0.05)
+    batch = threading.Thread(target=_hold, args=(s, 0, order, "batch", BATCH))
+    batch.start()
+    time.sleep(0.05)
+    chat = threading.Thread(target=_hold, args=(s, 0, order, "chat", INTERACTIVE))
+    chat.start()
+    for t in (first, batch, chat):
+        t.join()
+    assert order == ["first", "chat", "batch"]
+    st = s.stats()
+    assert (st["admitted"], st["completed"], st["queued"], st["active"], st["waiting"]) == (3, 3, 2, 0, 0)
+    assert st["queue_wait_s"]["p95"] >= 0.1
+
+
+def test_queue_depth_sheds_fast_but_not_higher_priority():
+    s = LLMScheduler(slots=1, max_queue=1, queue_timeout=5)
+    release = threading.Event()
+
+    def busy():
+        with s.slot():
+            release.wait()
+
+    def waiter():
+        with priority(BATCH), s.slot():
+            pass
+
+    threads = [threading.Thread(target=busy), threading.Thread(target=waiter)]
+    for t in threads:
+        t.start()
+        time.sleep(0.05)
+    t0 = time.monotonic()
+    with pytest.raises(Overloaded) as exc:
+        s.check(BATCH)
+    assert time.monotonic() - t0 < 0.05 and exc.value.retry_after >= 1
+    s.check(INTERACTIVE)  # batch waiters do not count against interactive requests
+    release.set()
+    for t in threads:
+        t.join()
+    assert s.stats()["shed_queue"] == 1
+
+
+def test_async_waiters_share_slots_and_time_out():
+    s = LLMScheduler(slots=1, max_queue=4, queue_timeout=0.1)
+
+    async def main():
+        async def hold(secs):
+            async with s.aslot():
+                await asyncio.sleep(secs)
+
+        long = asyncio.create_task(hold(0.3))
+        await asyncio.sleep(0.01)
+        with pytest.raises(Overloaded):
+            await hold(0)
+        await long
+
+    asyncio.run(main())
+    st = s.stats()
+    assert (st["shed_timeout"], st["completed"], st["active"], st["waiting"]) == (1, 1, 0, 0)
+
@@ -0,0 +1,49 @@
+import asyncio
+import threading
+import time
+
+from providers.singleflight import SingleFlight
+
+
+def test_singleflight_coalesces_identical_low_temperature_requests():
+    sf = SingleFlight(max_temperature=0.3)
+    assert sf.key("e", "p", {"temperature": 0.2, "slot": 1}) == sf.key("e", "p", {"temperature": 0.2, "slot": 0})
+    assert sf.key("e", "p", {"temperature": 0.2}) != sf.key("e", "p", {"temperature": 0.2, "max_tokens": 8})
+    assert sf.key("e", "p", {"temperature": 0.9}) is None
+    calls = []
+
+    def gen():
+        calls.append(1)
+        time.sleep(0.1)
+        return "answer"
+
+    key = sf.key("e", "p", {})
+    out = []
+    threads = [threading.Thread(target=lambda: out.append(sf.do(key, gen))) for _ in range(3)]
+    for t in threads:
+        t.start()
+
+    async def agen():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return "async answer"
+
+    async def main():
+        return await asyncio.gather(*[sf.ado("k2", agen) for _ in range(3)])
+
+    assert asyncio.run(main()) == ["async answer"] * 3
+    for t in threads:
+        t.join()
+    assert out == ["answer"] * 3 and len(calls) == 2
+    assert sf.stats() == {"in_flight": 0, "leaders": 2, "coalesced": 4}
+
+
+def test_interactive_caller_never_follows_a_batch_leader():
+    from providers.scheduler import BATCH, INTERACTIVE, priority
+
+    sf = SingleFlight(max_temperature=0.3)
+    chat = sf.key("e", "p", {"temperature": 0.2, "priority": INTERACTIVE})
+    assert chat == sf.key("e", "p", {"temperature": 0.2})  # context default
+    assert chat != sf.key("e", "p", {"temperature": 0.2, "priority": BATCH})
+    with priority(BATCH):
+        assert sf.key("e", "p", {"temperature": 0.2}) == sf.key("e", "p", {"temperature": 0.2, "priority": BATCH})
@@ -0,0 +1,80 @@
+import io
+import json
+
+import pytest
+import requests
+
+from core.sse import format_event, sse_response, token_events
+from providers import http_llm, transport
+from providers.http_llm import LLAMA, OPENAI, HttpLLM
+
+
+def _response(body: str, status=200):
+    r = requests.Response()
+    r.status_code = status
+    r.raw = io.BytesIO(body.encode("utf-8"))
+    return r
+
+
+def _sse(*chunks):
+    return "".join(c if isinstance(c, str) else f"data: {json.dumps(c)}\n\n" for c in chunks)
+
+
+def test_iter_sse_skips_blank_and_keepalive_lines_and_stops_at_done():
+    body = _sse(": keep-alive\n\n", {"content": "Iso"}, "\n", "event: ping\n\n", "data: not json\n\n",
+                {"content": "late\nnext line"}, "data: [DONE]\n\n", {"content": "after done"})
+    assert list(transport.iter_sse(_response(body))) == [{"content": "Iso"}, {"content": "late\nnext line"}]
+
+
+class StreamTransport:
+    def __init__(self, body):
+        self.body = body
+
+    def post(self, url, **kw):
+        assert kw["stream"] is True
+        return _response(self.body)
+
+    iter_sse = staticmethod(transport.iter_sse)
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    monkeypatch.setattr(http_llm, "_dialects", {})
+
+    def make(dialect, body):
+        monkeypatch.setattr(http_llm, "transport", StreamTransport(body))
+        llm = HttpLLM(endpoint="http://llm", model="m", api_key="k", timeout=5)
+        llm._remember(dialect)
+        return llm
+    return make
+
+
+def test_llama_stream_pieces_until_stop(llm):
+    body = _sse({"content": "Lock"}, {"content": ""}, {"content": " out\nthe pump"}, {"content": ".", "stop": True},
+                {"content": "ignored"})
+    assert list(llm(LLAMA, body)._stream_any("q", {})) == ["Lock", " out\nthe pump", "."]
+
+
+def test_openai_stream_deltas_until_done(llm):
+    body = _sse({"choices": [{"delta": {"role": "assistant"}}]},
+                {"choices": [{"delta": {"content": "Lock"}}]},
+                ": keep-alive\n\n",
+                {"choices": [{"delta": {"content": " out\n"}}]},
+                {"choices": []},
+                {"choices": [{"delta": {}, "finish_reason": "stop"}]},
+                "data: [DONE]\n\n")
+    assert list(llm(OPENAI, body)._stream_any("q", {})) == ["Lock", " out\n"]
+
+
+def test_format_event_keeps_multiline_tokens_in_one_data_line():
+    assert format_event("a\nb", "token") == 'event: token\ndata: "a\\nb"\n\n'
+    assert format_event({"n": 1}) == 'data: {"n": 1}\n\n'
+
+
+def test_sse_response_frames_token_and_done_events(django_db):
+    resp = sse_response(token_events(iter(["Lock", " out\n"])))
+    assert resp["Content-Type"] == "text/event-stream" and resp["Cache-Control"] == "no-cache"
+    body = b"".join(resp.streaming_content).decode()
+    assert body == ('event: token\ndata: "Lock"\n\n'
+                    'event: token\ndata: " out\\n"\n\n'
+                    'event: done\ndata: {"n_pieces": 2}\n\n')
@@ -1,2 +1,8 @@
 def test_placeholder():
     assert True
+
+
+def test_relabelled_ui_store_keeps_its_table(django_db):
+    from apps.store.models import Document
+    assert Document._meta.app_label == "store_ui"
+    assert Document._meta.db_table == "store_document"
@@ -0,0 +1,61 @@
+import threading
+
+import pytest
+import requests
+
+from providers import transport
+
+
+@pytest.fixture
+def fresh(monkeypatch):
+    monkeypatch.setattr(transport, "pool_size", lambda: 3)
+    transport.close()
+    yield
+    transport.close()
+
+
+def test_every_request_goes_through_one_pooled_session(fresh, monkeypatch):
+    used = []
+
+    def fake_request(self, method, url, **kw):
+        used.append(self)
+        return "ok"
+    monkeypatch.setattr(requests.Session, "request", fake_request)
+    threads = [threading.Thread(target=transport.post, args=("http://llm/completion",)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    transport.get("http://llm/props")
+    session = transport.get_session()
+    assert len(used) == 5 and all(s is session for s in used)
+    adapter = session.get_adapter("http://llm/")
+    assert adapter._pool_maxsize == 3 and session.headers["Connection"] == "keep-alive"
+
+
+def test_session_is_rebuilt_after_fork_and_close(fresh, monkeypatch):
+    first = transport.get_session()
+    assert transport.get_session() is first
+    monkeypatch.setattr(transport.os, "getpid", lambda: -1)  # as seen in a forked child
+    child = transport.get_session()
+    assert child is not first and transport.get_session() is child
+    transport.close()
+    assert transport.get_session() is not child
+
+
+def test_async_client_is_reused_on_its_loop_but_not_across_loops(fresh):
+    import asyncio
+
+    async def two():
+        return transport.get_async_client(), transport.get_async_client()
+
+    async def closed_then_new():
+        c = transport.get_async_client()
+        await transport.aclose()
+        return c, transport.get_async_client()
+
+    a1, a2 = asyncio.run(two())
+    b1, _ = asyncio.run(two())
+    assert a1 is a2 and a1 is not b1
+    old, new = asyncio.run(closed_then_new())
+    assert old.is_closed and new is not old
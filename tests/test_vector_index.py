@@ -0,0 +1,68 @@
+import json
+
+import numpy as np
+import pytest
+
+from core.vector_index import VectorIndex
+
+
+def _corpus(n=500, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    return [f"c{i}" for i in range(n)], rng.normal(size=(n, dim)).astype(np.float32)
+
+
+def test_brute_force_finds_exact_match(tmp_path):
+    ids, vecs = _corpus()
+    idx = VectorIndex.build(tmp_path, ids, vecs)
+    hits = idx.search(vecs[42], top_k=3)
+    assert hits[0][0] == "c42"
+    assert abs(hits[0][1] - 1.0) < 1e-5
+    assert [s for _, s in hits] == sorted((s for _, s in hits), reverse=True)
+
+
+def test_reload_is_memory_mapped(tmp_path):
+    ids, vecs = _corpus()
+    VectorIndex.build(tmp_path, ids, vecs)
+    idx = VectorIndex.load(tmp_path)
+    assert isinstance(idx.matrix, np.memmap)
+    assert len(idx) == 500 and idx.dim == 16
+
+
+def test_ivf_probing_all_lists_matches_brute_force(tmp_path):
+    ids, vecs = _corpus()
+    exact = VectorIndex.build(tmp_path / "flat", ids, vecs)
+    ivf = VectorIndex.build(tmp_path / "ivf", ids, vecs, nlist=10)
+    assert ivf.centroids is not None
+    q = vecs[7] + 0.1
+    assert [i for i, _ in ivf.search(q, top_k=5, nprobe=10)] == [i for i, _ in exact.search(q, top_k=5)]
+    assert ivf.search(vecs[7], top_k=1, nprobe=2)[0][0] == "c7"
+
+
+def test_rebuild_swaps_files_under_open_readers(tmp_path):
+    ids, vecs = _corpus()
+    old = VectorIndex.build(tmp_path, ids, vecs)
+    VectorIndex.build(tmp_path, ids[:100], vecs[:100] * 2)
+    # the old memory map still sees the old file, not a truncated one
+    assert old.matrix.shape == (500, 16) and old.search(vecs[300], top_k=1)[0][0] == "c300"
+    new = VectorIndex.load(tmp_path)
+    assert len(new) == new.matrix.shape[0] == 100
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["ids.json", "vectors.npy"]
+
+
+def test_load_rejects_ids_that_never_match_the_matrix(tmp_path):
+    ids, vecs = _corpus()
+    VectorIndex.build(tmp_path, ids, vecs)
+    (tmp_path / "ids.json").write_text(json.dumps(ids[:10]))
+    with pytest.raises(ValueError):
+        VectorIndex.load(tmp_path)
+
+
+def test_stale_ivf_lists_fall_back_to_brute_force(tmp_path):
+    ids, vecs = _corpus()
+    VectorIndex.build(tmp_path / "ivf", ids, vecs, nlist=10)
+    stale = tmp_path / "ivf" / "ivf.npz"
+    VectorIndex.build(tmp_path, ids[:100], vecs[:100])
+    (tmp_path / "ivf.npz").write_bytes(stale.read_bytes())  # lists for 500 rows
+    idx = VectorIndex.load(tmp_path)
+    assert idx.centroids is None
+    assert idx.search(vecs[42], top_k=1)[0][0] == "c42"
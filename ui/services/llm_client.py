@@ -1,19 +1,65 @@
-import os, json, urllib.request
+import os
+from providers import transport
+from providers.scheduler import get_scheduler
 
 LLAMA_URL = os.getenv("LLAMA_URL", "http://127.0.0.1:8080")
 
-def complete(prompt: str, n_predict: int = 128) -> str:
-    req = urllib.request.Request(
-        f"{LLAMA_URL}/completion",
-        data=json.dumps({"prompt": prompt, "n_predict": n_predict}).encode(),
-        headers={"Content-Type": "application/json"},
-        method="POST",
-    )
-    with urllib.request.urlopen(req, timeout=60) as resp:
-        data = json.loads(resp.read().decode("utf-8"))
+def complete(prompt: str, n_predict: int = 128, priority=None) -> str:
+    with get_scheduler().slot(priority):
+        resp = transport.post(
+            f"{LLAMA_URL}/completion",
+            json={"prompt": prompt, "n_predict": n_predict, "cache_prompt": True},
+            timeout=60,
+        )
+    resp.raise_for_status()
+    return _text(resp.json())
+
+def _text(data) -> str:
     # Handle either {"content": "..."} or {"choices":[{"text":"..."}]}
     if isinstance(data, dict) and "content" in data:
         return data["content"]
     if isinstance(data, dict) and data.get("choices"):
         return (data["choices"][0].get("text") or "").strip()
     return str(data)
+
+def complete_stream(prompt: str, n_predict: int = 128, priority=None):
+    """Yield pieces of a llama.cpp /completion SSE stream as they arrive."""
+    with get_scheduler().slot(priority):
+        resp = transport.post(
+            f"{LLAMA_URL}/completion",
+            json={"prompt": prompt, "n_predict": n_predict, "stream": True, "cache_prompt": True},
+            timeout=60,
+            stream=True,
+        )
+        resp.raise_for_status()
+        for chunk in transport.iter_sse(resp):
+            if chunk.get("content"):
+                yield chunk["content"]
+            if chunk.get("stop"):
+                break
+
+# ---- async (ASGI views) ----
+
+async def acomplete(prompt: str, n_predict: int = 128, priority=None) -> str:
+    async with get_scheduler().aslot(priority):
+        resp = await transport.apost(
+            f"{LLAMA_URL}/completion",
+            json={"prompt": prompt, "n_predict": n_predict, "cache_prompt": True},
+            timeout=60,
+        )
+    resp.raise_for_status()
+    return _text(resp.json())
+
+async def acomplete_stream(prompt: str, n_predict: int = 128, priority=None):
+    async with get_scheduler().aslot(priority), transport.astream(
+        "POST",
+        f"{LLAMA_URL}/completion",
+        json={"prompt": prompt, "n_predict": n_predict, "stream": True, "cache_prompt": True},
+        timeout=60,
+    ) as resp:
+        resp.raise_for_status()
+        async for chunk in transport.aiter_sse(resp):
+            if chunk.get("content"):
+                yield chunk["content"]
+            if chunk.get("stop"):
+                break
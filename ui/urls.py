@@ -4,7 +4,10 @@ from .views import home, settings_view, diagnostics
 
 urlpatterns = [
     path('chat', views_llm.chat, name='chat'),
+    path('chat/stream', views_llm.chat_stream, name='chat_stream'),
+    path('ask/stream', views_llm.ask_stream, name='ask_stream'),
     path('diagnostics/llm', views_llm.llm_ping, name='llm_ping'),
+    path('diagnostics/cache', views_llm.cache_stats, name='cache_stats'),
     path('', home, name='home'),
     path('settings/', settings_view, name='settings'),
     path('diagnostics/', diagnostics, name='diagnostics'),
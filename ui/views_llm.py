@@ -1,20 +1,46 @@
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
-from .services.llm_client import complete
+from .services.llm_client import acomplete, acomplete_stream
+from core.ice import ice
+from core.sse import sse_response, atoken_events
+from providers.scheduler import get_scheduler
 import json
 
-def llm_ping(request):
-    reply = complete("pong")
+def _prompt(request):
+    if request.method == "POST":
+        body = json.loads(request.body.decode("utf-8") or "{}")
+        return body.get("prompt") or ""
+    return request.GET.get("q", "")
+
+async def llm_ping(request):
+    reply = await acomplete("pong")
     return JsonResponse({"ok": reply.strip().lower().startswith("pong"), "reply": reply})
 
 @csrf_exempt
-def chat(request):
-    if request.method == "POST":
-        body = json.loads(request.body.decode("utf-8") or "{}")
-        prompt = body.get("prompt") or ""
-    else:
-        prompt = request.GET.get("q", "")
+async def chat(request):
+    prompt = _prompt(request)
     if not prompt:
         return JsonResponse({"error": "missing prompt"}, status=400)
-    reply = complete(prompt, 128)
+    reply = await acomplete(prompt, 128)
     return JsonResponse({"prompt": prompt, "reply": reply})
+
+@csrf_exempt
+async def chat_stream(request):
+    """SSE: token events as llama-server produces them, then done."""
+    prompt = _prompt(request)
+    if not prompt:
+        return JsonResponse({"error": "missing prompt"}, status=400)
+    get_scheduler().check()  # shed before the 200 goes out
+    return sse_response(atoken_events(acomplete_stream(prompt, 128)))
+
+def cache_stats(request):
+    return JsonResponse(ice.cache.stats())
+
+@csrf_exempt
+async def ask_stream(request):
+    """SSE: grounded answer via ICE (citations, token..., done)."""
+    question = _prompt(request).strip()
+    if not question:
+        return JsonResponse({"error": "missing prompt"}, status=400)
+    get_scheduler().check()
+    return sse_response(ice.astream_query(question))